@@ -10,7 +10,7 @@ import os
 
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy import optimize, stats
+from scipy import ndimage, optimize, stats
 
 # %% GENERAL FUNCTIONS
 
@@ -28,6 +28,10 @@ def SaturatedExp(x, N, g, c):
     return N * (1 - np.exp(-g * x)) + c
 
 
+def Lorentzian(x, a, x0, gamma, k):
+    return a * (gamma / 2) ** 2 / ((x - x0) ** 2 + (gamma / 2) ** 2) + k
+
+
 def std_dev(lst: np.ndarray) -> float:
     """returns the standard deviation of lst"""
     return np.std(lst)
@@ -58,6 +62,145 @@ def DivideImgs(img1: np.ndarray, img2: np.ndarray, cut: float = 0, lim: float =
     )
 
 
+def OpticalDensity(ImgAbs: np.ndarray, ImgBkg: np.ndarray, ImgDark: np.ndarray = None) -> np.ndarray:
+    """Optical density log(ImgBkg/ImgAbs), dark subtracted if ImgDark is given.
+    Same conventions as the PanShots: 0 where it is not defined and never negative.
+    """
+    img_abs = np.asarray(ImgAbs, dtype=np.float64)
+    img_bkg = np.asarray(ImgBkg, dtype=np.float64)
+    if ImgDark is not None:
+        img_dark = np.asarray(ImgDark, dtype=np.float64)
+        img_abs = SubtractImgs(img_abs, img_dark)
+        img_bkg = SubtractImgs(img_bkg, img_dark)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        opt = LogImg(DivideImgs(img_bkg, img_abs))
+    return np.where(opt > 0, opt, 0)
+
+
+def OpticalDensityUncertainty(ImgAbs: np.ndarray, BkgStats, DarkStats=None) -> tuple[np.ndarray, np.ndarray]:
+    """Optical density and its per-pixel standard deviation.
+    BkgStats (and DarkStats) are RunningImageStats of the background references.
+    The reference noise is the variance of the mean of the N background frames, while the
+    absorption frame is a single shot: its variance is the single-frame background variance
+    with the shot-noise part scaled by the transmitted fraction.
+    """
+    img_abs = np.asarray(ImgAbs, dtype=np.float64)
+    bkg_var = BkgStats.Variance()
+    if DarkStats is not None:
+        dark_mean = DarkStats.mean
+        dark_var = DarkStats.Variance()
+        dark_var_mean = DarkStats.VarianceOfMean()
+    else:
+        dark_mean = np.zeros_like(BkgStats.mean)
+        dark_var = np.zeros_like(bkg_var)
+        dark_var_mean = dark_var
+    opt = OpticalDensity(img_abs, BkgStats.mean, dark_mean)
+    ### Dark subtracted signals
+    bkg = BkgStats.mean - dark_mean
+    sig = img_abs - dark_mean
+    valid = (bkg > 0) & (sig > 0)
+    bkg = np.where(valid, bkg, 1)
+    sig = np.where(valid, sig, 1)
+    ### Variances of the two dark subtracted terms
+    abs_var = dark_var + np.clip(bkg_var - dark_var, 0, None) * np.clip(sig / bkg, 0, None)
+    bkg_mean_var = BkgStats.VarianceOfMean()
+    ### The dark mean is shared by both terms and partially cancels.
+    opt_var = abs_var / sig**2 + bkg_mean_var / bkg**2 + dark_var_mean * (1 / sig - 1 / bkg) ** 2
+    opt_err = np.where(valid, np.sqrt(opt_var), 0)
+    return opt, opt_err
+
+
+def RoiOpticalDensityError(ImgAbs: np.ndarray, BkgStats, DarkStats, row_lims, col_lims) -> float:
+    """Standard deviation of the optical density averaged over the pixels
+    [row_lims[0], row_lims[1]) x [col_lims[0], col_lims[1]), propagated from the background
+    (and dark) statistics with OpticalDensityUncertainty, pixels taken as independent.
+    """
+    rows, cols = slice(*row_lims), slice(*col_lims)
+    img_abs = np.asarray(ImgAbs)[rows, cols]
+    dark = None if DarkStats is None else DarkStats.Crop(row_lims, col_lims)
+    opt_err = OpticalDensityUncertainty(img_abs, BkgStats.Crop(row_lims, col_lims), dark)[1]
+    return float(np.sqrt(np.sum(opt_err**2)) / opt_err.size)
+
+
+# %% BACKGROUND STATISTICS
+
+
+class RunningImageStats:
+    def __init__(self):
+        """Streaming mean and variance of a sequence of frames (Welford algorithm).
+        Frames are added one at a time with Add(), so N background frames are reduced
+        without keeping them in memory.
+        """
+        self.count = 0
+        self.mean = None
+        self.m2 = None  ### Sum of squared deviations from the running mean.
+
+    def Add(self, img):
+        """Add a frame to the statistics."""
+        frame = np.asarray(img, dtype=np.float64)
+        if self.mean is None:
+            self.mean = np.zeros(frame.shape)
+            self.m2 = np.zeros(frame.shape)
+        self.count = self.count + 1
+        delta = frame - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (frame - self.mean)
+
+    def Variance(self):
+        """Single-frame variance of every pixel (zero for less than two frames)."""
+        if self.count < 2:
+            return np.zeros_like(self.mean)
+        return self.m2 / (self.count - 1)
+
+    def VarianceOfMean(self):
+        """Variance of the averaged frame."""
+        return self.Variance() / max(self.count, 1)
+
+    def Crop(self, row_lims, col_lims):
+        """RunningImageStats of the region [row_lims[0], row_lims[1]) x [col_lims[0], col_lims[1])."""
+        rows, cols = slice(*row_lims), slice(*col_lims)
+        stats = RunningImageStats()
+        stats.count = self.count
+        stats.mean = self.mean[rows, cols]
+        stats.m2 = self.m2[rows, cols]
+        return stats
+
+    def HotPixelMask(self, n_sigma=6):
+        """True on pixels whose mean or variance deviates from their 3x3 neighbourhood
+        by more than n_sigma robust standard deviations.
+        """
+        mask = np.zeros(self.mean.shape, dtype=bool)
+        for img in (self.mean, self.Variance()):
+            resid = img - ndimage.median_filter(img, size=3, mode="nearest")
+            mad = 1.4826 * np.median(np.abs(resid - np.median(resid)))
+            if mad > 0:
+                mask |= np.abs(resid) > n_sigma * mad
+        return mask
+
+    def Save(self, FileName):
+        """Save the mean and the variance as float arrays (FileName_mean.npy, FileName_var.npy)
+        and the hot pixel mask and frame count to FileName_stats.npz.
+        """
+        np.save(FileName + "_mean.npy", self.mean)
+        np.save(FileName + "_var.npy", self.Variance())
+        np.savez(FileName + "_stats.npz", hot=self.HotPixelMask(), count=self.count)
+
+
+def LoadBackgroundStats(FileName):
+    """Return the RunningImageStats saved by RunningImageStats.Save(FileName).
+    Backgrounds acquired before the statistics were saved only have FileName.bmp:
+    it is loaded as a single frame (zero variance).
+    """
+    stats = RunningImageStats()
+    if not os.path.exists(FileName + "_mean.npy"):
+        stats.Add(plt.imread(FileName + ".bmp"))
+        return stats
+    stats.count = int(np.load(FileName + "_stats.npz")["count"])
+    stats.mean = np.load(FileName + "_mean.npy")
+    stats.m2 = np.load(FileName + "_var.npy") * max(stats.count - 1, 0)
+    return stats
+
+
 # %% PANSHOTS
 
 
@@ -99,16 +242,7 @@ def PanShotAbsorption(ImgAbs, ImgBkg, folder_path, PanShotName="none"):
     plt.ylabel("row [pixel]")
     plt.xlabel("col [pixel]")
     ### Optical Density
-    div = DivideImgs(img_bkg, img_abs)
-    opt = np.zeros((div.shape[0], div.shape[1]))
-    for i in range(0, div.shape[0]):
-        for j in range(0, div.shape[1]):
-            if div[i, j] != 0:
-                opt[i, j] = np.log(div[i, j])
-            else:
-                opt[i, j] = 0
-            if opt[i, j] < 0:
-                opt[i, j] = 0
+    opt = OpticalDensity(img_abs, img_bkg)
     plt.subplot(224)
     plt.tight_layout()
     plt.title("Optical Density")
@@ -153,16 +287,7 @@ def PanShotAbsorptionReduced(ImgAbs: np.ndarray, ImgBkg: np.ndarray, folder_path
     I_abs = SubtractImgs(img_bkg, img_abs)
     abs_coeff = DivideImgs(I_abs, img_bkg)
     ### Optical Density
-    div = DivideImgs(img_bkg, img_abs)
-    opt = np.zeros((div.shape[0], div.shape[1]))
-    for i in range(0, div.shape[0]):
-        for j in range(0, div.shape[1]):
-            if div[i, j] != 0:
-                opt[i, j] = np.log(div[i, j])
-            else:
-                opt[i, j] = 0
-            if opt[i, j] < 0:
-                opt[i, j] = 0
+    opt = OpticalDensity(img_abs, img_bkg)
     ### Plot
     """
     plt.figure() 
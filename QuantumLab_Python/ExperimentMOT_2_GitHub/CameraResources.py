@@ -5,13 +5,34 @@ Created on Tue May 28 14:47:48 2019
 @author: ruggero
 """
 
+import os
+import time
+
 import numpy
-from pypylon import genicam, pylon
+
+if os.environ.get('MOT_CAMERA_BACKEND', '') == 'pylon_emu':
+    ### pylon camera emulator: PYLON_CAMEMU has to be set before pypylon is loaded.
+    os.environ.setdefault('PYLON_CAMEMU', os.environ.get('MOT_EMULATED_CAMERAS', '3'))
+if os.environ.get('MOT_CAMERA_BACKEND', '') == 'emulated':
+    ### Emulated cameras with synthetic images, only when explicitly asked for.
+    from EmulatedCameras import genicam, pylon
+else:
+    ### No silent fallback: a broken pypylon must not turn a real experiment into synthetic data.
+    from pypylon import genicam, pylon
 
 ### All the method input parameters are meant to be passed in string format unless differently specified. 
 ### 'Name' variables are always strings.
 ### Descriptions of function and classes are also accessible through docstrings.
 
+FRAME_INFO_DTYPE = numpy.dtype([
+        ('Imagenum', numpy.int64),
+        ('FrameID', numpy.int64), ### -1 if not available.
+        ('Timestamp', numpy.int64), ### Camera clock [ns], -1 if the chunk is not enabled.
+        ('ExposureTime', numpy.float64), ### [us], NaN if the chunk is not enabled.
+        ('HostTime', numpy.int64), ### time.monotonic_ns() when the frame was retrieved.
+        ('AlignedTime', numpy.int64), ### Timestamp on the host monotonic clock (see EstimateClockOffset), -1 if unknown.
+        ])
+
 class TransportLayerCreator():
     ''' Gets the transport layer factory. '''
     def __init__(self):
@@ -27,9 +48,10 @@ class MultipleCameraSession():
     ''' Gets the cameras ready and allows to define all the necessary 
     parameters to trigger those cameras.
     '''
-    def __init__(self, TLCrt, NumOfCamsConnected):
+    def __init__(self, TLCrt, NumOfCamsConnected, SerialNumToName = None):
         ### TLCrt is an instance of TransportLayerCreator.
         ### NumOfCamsConnected is a integer that represents the number of connected cameras.
+        ### SerialNumToName replaces the dictionary below, e.g. for the pylon camera emulator.
         self.cam_number = NumOfCamsConnected
         self.SerialNumToName = {
                 ### insert the serial number of you camera. 
@@ -37,7 +59,15 @@ class MultipleCameraSession():
                 '12345671' : 'Cam1',
                 '12345672' : 'Cam2', 
                 }
+        if SerialNumToName is not None:
+            self.SerialNumToName = dict(SerialNumToName)
         self.NameToObject = {}  ### From camera name to 'camera' object.
+        self.CamNameToChunks = {} ### Chunks enabled by EnableTimeStamp() for each camera.
+        self.CamNameToClockOffset = {} ### Host monotonic time - camera timestamp [ns] and its uncertainty.
+        self.CamNameToClockOffsetTime = {} ### time.monotonic() of the last EstimateClockOffset().
+        self.ClockOffsetInterval = 60.0 ### [s] ReadyForTrigger() re-estimates older offsets (drift), None never.
+        self.CamNameToFrameInfoList = {}
+        self.RunLog = None ### RunLog instance: if set, frames are recorded there instead of printed.
         self.CameraSerialNumber = []
         self.cameras = pylon.InstantCameraArray(self.cam_number)
         ### Create and attach all Pylon Devices.
@@ -71,6 +101,9 @@ class MultipleCameraSession():
         if self.cameras.IsPylonDeviceAttached() == True: print('Cameras closed but not detached \n')
         
     def SetAllCamerasToDefaultConfiguration(self):
+        self.CamNameToChunks = {} ### The default user set disables the chunks.
+        self.CamNameToClockOffset = {}
+        self.CamNameToClockOffsetTime = {}
         for i in range(0, self.cam_number):  
             self.cameras[i].UserSetSelector.SetValue('Default');
             self.cameras[i].UserSetLoad.Execute()
@@ -133,8 +166,10 @@ class MultipleCameraSession():
         print(CameraName + ' Gain and Exposure:')
         print('Gain =', cam.Gain.GetValue(), '/ Exposure Mode =', cam.ExposureMode.GetValue(), '/ Exposure time [us] =', cam.ExposureTime.GetValue(), '\n')        
         
-    def EnableTimeStamp(self, CameraName):
-        ''' Enable Time Stamp. Good to check the order of captured pictures.
+    def EnableTimeStamp(self, CameraName, Chunks = ('Timestamp', 'ExposureTime')):
+        ''' Enable Time Stamp and the other chunks in Chunks (if the camera has them).
+        Every retrieved frame then carries its timestamp, frame ID and exposure
+        (see CamNameToFrameInfoList) and the camera clock is compared with the host clock.
         '''
         cam = self.NameToObject[CameraName]
             ### Enable chunks in general.
@@ -142,10 +177,46 @@ class MultipleCameraSession():
             cam.ChunkModeActive = True
         else:
             raise pylon.RUNTIME_EXCEPTION("The camera doesn't support chunk features")
-        cam.ChunkSelector.SetValue('Timestamp')
-        #cam.ChunkEnable.SetValue('true')
-        cam.ChunkEnable.SetValue(True)
-        print(CameraName, ' ', cam.ChunkSelector.GetValue(), ': ', cam.ChunkEnable.GetValue(), '\n', sep = '')        
+        available = cam.ChunkSelector.GetSymbolics()
+        self.CamNameToChunks[CameraName] = []
+        for chunk in Chunks:
+            if chunk not in available:
+                print(CameraName, ' ', chunk, ': not available', sep = '')
+                continue
+            cam.ChunkSelector.SetValue(chunk)
+            #cam.ChunkEnable.SetValue('true')
+            cam.ChunkEnable.SetValue(True)
+            self.CamNameToChunks[CameraName].append(chunk)
+            print(CameraName, ' ', cam.ChunkSelector.GetValue(), ': ', cam.ChunkEnable.GetValue(), sep = '')
+        self.EstimateClockOffset(CameraName)
+        print('\n')
+
+    def EstimateClockOffset(self, CameraName, NumOfSamples = 10):
+        ''' Offset between the host monotonic clock and the camera timestamp clock [ns].
+        The camera clock is latched with TimestampLatch between two host readings,
+        the sample with the shortest round trip is kept. Returns (offset, uncertainty),
+        stored in CamNameToClockOffset and used for the AlignedTime of the frames.
+        '''
+        cam = self.NameToObject[CameraName]
+        try: ### The node does not exist on every camera (GigE: GevTimestampControlLatch).
+            latch_available = genicam.IsWritable(cam.TimestampLatch)
+        except Exception:
+            latch_available = False
+        if not latch_available:
+            print(CameraName, 'does not support TimestampLatch')
+            return None
+        best = None
+        for i in range(NumOfSamples):
+            t0 = time.monotonic_ns()
+            cam.TimestampLatch.Execute()
+            t1 = time.monotonic_ns()
+            cam_time = cam.TimestampLatchValue.GetValue()
+            if best is None or t1 - t0 < best[1]:
+                best = ((t0 + t1) // 2 - cam_time, t1 - t0)
+        self.CamNameToClockOffset[CameraName] = (best[0], best[1] // 2)
+        self.CamNameToClockOffsetTime[CameraName] = time.monotonic()
+        print(CameraName, ' clock offset [ns]: ', best[0], ' +- ', best[1] // 2, sep = '')
+        return self.CamNameToClockOffset[CameraName]
     
     def ReadyForTrigger(self, CamNameToPicNum, ListOfCamToBeTriggered):
         ''' Set Cameras ready for trigger. 
@@ -163,6 +234,9 @@ class MultipleCameraSession():
         self.CamNameToImageList = {} ### Dict that contains the images: for each camera provides a list of arrray (imgs).
         for cam_name in cam_list:
             cam = self.NameToObject[cam_name] ### cam is now a 'camera' object.
+            if (cam_name in self.CamNameToClockOffset and self.ClockOffsetInterval is not None
+                    and time.monotonic() - self.CamNameToClockOffsetTime[cam_name] > self.ClockOffsetInterval):
+                self.EstimateClockOffset(cam_name) ### Follow the drift of the camera clock, not at every shot.
             cam.MaxNumBuffer = cam_to_pic[cam_name] + 2
             #cam.AcquisitionBurstFrameCount.SetValue(cam_to_pic[cam_name]) 
             cam.StartGrabbingMax(cam_to_pic[cam_name])            
@@ -171,24 +245,39 @@ class MultipleCameraSession():
         ### RetrieveResult automatically stop the grabbing 
         ### when the max number of pictures have been reached.
                 
-    def RetrievePictures(self, CamNameToPicNum, ListOfCamToBeTriggered):
+    def RetrievePictures(self, CamNameToPicNum, ListOfCamToBeTriggered, FrameCallback = None):
         ''' Retrieve the pictures available in the buffer. 
         Pictures are available in the buffer after ReadyForTrigger() has been 
         called and trigger are performed.
+        FrameCallback(cam_name, Imagenum, img, timestamp) is called as soon as each
+        picture is retrieved (timestamp in ns, None if the chunk is not enabled),
+        e.g. to analyse a burst while it is acquired.
+        The metadata of each picture is stored in CamNameToFrameInfoList (dicts with
+        the FRAME_INFO_DTYPE keys, see also FrameInfoArray()).
         '''
         cam_list = ListOfCamToBeTriggered
         cam_to_pic = CamNameToPicNum
         self.CamNameToImageList = {} ### Dict that contains the images: for each camera provides a list of arrray (imgs).
+        self.CamNameToTimestampList = {} ### Chunk timestamp [ns] of each image, None if the chunk is not enabled.
+        self.CamNameToFrameInfoList = {}
         for cam_name in cam_list:
             cam = self.NameToObject[cam_name] ### cam is now a 'camera' object.
+            self.CamNameToTimestampList[cam_name] = []
+            self.CamNameToFrameInfoList[cam_name] = []
+            chunks = self.CamNameToChunks.get(cam_name, [])
+            offset = self.CamNameToClockOffset.get(cam_name, (None, None))[0]
             self.CamNameToImageList[cam_name] = [] ### Prepare the dictionary that contains the image list for each camera.
             for Imagenum in range(0, cam_to_pic[cam_name]):
                 grabResult = cam.RetrieveResult(50000, pylon.TimeoutHandling_ThrowException) ### Timeout of 50000 ms. 
+                host_time = time.monotonic_ns()
                 if grabResult.GrabSucceeded():   
                     img = grabResult.Array
-                    cam.ChunkSelector.SetValue('Timestamp')
-                    if cam.ChunkEnable.GetValue():
-                        if genicam.IsReadable(grabResult.ChunkTimestamp):                
+                    info = self._FrameInfo(grabResult, Imagenum, host_time, chunks, offset)
+                    timestamp = info['Timestamp'] if info['Timestamp'] >= 0 else None
+                    if self.RunLog is not None:
+                        self.RunLog.Frame(cam_name, info) ### No formatting in the acquisition loop.
+                    elif 'Timestamp' in chunks:
+                        if timestamp is not None:                
                             if Imagenum == 0: 
                                 last_timestamp = grabResult.ChunkTimestamp.Value
                                 time_elapsed_us = 0
@@ -199,10 +288,40 @@ class MultipleCameraSession():
                     else:
                         print('Picture number ', Imagenum, ', ', cam_name, '. Max Intensity: ', numpy.amax(img), sep = '')
                     self.CamNameToImageList[cam_name].append(img) 
+                    self.CamNameToTimestampList[cam_name].append(timestamp)
+                    self.CamNameToFrameInfoList[cam_name].append(info)
+                    if FrameCallback is not None:
+                        FrameCallback(cam_name, Imagenum, img, timestamp)
                 else:
+                    if self.RunLog is not None:
+                        self.RunLog.Record('grab_error', camera = cam_name, Imagenum = Imagenum, code = grabResult.ErrorCode, description = grabResult.ErrorDescription)
                     print("Error: ", grabResult.ErrorCode, grabResult.ErrorDescription)
                     grabResult.Release()           
             print('Images acquired ', cam_name, ': ', len(self.CamNameToImageList[cam_name]), '/', cam_to_pic[cam_name], '\n', sep = '')
+
+    def _FrameInfo(self, grabResult, Imagenum, host_time, chunks, offset):
+        ''' Metadata of a grab result as a dict with the FRAME_INFO_DTYPE keys. '''
+        info = {'Imagenum': Imagenum, 'FrameID': -1, 'Timestamp': -1, 'ExposureTime': numpy.nan,
+                'HostTime': host_time, 'AlignedTime': -1}
+        try:
+            info['FrameID'] = int(grabResult.BlockID) ### Frame counter of the transport layer.
+        except (AttributeError, genicam.GenericException):
+            pass
+        if 'Timestamp' in chunks and genicam.IsReadable(grabResult.ChunkTimestamp):
+            info['Timestamp'] = int(grabResult.ChunkTimestamp.Value)
+            if offset is not None:
+                info['AlignedTime'] = info['Timestamp'] + offset
+        if 'ExposureTime' in chunks and genicam.IsReadable(grabResult.ChunkExposureTime):
+            info['ExposureTime'] = grabResult.ChunkExposureTime.Value
+        return info
+
+    def FrameInfoArray(self, CameraName):
+        ''' Metadata of the last retrieved pictures of CameraName as a FRAME_INFO_DTYPE array. '''
+        infos = self.CamNameToFrameInfoList.get(CameraName, [])
+        out = numpy.zeros(len(infos), dtype = FRAME_INFO_DTYPE)
+        for k, info in enumerate(infos):
+            out[k] = tuple(info[name] for name in FRAME_INFO_DTYPE.names)
+        return out
             
               
 
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:31:05 2026
+
+@author: MOT_User
+
+2-D fits of atom clouds on optical density (or fluorescence) images.
+Models: rotated Gaussian and Thomas-Fermi. Initial guesses come from the image
+moments, the fit can run on a binned image and whole shot stacks are fitted
+in parallel over a process pool.
+Results are structured arrays (one row per image, see FIT_DTYPE).
+Coordinates are in pixel, Matrix [row, column] notation: x is the column, y the row.
+
+NOTE: on Windows, scripts calling FitStack() with processes > 1 must guard the
+call with if __name__ == '__main__'.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from CloudMoments import BorderOffset, CloudAxes, StackMoments
+from scipy import optimize
+
+# %% GENERAL FUNCTIONS
+
+PARAM_NAMES = ("x0", "y0", "wx", "wy", "theta", "amp", "offset")
+### wx, wy are the Gaussian sigmas or the Thomas-Fermi radii along the major and minor axes.
+FIT_DTYPE = np.dtype(
+    [(name, np.float64) for name in PARAM_NAMES]
+    + [(name + "_err", np.float64) for name in PARAM_NAMES]
+    + [("redchi2", np.float64), ("success", bool)]
+)
+
+
+def BinImage(img: np.ndarray, binning: int) -> np.ndarray:
+    """Average binning x binning blocks of pixels. Extra rows and columns are dropped."""
+    if binning == 1:
+        return np.asarray(img, dtype=np.float64)
+    rows = img.shape[0] // binning * binning
+    cols = img.shape[1] // binning * binning
+    img = np.asarray(img[:rows, :cols], dtype=np.float64)
+    return img.reshape(rows // binning, binning, cols // binning, binning).mean(axis=(1, 3))
+
+
+def _RotatedCoords(x, y, x0, y0, theta):
+    """Coordinates along the cloud axes."""
+    cos, sin = np.cos(theta), np.sin(theta)
+    dx, dy = x - x0, y - y0
+    return dx * cos + dy * sin, -dx * sin + dy * cos
+
+
+def Gauss2D(x, y, x0, y0, wx, wy, theta, amp, offset):
+    """Rotated 2-D Gaussian, wx and wy are the sigmas."""
+    u, v = _RotatedCoords(x, y, x0, y0, theta)
+    return amp * np.exp(-0.5 * ((u / wx) ** 2 + (v / wy) ** 2)) + offset
+
+
+def Gauss2DJacobian(x, y, x0, y0, wx, wy, theta, amp, offset):
+    """Analytic derivatives of Gauss2D with respect to PARAM_NAMES (pixels, 7)."""
+    cos, sin = np.cos(theta), np.sin(theta)
+    u, v = _RotatedCoords(x, y, x0, y0, theta)
+    g = np.exp(-0.5 * ((u / wx) ** 2 + (v / wy) ** 2))
+    ag = amp * g
+    du, dv = u / wx**2, v / wy**2
+    jac = np.empty((x.size, 7))
+    jac[:, 0] = ag * (du * cos - dv * sin)
+    jac[:, 1] = ag * (du * sin + dv * cos)
+    jac[:, 2] = ag * u**2 / wx**3
+    jac[:, 3] = ag * v**2 / wy**3
+    jac[:, 4] = ag * (-du * v + dv * u)
+    jac[:, 5] = g
+    jac[:, 6] = 1
+    return jac
+
+
+def ThomasFermi2D(x, y, x0, y0, wx, wy, theta, amp, offset):
+    """Column integrated Thomas-Fermi profile, wx and wy are the radii."""
+    u, v = _RotatedCoords(x, y, x0, y0, theta)
+    arg = np.clip(1 - (u / wx) ** 2 - (v / wy) ** 2, 0, None)
+    return amp * arg**1.5 + offset
+
+
+MODELS = {
+    "gauss": (Gauss2D, Gauss2DJacobian),
+    "thomas_fermi": (ThomasFermi2D, None),
+}
+
+
+def MomentsGuess(img: np.ndarray) -> np.ndarray:
+    """Initial guess of PARAM_NAMES from the image moments (see CloudMoments).
+    The offset is the median of the image border.
+    """
+    img = np.asarray(img, dtype=np.float64)
+    offset = BorderOffset(img[np.newaxis]).item()
+    moments = StackMoments(img, offset=offset)
+    rows, cols = img.shape
+    if not moments["N"][0] > 0:
+        return np.array([cols / 2, rows / 2, cols / 4, rows / 4, 0, 0, offset])
+    major, minor, theta = CloudAxes(moments)
+    wx = max(major[0], 0.5)
+    wy = max(minor[0], 0.5)
+    amp = moments["N"][0] / (2 * np.pi * wx * wy)
+    return np.array([moments["x0"][0], moments["y0"][0], wx, wy, theta[0], amp, offset])
+
+
+def FitCloud(img: np.ndarray, model: str = "gauss", binning: int = 1, init_guess=None) -> np.ndarray:
+    """Fit a single image, returns a one-element FIT_DTYPE array in full-frame pixel units.
+    init_guess (PARAM_NAMES order, full-frame pixels) replaces the moments guess.
+    """
+    func, jac_func = MODELS[model]
+    data = BinImage(img, binning)
+    y, x = np.indices(data.shape)
+    x, y, z = x.ravel(), y.ravel(), data.ravel()
+    if init_guess is None:
+        p0 = MomentsGuess(data)
+    else:
+        p0 = _ToBinned(np.asarray(init_guess, dtype=np.float64), binning)
+    if model == "thomas_fermi" and init_guess is None:
+        ### R ~ 2.2 sigma keeps about the same integral with the same peak.
+        p0[2:4] *= 2.2
+    lower = [-np.inf, -np.inf, 1e-3, 1e-3, -np.inf, -np.inf, -np.inf]
+    p0[2:4] = np.maximum(p0[2:4], 1e-2)
+
+    def residuals(p):
+        return func(x, y, *p) - z
+
+    if jac_func is None:
+        jac = "2-point"
+    else:
+
+        def jac(p):
+            return jac_func(x, y, *p)
+
+    res = optimize.least_squares(residuals, p0, jac=jac, bounds=(lower, np.inf), method="trf")
+    dof = max(z.size - len(p0), 1)
+    redchi2 = 2 * res.cost / dof
+    try:
+        cov = np.linalg.inv(res.jac.T @ res.jac) * redchi2
+        err = np.sqrt(np.clip(np.diag(cov), 0, None))
+    except np.linalg.LinAlgError:
+        err = np.full(len(p0), np.nan)
+    popt = res.x.copy()
+    ### The two axes are equivalent: wx is the major axis and theta is in [-pi/2, pi/2).
+    if popt[2] < popt[3]:
+        popt[[2, 3]] = popt[[3, 2]]
+        err[[2, 3]] = err[[3, 2]]
+        popt[4] = popt[4] + np.pi / 2
+    popt[4] = (popt[4] + np.pi / 2) % np.pi - np.pi / 2
+    out = np.zeros(1, dtype=FIT_DTYPE)
+    for name, value, error in zip(PARAM_NAMES, _ToFull(popt, binning), _ToFull(err, binning, True)):
+        out[name] = value
+        out[name + "_err"] = error
+    out["redchi2"] = redchi2
+    out["success"] = res.success
+    return out
+
+
+def _ToBinned(p, binning):
+    p = p.copy()
+    p[0:2] = (p[0:2] + 0.5) / binning - 0.5
+    p[2:4] = p[2:4] / binning
+    return p
+
+
+def _ToFull(p, binning, errors=False):
+    p = p.copy()
+    if errors:
+        p[0:4] = p[0:4] * binning
+    else:
+        p[0:2] = (p[0:2] + 0.5) * binning - 0.5
+        p[2:4] = p[2:4] * binning
+    return p
+
+
+def _FitWorker(args):
+    img, model, binning = args
+    try:
+        return FitCloud(img, model, binning)
+    except (ValueError, RuntimeError):
+        out = np.zeros(1, dtype=FIT_DTYPE)
+        for name in FIT_DTYPE.names[:-1]:
+            out[name] = np.nan
+        return out
+
+
+def FitStack(stack, model: str = "gauss", binning: int = 1, processes=None, chunksize: int = 16) -> np.ndarray:
+    """Fit every image of stack (shots, row, col), returns a FIT_DTYPE array (shots,).
+    processes is the size of the process pool (number of cores by default, 1 to run serially).
+    Failed fits are NaN with success False.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    jobs = [(img, model, binning) for img in stack]
+    if processes == 1 or len(jobs) < 2 * chunksize:
+        rows = [_FitWorker(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            rows = list(pool.map(_FitWorker, jobs, chunksize=chunksize))
+    if not rows:
+        return np.zeros(0, dtype=FIT_DTYPE)
+    return np.concatenate(rows)
+
+
+# %%
+"""
+if __name__ == '__main__':
+    Probe_opt_imgs = OptRef.OpticalDensity(Probe)
+    Clouds = FitStack(Probe_opt_imgs, model = 'gauss', binning = 2)
+    plt.errorbar(range(len(Clouds)), Clouds['wx'], yerr = Clouds['wx_err'], fmt = 'o')
+"""
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:05:22 2026
+
+@author: MOT_User
+
+Moment based cloud metrics: atom number (zeroth moment), centroid (first moments)
+and RMS widths (second moments) of whole image stacks in one vectorized pass.
+A fast alternative to curve fitting for diagnostics such as centre drift or
+size vs detuning.
+Coordinates are in pixel of the full frame, Matrix [row, column] notation:
+x is the column, y the row.
+"""
+
+import numpy as np
+from AnalysysBMP_Exp import SubtractImgs
+
+# %% GENERAL FUNCTIONS
+
+MOMENT_DTYPE = np.dtype(
+    [
+        ("N", np.float64),  ### Sum of the background subtracted pixels.
+        ("x0", np.float64),
+        ("y0", np.float64),
+        ("sx", np.float64),  ### RMS widths.
+        ("sy", np.float64),
+        ("cxy", np.float64),  ### Cross second moment.
+    ]
+)
+
+
+def _AsStack(frames):
+    stack = np.asarray(frames, dtype=np.float64)
+    if stack.ndim == 2:
+        stack = stack[np.newaxis]
+    return stack
+
+
+def BorderOffset(stack: np.ndarray) -> np.ndarray:
+    """Median of the border pixels of every frame of the stack, shape (shots, 1, 1)."""
+    border = np.concatenate(
+        (stack[:, 0, :], stack[:, -1, :], stack[:, 1:-1, 0], stack[:, 1:-1, -1]), axis=1
+    )
+    return np.median(border, axis=1)[:, np.newaxis, np.newaxis]
+
+
+def _Moments(w, x, y):
+    """Moments of the weights w (shots, row, col) on the grid x (col,), y (row,)."""
+    col_prof = w.sum(axis=1)  ### (shots, col)
+    row_prof = w.sum(axis=2)  ### (shots, row)
+    N = col_prof.sum(axis=1)
+    safe = np.where(N > 0, N, 1)
+    x0 = col_prof @ x / safe
+    y0 = row_prof @ y / safe
+    cxx = col_prof @ x**2 / safe - x0**2
+    cyy = row_prof @ y**2 / safe - y0**2
+    cxy = np.einsum("sij,i,j->s", w, y, x) / safe - x0 * y0
+    out = np.zeros(len(w), dtype=MOMENT_DTYPE)
+    out["N"] = N
+    out["x0"] = np.where(N > 0, x0, np.nan)
+    out["y0"] = np.where(N > 0, y0, np.nan)
+    out["sx"] = np.where(N > 0, np.sqrt(np.clip(cxx, 0, None)), np.nan)
+    out["sy"] = np.where(N > 0, np.sqrt(np.clip(cyy, 0, None)), np.nan)
+    out["cxy"] = np.where(N > 0, cxy, np.nan)
+    return out
+
+
+def StackMoments(
+    stack,
+    ImgBkg=None,
+    row_lims="none",
+    col_lims="none",
+    offset="border",
+    threshold=0,
+    relative=False,
+    window=None,
+    iterations=0,
+) -> np.ndarray:
+    """Zeroth, first and second moments of every frame of stack (shots, row, col),
+    returns a MOMENT_DTYPE array (shots,).
+    ImgBkg is subtracted from every frame with SubtractImgs (e.g. the scattering background).
+    row_lims and col_lims select the ROI as two value lists [-,-].
+    offset: 'border' subtracts the median of the ROI border of each frame, None nothing,
+    or a number.
+    threshold: pixels below threshold (after the offset) are ignored; absolute (e.g. an OD)
+    unless relative = True, then it is a fraction of the peak of each frame.
+    window, iterations: refine the moments iterations times on a window of +-window RMS
+    widths around the previous centroid, to reject noise far from the cloud.
+    """
+    stack = _AsStack(stack)
+    if ImgBkg is not None:
+        stack = SubtractImgs(stack, np.asarray(ImgBkg, dtype=np.float64))
+    if row_lims == "none":
+        row_lims = [0, stack.shape[1]]
+    if col_lims == "none":
+        col_lims = [0, stack.shape[2]]
+    w = stack[:, row_lims[0] : row_lims[1], col_lims[0] : col_lims[1]]
+    if offset == "border":
+        w = w - BorderOffset(w)
+    elif offset is not None:
+        w = w - offset
+    if relative:
+        cut = threshold * w.max(axis=(1, 2))[:, np.newaxis, np.newaxis]
+    else:
+        cut = threshold
+    w = np.where(w > cut, w, 0)
+    x = np.arange(col_lims[0], col_lims[1], dtype=np.float64)
+    y = np.arange(row_lims[0], row_lims[1], dtype=np.float64)
+    out = _Moments(w, x, y)
+    if window is not None:
+        for _ in range(iterations):
+            ### Frames with no signal keep the full ROI.
+            x0 = np.nan_to_num(out["x0"], nan=x.mean())[:, np.newaxis, np.newaxis]
+            y0 = np.nan_to_num(out["y0"], nan=y.mean())[:, np.newaxis, np.newaxis]
+            hx = np.nan_to_num(window * out["sx"], nan=np.inf)[:, np.newaxis, np.newaxis]
+            hy = np.nan_to_num(window * out["sy"], nan=np.inf)[:, np.newaxis, np.newaxis]
+            inside = (np.abs(x - x0) <= np.maximum(hx, 1)) & (
+                np.abs(y[:, np.newaxis] - y0) <= np.maximum(hy, 1)
+            )
+            out = _Moments(np.where(inside, w, 0), x, y)
+    return out
+
+
+def CloudAxes(moments: np.ndarray):
+    """Principal RMS widths and angle of the cloud from the second moments.
+    Returns (major, minor, theta), theta is the angle of the major axis from the x axis.
+    """
+    cxx, cyy, cxy = moments["sx"] ** 2, moments["sy"] ** 2, moments["cxy"]
+    mean = (cxx + cyy) / 2
+    diff = np.sqrt(((cxx - cyy) / 2) ** 2 + cxy**2)
+    theta = 0.5 * np.arctan2(2 * cxy, cxx - cyy)
+    return np.sqrt(mean + diff), np.sqrt(np.clip(mean - diff, 0, None)), theta
+
+
+# %%
+"""
+Probe_opt_imgs = OptRef.OpticalDensity(Probe)
+Clouds = StackMoments(Probe_opt_imgs, row_lims = [80, 160], col_lims = [40, 130], threshold = 0.1, relative = True, window = 3, iterations = 2)
+plt.plot(Clouds['x0'], 'o')
+"""
@@ -0,0 +1,847 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 16:20:07 2026
+
+@author: MOT_User
+
+Pure-Python stand-in of the pypylon subset used by CameraResources (pylon and
+genicam namespaces), with synthetic MOT frames: fluorescence or absorption
+images of a Gaussian cloud on a probe beam with interference fringes, shot
+noise and read noise (see SyntheticMOT).
+
+The emulated cameras honour ROI, binning, pixel format, exposure, gain, frame
+rate, the Timestamp and ExposureTime chunks, TimestampLatch and MaxNumBuffer
+(frames arriving on full buffers are lost and BlockID skips them). Frames are
+delivered according to the trigger settings:
+    - TriggerMode 'Off': free run at the frame rate from StartGrabbing on;
+    - TriggerSource 'Software': one frame per TriggerSoftware.Execute();
+    - TriggerSource 'Line*': with HardwareTrigger = 'auto' the line is pulsed at
+      the frame rate from StartGrabbing on, with 'external' the frames wait for
+      FireLine() (e.g. on the *TRG of a simulated AWG, see ConnectAWG()).
+With realtime = False nothing sleeps: the emulator clock jumps to the next frame.
+
+CameraResources uses it only with the environment variable
+MOT_CAMERA_BACKEND=emulated (MOT_EMULATED_CAMERAS sets the number of cameras,
+default 3 with the serial numbers of MultipleCameraSession); without it a
+missing pypylon raises the ImportError.
+MOT_CAMERA_BACKEND=pylon_emu uses pylon's own camera emulator instead; its
+serial numbers have to be passed to MultipleCameraSession(SerialNumToName = ...).
+"""
+
+import os
+import time
+import types
+from collections import deque
+
+import numpy as np
+
+# %% GENERAL FUNCTIONS
+
+SENSOR_WIDTH = 2048
+SENSOR_HEIGHT = 2048
+ROW_TIME_US = 5.4  ### Readout time of a sensor row [us].
+MODEL_NAME = "acA2040-90um (emulated)"
+DEFAULT_SERIAL_NUMBERS = ("12345670", "12345671", "12345672")
+PIXEL_FORMATS = {"Mono8": (np.uint8, 255), "Mono10": (np.uint16, 1023), "Mono12": (np.uint16, 4095)}
+CHUNKS = ("Timestamp", "ExposureTime", "Gain", "LineStatusAll", "CounterValue", "PayloadCRC16")
+
+
+class GenericException(Exception):
+    pass
+
+
+class RuntimeException(GenericException):
+    pass
+
+
+class TimeoutException(GenericException):
+    pass
+
+
+def IsWritable(node) -> bool:
+    return getattr(node, "writable", False)
+
+
+def IsReadable(node) -> bool:
+    return getattr(node, "readable", False)
+
+
+class _Node:
+    def __init__(self, value, symbolics=None, writable=True, readable=True, check=None, getter=None):
+        """GenICam feature: symbolics are the valid values of an enumeration, check(value)
+        raises for out of range values, getter computes read only features.
+        """
+        self.default = value
+        self.value = value
+        self.symbolics = symbolics
+        self.writable = writable
+        self.readable = readable
+        self.check = check
+        self.getter = getter
+
+    def _Validate(self, value):
+        if not self.writable:
+            raise GenericException("Node is not writable")
+        if self.symbolics is not None and value not in self.symbolics:
+            raise GenericException("%r is not one of %s" % (value, ", ".join(self.symbolics)))
+        if self.check is not None:
+            self.check(value)
+
+    def GetValue(self):
+        if not self.readable:
+            raise GenericException("Node is not readable")
+        return self.getter() if self.getter is not None else self.value
+
+    def SetValue(self, value):
+        self._Validate(value)
+        self.value = value
+
+    def GetSymbolics(self):
+        return tuple(self.symbolics or ())
+
+    def Reset(self):
+        self.value = self.default
+
+    Value = property(lambda self: self.GetValue(), lambda self, value: self.SetValue(value))
+
+
+class _SelectedNode(_Node):
+    def __init__(self, selector, value, symbolics=None):
+        """Feature with a value for each value of its selector (e.g. ChunkEnable by ChunkSelector)."""
+        _Node.__init__(self, value, symbolics)
+        self.selector = selector
+        self.values = {}
+
+    def GetValue(self):
+        return self.For(self.selector.value)
+
+    def SetValue(self, value):
+        self._Validate(value)
+        self.values[self.selector.value] = value
+
+    def For(self, key):
+        return self.values.get(key, self.default)
+
+    def Reset(self):
+        self.values = {}
+
+
+class _Command:
+    readable = False
+
+    def __init__(self, func, writable=True):
+        self.func = func
+        self.writable = writable
+
+    def Execute(self):
+        if not self.writable:
+            raise GenericException("Command is not available")
+        self.func()
+
+
+# %% SYNTHETIC IMAGES
+
+
+class SyntheticMOT:
+    def __init__(
+        self,
+        kind: str = "fluorescence",
+        center=(1024, 1024),
+        sigma=(60, 60),
+        amplitude: float = 150,
+        PeakOD: float = 1.5,
+        ProbeCounts: float = 180,
+        ProbeCenter=(1024, 1024),
+        ProbeWaist: float = 700,
+        FringeAmplitude: float = 0.05,
+        FringePeriod: float = 40,
+        FringeAngle: float = 0.5,
+        FringeDrift: float = 0.3,
+        background: float = 4,
+        ReadNoise: float = 1.5,
+        CountsPerElectron: float = 0.25,
+        noise: str = "poisson",
+        LoadingTime: float = None,
+        PositionJitter: float = 2,
+        sequence=None,
+        ReferenceExposure: float = 150,
+    ):
+        """Scene seen by an emulated camera, in Mono8 counts at ReferenceExposure [us].
+        kind 'fluorescence': Gaussian cloud (center, sigma [sensor px], amplitude [counts]).
+        kind 'absorption': Gaussian probe beam (ProbeCounts, ProbeCenter, ProbeWaist) with
+        straight fringes (relative FringeAmplitude, FringePeriod [px], FringeAngle [rad],
+        random phase drift FringeDrift [rad] per frame) absorbed by the cloud (PeakOD).
+        sequence: frame types repeated along the acquisition, 'atoms', 'probe' (no atoms)
+        or 'dark'; default ('atoms',) for fluorescence, ('atoms', 'probe', 'dark') for absorption.
+        LoadingTime [s]: the cloud loads as 1 - exp(-t / LoadingTime) from the start of the
+        acquisition (None: steady state). PositionJitter [px]: shot to shot cloud position noise.
+        noise: 'poisson' (photoelectrons, CountsPerElectron), 'gaussian' (same variance, faster)
+        or None; ReadNoise [counts] is added to both.
+        """
+        if kind not in ("fluorescence", "absorption"):
+            raise ValueError("kind must be 'fluorescence' or 'absorption'")
+        if noise not in ("poisson", "gaussian", None):
+            raise ValueError("noise must be 'poisson', 'gaussian' or None")
+        self.kind = kind
+        self.center = center
+        self.sigma = sigma
+        self.amplitude = amplitude
+        self.PeakOD = PeakOD
+        self.ProbeCounts = ProbeCounts
+        self.ProbeCenter = ProbeCenter
+        self.ProbeWaist = ProbeWaist
+        self.FringeAmplitude = FringeAmplitude
+        self.FringePeriod = FringePeriod
+        self.FringeAngle = FringeAngle
+        self.FringeDrift = FringeDrift
+        self.background = background
+        self.ReadNoise = ReadNoise
+        self.CountsPerElectron = CountsPerElectron
+        self.noise = noise
+        self.LoadingTime = LoadingTime
+        self.PositionJitter = PositionJitter
+        self.ReferenceExposure = ReferenceExposure
+        if sequence is None:
+            sequence = ("atoms",) if kind == "fluorescence" else ("atoms", "probe", "dark")
+        self.sequence = tuple(sequence)
+
+    def FrameType(self, FrameIndex: int) -> str:
+        return self.sequence[FrameIndex % len(self.sequence)]
+
+    def Cloud(self, x, y, rng):
+        """Normalized Gaussian cloud on the pixel grid (rows y, columns x)."""
+        x0, y0 = self.center
+        if self.PositionJitter:
+            x0, y0 = np.array([x0, y0]) + rng.normal(0, self.PositionJitter, 2)
+        sx, sy = self.sigma
+        return np.outer(np.exp(-0.5 * ((y - y0) / sy) ** 2), np.exp(-0.5 * ((x - x0) / sx) ** 2))
+
+    def Probe(self, x, y, rng):
+        """Probe beam intensity [counts] with fringes of random phase."""
+        x0, y0 = self.ProbeCenter
+        w = self.ProbeWaist
+        beam = self.ProbeCounts * np.outer(np.exp(-2 * ((y - y0) / w) ** 2), np.exp(-2 * ((x - x0) / w) ** 2))
+        if self.FringeAmplitude:
+            k = 2 * np.pi / self.FringePeriod
+            a = k * np.cos(self.FringeAngle) * x
+            b = k * np.sin(self.FringeAngle) * y + rng.normal(0, self.FringeDrift)
+            ### cos(a + b) as outer products: no trigonometry on the full frame.
+            fringes = np.outer(np.cos(b), np.cos(a)) - np.outer(np.sin(b), np.sin(a))
+            beam *= 1 + self.FringeAmplitude * fringes
+        return beam
+
+    def Expected(self, x, y, FrameIndex: int = 0, t: float = 0, ExposureScale: float = 1, rng=None) -> np.ndarray:
+        """Noiseless counts of frame FrameIndex, t [s] after the start of the acquisition."""
+        rng = np.random.default_rng() if rng is None else rng
+        frame_type = self.FrameType(FrameIndex)
+        loaded = 1 - np.exp(-t / self.LoadingTime) if self.LoadingTime else 1
+        if frame_type == "dark":
+            return np.full((len(y), len(x)), float(self.background))
+        if self.kind == "fluorescence":
+            if frame_type == "probe":
+                return np.full((len(y), len(x)), float(self.background))
+            return self.background + ExposureScale * self.amplitude * loaded * self.Cloud(x, y, rng)
+        light = ExposureScale * self.Probe(x, y, rng)
+        if frame_type == "atoms":
+            light *= np.exp(-self.PeakOD * loaded * self.Cloud(x, y, rng))
+        return self.background + light
+
+    def Render(self, x, y, FrameIndex: int = 0, t: float = 0, ExposureScale: float = 1, rng=None) -> np.ndarray:
+        """Expected counts plus shot and read noise (float32, not clipped)."""
+        rng = np.random.default_rng() if rng is None else rng
+        counts = self.Expected(x, y, FrameIndex, t, ExposureScale, rng)
+        if self.noise == "poisson":
+            counts = rng.poisson(counts / self.CountsPerElectron) * self.CountsPerElectron
+        elif self.noise == "gaussian":
+            counts += rng.standard_normal(counts.shape) * np.sqrt(counts * self.CountsPerElectron)
+        if self.ReadNoise:
+            counts += rng.normal(0, self.ReadNoise, counts.shape)
+        return counts.astype(np.float32)
+
+
+# %% CAMERAS
+
+
+class EmulatedDeviceInfo:
+    def __init__(self, SerialNumber: str, ModelName: str = MODEL_NAME):
+        self.properties = {
+            "SerialNumber": SerialNumber,
+            "ModelName": ModelName,
+            "VendorName": "Basler",
+            "DeviceClass": "BaslerUsb",
+            "FriendlyName": "Basler %s (%s)" % (ModelName, SerialNumber),
+        }
+
+    def GetPropertyValue(self, name):
+        value = self.properties.get(name)
+        return (value is not None, value)
+
+    def GetSerialNumber(self):
+        return self.properties["SerialNumber"]
+
+    def GetModelName(self):
+        return self.properties["ModelName"]
+
+    def GetFriendlyName(self):
+        return self.properties["FriendlyName"]
+
+
+class EmulatedDevice:
+    def __init__(self, info, layer):
+        """Device created by the transport layer, to be attached to an InstantCamera."""
+        self.info = info
+        self.layer = layer
+
+
+class ConfigurationEventHandler:
+    pass
+
+
+class ImageEventHandler:
+    pass
+
+
+class EmulatedGrabResult:
+    def __init__(self, array, BlockID, timestamp, exposure, chunks, succeeded=True, ErrorCode=0, ErrorDescription=""):
+        self.Array = array
+        self.BlockID = BlockID
+        self.ChunkTimestamp = _Node(timestamp, writable=False, readable="Timestamp" in chunks)
+        self.ChunkExposureTime = _Node(exposure, writable=False, readable="ExposureTime" in chunks)
+        self.succeeded = succeeded
+        self.ErrorCode = ErrorCode
+        self.ErrorDescription = ErrorDescription
+
+    def GrabSucceeded(self):
+        return self.succeeded
+
+    def IsValid(self):
+        return self.Array is not None
+
+    def GetArray(self):
+        return self.Array
+
+    @property
+    def Width(self):
+        return self.Array.shape[1]
+
+    @property
+    def Height(self):
+        return self.Array.shape[0]
+
+    def Release(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Release()
+
+
+class EmulatedInstantCamera:
+    def __init__(self, device=None):
+        """InstantCamera with the features used by CameraResources. Features are read with
+        cam.Feature.GetValue() / .Value and written with SetValue() or cam.Feature = value.
+        """
+        object.__setattr__(self, "_nodes", {})
+        self.device = None
+        self.opened = False
+        self.grabbing = False
+        self.strategy = GrabStrategy_OneByOne
+        self.MaxFrames = None  ### Frames to retrieve before the grabbing stops (StartGrabbingMax).
+        self.retrieved = 0
+        self.queue = deque()  ### (exposure start [ns], BlockID) of the frames in the buffers.
+        self.starts = deque()  ### Exposure starts [ns] of the triggered frames still to arrive.
+        self.periodic = None  ### (first exposure start [ns], period [ns]) of free run frames.
+        self.NextPeriodic = 0
+        self.LastStart = None
+        self.NextBlockID = 0
+        self.GrabStart = 0
+        self.LostFrames = 0  ### Frames arrived with full buffers.
+        self.MissedTriggers = 0  ### Triggers arrived before the camera was ready.
+        self._grid = (None, None, None)
+        self._BuildNodes()
+        if device is not None:
+            self.Attach(device)
+
+    def __getattr__(self, name):
+        nodes = object.__getattribute__(self, "_nodes")
+        if name in nodes:
+            return nodes[name]
+        raise AttributeError("Emulated camera has no feature " + name)
+
+    def __setattr__(self, name, value):
+        if name in self._nodes:
+            self._nodes[name].SetValue(value)  ### cam.MaxNumBuffer = 5, as in pypylon.
+        else:
+            object.__setattr__(self, name, value)
+
+    def _BuildNodes(self):
+        n = self._nodes
+        n["UserSetSelector"] = _Node("Default", ("Default", "UserSet1", "UserSet2", "UserSet3"))
+        n["UserSetLoad"] = _Command(self._LoadUserSet)
+        n["AcquisitionMode"] = _Node("Continuous", ("SingleFrame", "Continuous"))
+        n["AcquisitionBurstFrameCount"] = _Node(1, check=_Range(1, 255))
+        n["AcquisitionFrameRateEnable"] = _Node(False)
+        n["AcquisitionFrameRate"] = _Node(100.0, check=_Range(0.1, 1e5))
+        n["ResultingFrameRate"] = _Node(0.0, writable=False, getter=lambda: 1e9 / self._FramePeriod())
+        n["TriggerSelector"] = _Node("FrameStart", ("FrameBurstStart", "FrameStart"))
+        selector = n["TriggerSelector"]
+        n["TriggerMode"] = _SelectedNode(selector, "Off", ("Off", "On"))
+        n["TriggerSource"] = _SelectedNode(selector, "Line1", ("Line1", "Line3", "Line4", "Software"))
+        n["TriggerActivation"] = _SelectedNode(
+            selector, "RisingEdge", ("RisingEdge", "FallingEdge", "AnyEdge", "LevelHigh", "LevelLow")
+        )
+        n["TriggerDelay"] = _SelectedNode(selector, 0.0)
+        n["TriggerSoftware"] = _Command(lambda: self._Trigger("Software"))
+        n["BinningHorizontal"] = _Node(1, check=_Range(1, 4))
+        n["BinningVertical"] = _Node(1, check=_Range(1, 4))
+        n["Width"] = _Node(SENSOR_WIDTH, check=lambda v: self._CheckRoi(v, "OffsetX", "BinningHorizontal", SENSOR_WIDTH))
+        n["Height"] = _Node(SENSOR_HEIGHT, check=lambda v: self._CheckRoi(v, "OffsetY", "BinningVertical", SENSOR_HEIGHT))
+        n["OffsetX"] = _Node(0, check=lambda v: self._CheckRoi(v, "Width", "BinningHorizontal", SENSOR_WIDTH))
+        n["OffsetY"] = _Node(0, check=lambda v: self._CheckRoi(v, "Height", "BinningVertical", SENSOR_HEIGHT))
+        n["PixelFormat"] = _Node("Mono8", tuple(PIXEL_FORMATS))
+        n["SensorReadoutTime"] = _Node(0.0, writable=False, getter=lambda: self._ReadoutNs() / 1000)
+        n["Gain"] = _Node(0.0, check=_Range(0, 36))
+        n["ExposureMode"] = _Node("Timed", ("Timed", "TriggerWidth"))
+        n["ExposureTime"] = _Node(10000.0, check=_Range(10, 1e7))
+        n["ChunkModeActive"] = _Node(False)
+        n["ChunkSelector"] = _Node("Timestamp", CHUNKS)
+        n["ChunkEnable"] = _SelectedNode(n["ChunkSelector"], False)
+        n["TimestampLatch"] = _Command(self._Latch)
+        n["TimestampLatchValue"] = _Node(0, writable=False)
+        n["MaxNumBuffer"] = _Node(10, check=_Range(1, 10000))
+
+    def _CheckRoi(self, value, other, binning, size):
+        if value < 0 or value + self._nodes[other].value > size // self._nodes[binning].value:
+            raise GenericException("Value %r out of range of the sensor" % value)
+
+    def _LoadUserSet(self):
+        for name, node in self._nodes.items():
+            if isinstance(node, _Node) and name != "UserSetSelector":
+                node.Reset()
+
+    # Device
+
+    def Attach(self, device):
+        self.device = device
+        device.layer.cameras.append(self)
+
+    def DetachDevice(self):
+        if self.device is not None and self in self.device.layer.cameras:
+            self.device.layer.cameras.remove(self)
+        self.device = None
+
+    def IsPylonDeviceAttached(self):
+        return self.device is not None
+
+    def GetDeviceInfo(self):
+        return self.device.info
+
+    def RegisterConfiguration(self, handler, mode, cleanup):
+        pass
+
+    def RegisterImageEventHandler(self, handler, mode, cleanup):
+        pass
+
+    def Open(self):
+        if self.device is None:
+            raise RuntimeException("No device is attached")
+        self.opened = True
+
+    def Close(self):
+        self.StopGrabbing()
+        self.opened = False
+
+    def IsOpen(self):
+        return self.opened
+
+    # Timing
+
+    @property
+    def layer(self):
+        return self.device.layer
+
+    @property
+    def scene(self):
+        return self.layer.Scene(self.device.info.GetSerialNumber())
+
+    def _CameraTime(self, host_ns):
+        ### Camera clock [ns]: counts from the power up of the emulated camera.
+        return host_ns - self.layer.BootTime
+
+    def _Latch(self):
+        self._nodes["TimestampLatchValue"].value = self._CameraTime(self.layer.Now())
+
+    def _ExposureNs(self):
+        return int(self._nodes["ExposureTime"].value * 1000)
+
+    def _ReadoutNs(self):
+        return int(self._nodes["Height"].value * self._nodes["BinningVertical"].value * ROW_TIME_US * 1000)
+
+    def _FramePeriod(self):
+        ### Overlapped exposure: the sensor is ready for the next frame after the longer of the two.
+        period = max(self._ExposureNs(), self._ReadoutNs())
+        if self._nodes["AcquisitionFrameRateEnable"].value:
+            period = max(period, int(1e9 / self._nodes["AcquisitionFrameRate"].value))
+        return period
+
+    # Grabbing
+
+    def StartGrabbing(self, strategy=None):
+        if not self.opened:
+            raise RuntimeException("The camera is not open")
+        self.strategy = GrabStrategy_OneByOne if strategy is None else strategy
+        self.MaxFrames = None
+        self.retrieved = 0
+        self.queue.clear()
+        self.starts.clear()
+        self.NextPeriodic = 0
+        self.LastStart = None
+        self.NextBlockID = 0
+        self.GrabStart = self.layer.Now()
+        self.grabbing = True
+        self.periodic = None
+        source = self._ActiveTrigger()
+        if source is None or (source.startswith("Line") and self.layer.HardwareTrigger == "auto"):
+            delay = int(self._TriggerDelay() * 1000) if source is not None else 0
+            self.periodic = (self.GrabStart + delay, self._FramePeriod())
+
+    def StartGrabbingMax(self, NumOfFrames, strategy=None):
+        self.StartGrabbing(strategy)
+        self.MaxFrames = NumOfFrames
+
+    def StopGrabbing(self):
+        self.grabbing = False
+        self.periodic = None
+        self.starts.clear()
+
+    def IsGrabbing(self):
+        return self.grabbing
+
+    def _ActiveTrigger(self):
+        ### Source of the active trigger, None in free run.
+        mode, source = self._nodes["TriggerMode"], self._nodes["TriggerSource"]
+        for selector in ("FrameStart", "FrameBurstStart"):
+            if mode.For(selector) == "On":
+                return source.For(selector)
+        return None
+
+    def _TriggerDelay(self):
+        mode = self._nodes["TriggerMode"]
+        selector = "FrameStart" if mode.For("FrameStart") == "On" else "FrameBurstStart"
+        return self._nodes["TriggerDelay"].For(selector)
+
+    def _Trigger(self, source, NumOfPulses=None, period=None, when=None):
+        """Trigger pulses on source at the time when [ns] (now by default)."""
+        if not self.grabbing or self._ActiveTrigger() != source:
+            return
+        when = self.layer.Now() if when is None else when
+        min_period = self._FramePeriod()
+        period = min_period if period is None else max(int(period), 1)
+        burst = self._nodes["TriggerMode"].For("FrameStart") != "On"
+        if NumOfPulses is None:
+            ### An AWG waveform sends one pulse per requested picture.
+            if burst or self.MaxFrames is None:
+                NumOfPulses = 1
+            else:
+                NumOfPulses = max(self.MaxFrames - self.retrieved - len(self.queue) - len(self.starts), 1)
+        frames_per_pulse = self._nodes["AcquisitionBurstFrameCount"].value if burst else 1
+        delay = int(self._TriggerDelay() * 1000)
+        for k in range(NumOfPulses):
+            start = when + k * period + delay
+            for j in range(frames_per_pulse):
+                if self.LastStart is not None and start < self.LastStart + min_period:
+                    if j == 0:
+                        self.MissedTriggers += 1
+                        break
+                    start = self.LastStart + min_period
+                self.starts.append(start)
+                self.LastStart = start
+
+    def ExecuteSoftwareTrigger(self):
+        self._Trigger("Software")
+
+    def WaitForFrameTriggerReady(self, timeout, handling=None):
+        return True
+
+    def _NextStart(self):
+        if self.starts:
+            return self.starts[0]
+        if self.periodic is not None:
+            return self.periodic[0] + self.NextPeriodic * self.periodic[1]
+        return None
+
+    def _PopStart(self):
+        if self.starts:
+            return self.starts.popleft()
+        self.NextPeriodic += 1
+        return self.periodic[0] + (self.NextPeriodic - 1) * self.periodic[1]
+
+    def _Arrive(self, now):
+        ### Move the frames read out before now into the buffers.
+        duration = self._ExposureNs() + self._ReadoutNs()
+        while True:
+            start = self._NextStart()
+            if start is None or start + duration > now:
+                return
+            self._PopStart()
+            block = self.NextBlockID
+            self.NextBlockID += 1
+            if self.strategy == GrabStrategy_LatestImageOnly:
+                self.queue.clear()
+            elif len(self.queue) >= self._nodes["MaxNumBuffer"].value:
+                self.LostFrames += 1
+                continue
+            self.queue.append((start, block))
+
+    def GetNumReadyBuffers(self):
+        if self.grabbing:
+            self._Arrive(self.layer.Now())
+        return len(self.queue)
+
+    def RetrieveResult(self, timeout, handling=None):
+        """Wait up to timeout [ms] for the next frame."""
+        if not self.grabbing:
+            raise RuntimeException("The grab engine is not running")
+        handling = TimeoutHandling_ThrowException if handling is None else handling
+        layer = self.layer
+        deadline = layer.Now() + int(timeout * 1e6)
+        duration = self._ExposureNs() + self._ReadoutNs()
+        while True:
+            now = layer.Now()
+            self._Arrive(now)
+            if self.queue:
+                break
+            start = self._NextStart()
+            target = deadline if start is None else min(start + duration, deadline)
+            if now >= deadline:
+                if handling == TimeoutHandling_ThrowException:
+                    raise TimeoutException("Grab timed out after %d ms" % timeout)
+                return EmulatedGrabResult(None, -1, -1, np.nan, (), False, 0xE1000014, "Timeout")
+            ### Short steps when nothing is scheduled: FireLine() may come from another thread.
+            layer.WaitUntil(target if start is not None else min(target, now + 2_000_000))
+        start, block = self.queue.popleft()
+        self.retrieved += 1
+        if self.MaxFrames is not None and self.retrieved >= self.MaxFrames:
+            self.StopGrabbing()
+        exposure = self._nodes["ExposureTime"].value
+        chunks = ()
+        if self._nodes["ChunkModeActive"].value:
+            chunks = tuple(c for c in CHUNKS if self._nodes["ChunkEnable"].For(c))
+        image = self._Render(block, (start - self.GrabStart) * 1e-9)
+        return EmulatedGrabResult(image, block, self._CameraTime(start), exposure, chunks)
+
+    def _Render(self, FrameIndex, t):
+        n = self._nodes
+        bx, by = n["BinningHorizontal"].value, n["BinningVertical"].value
+        key = (n["OffsetX"].value, n["OffsetY"].value, n["Width"].value, n["Height"].value, bx, by)
+        if self._grid[0] != key:
+            ### Sensor coordinates of the centers of the (binned) pixels.
+            x = (n["OffsetX"].value + np.arange(n["Width"].value) + 0.5) * bx
+            y = (n["OffsetY"].value + np.arange(n["Height"].value) + 0.5) * by
+            self._grid = (key, x, y)
+        _, x, y = self._grid
+        scene = self.scene
+        counts = scene.Render(x, y, FrameIndex, t, n["ExposureTime"].value / scene.ReferenceExposure, self.layer.rng)
+        dtype, max_value = PIXEL_FORMATS[n["PixelFormat"].value]
+        counts *= 10 ** (n["Gain"].value / 20) * (max_value + 1) / 256
+        np.clip(counts, 0, max_value, out=counts)
+        return np.rint(counts).astype(dtype)
+
+
+class InstantCameraArray:
+    def __init__(self, NumOfCameras):
+        self.cameras = [EmulatedInstantCamera() for _ in range(NumOfCameras)]
+
+    def __iter__(self):
+        return iter(self.cameras)
+
+    def __getitem__(self, index):
+        return self.cameras[index]
+
+    def __len__(self):
+        return len(self.cameras)
+
+    def GetSize(self):
+        return len(self.cameras)
+
+    def Open(self):
+        for cam in self.cameras:
+            cam.Open()
+
+    def Close(self):
+        for cam in self.cameras:
+            cam.Close()
+
+    def DetachDevice(self):
+        for cam in self.cameras:
+            cam.DetachDevice()
+
+    def IsPylonDeviceAttached(self):
+        return any(cam.IsPylonDeviceAttached() for cam in self.cameras)
+
+    def StartGrabbing(self, strategy=None):
+        for cam in self.cameras:
+            cam.StartGrabbing(strategy)
+
+    def StopGrabbing(self):
+        for cam in self.cameras:
+            cam.StopGrabbing()
+
+    def IsGrabbing(self):
+        return any(cam.IsGrabbing() for cam in self.cameras)
+
+
+class EmulatedTransportLayer:
+    _instance = None
+
+    def __init__(
+        self,
+        SerialNumbers=DEFAULT_SERIAL_NUMBERS,
+        scenes=None,
+        realtime: bool = True,
+        HardwareTrigger: str = "auto",
+        seed=None,
+    ):
+        """Stand-in of pylon.TlFactory with one emulated camera per serial number.
+        scenes: {serial number: SyntheticMOT}, a fluorescence SyntheticMOT by default.
+        realtime: frames come at their real time, otherwise the emulator clock jumps
+        to the next frame (HostTime of the frames then no longer matches the camera time).
+        HardwareTrigger: 'auto' or 'external' (see the module docstring).
+        """
+        if HardwareTrigger not in ("auto", "external"):
+            raise ValueError("HardwareTrigger must be 'auto' or 'external'")
+        self.devices = tuple(EmulatedDeviceInfo(sn) for sn in SerialNumbers)
+        self.scenes = dict(scenes or {})
+        self.realtime = realtime
+        self.HardwareTrigger = HardwareTrigger
+        self.rng = np.random.default_rng(seed)
+        self.cameras = []  ### Attached cameras, for FireLine().
+        self.clock = time.monotonic_ns()  ### Emulator clock when not realtime.
+        self.BootTime = self.clock - int(self.rng.integers(1, 3600)) * 1_000_000_000
+
+    @classmethod
+    def GetInstance(cls):
+        if cls._instance is None:
+            n = int(os.environ.get("MOT_EMULATED_CAMERAS", len(DEFAULT_SERIAL_NUMBERS)))
+            cls._instance = cls(SerialNumbers=["%08d" % (12345670 + k) for k in range(n)])
+        return cls._instance
+
+    def EnumerateDevices(self):
+        return self.devices
+
+    def CreateDevice(self, info):
+        return EmulatedDevice(info, self)
+
+    def CreateFirstDevice(self):
+        if not self.devices:
+            raise RuntimeException("No camera present.")
+        return EmulatedDevice(self.devices[0], self)
+
+    def Scene(self, SerialNumber):
+        if SerialNumber not in self.scenes:
+            self.scenes[SerialNumber] = SyntheticMOT()
+        return self.scenes[SerialNumber]
+
+    def Now(self):
+        """Emulator time [ns] on the host monotonic clock."""
+        return time.monotonic_ns() if self.realtime else self.clock
+
+    def WaitUntil(self, t_ns):
+        if self.realtime:
+            dt = t_ns - time.monotonic_ns()
+            if dt > 0:
+                time.sleep(dt * 1e-9)
+        else:
+            self.clock = max(self.clock, t_ns)
+
+    def FireLine(self, line: str = "Line3", NumOfPulses=None, period=None):
+        """Pulse the trigger input line of all the cameras. NumOfPulses defaults to the
+        pictures still to be acquired (one per burst with FrameBurstStart), period [ns] to
+        the shortest frame period of each camera.
+        """
+        now = self.Now()
+        for cam in self.cameras:
+            cam._Trigger(line, NumOfPulses, period, now)
+
+
+def Configure(**kwargs) -> EmulatedTransportLayer:
+    """Replace the transport layer returned by pylon.TlFactory.GetInstance(), e.g.
+    Configure(scenes = {'12345672': SyntheticMOT('absorption')}, realtime = False).
+    Must be called before TransportLayerCreator().
+    """
+    EmulatedTransportLayer._instance = EmulatedTransportLayer(**kwargs)
+    return EmulatedTransportLayer._instance
+
+
+def ConnectAWG(rm, line: str = "Line3", NumOfPulses=None, period=None, layer=None):
+    """Fire line of the emulated cameras on every *TRG of the AWGs of a
+    SimulatedInstruments.SimulatedResourceManager rm (HardwareTrigger becomes 'external').
+    """
+    layer = EmulatedTransportLayer.GetInstance() if layer is None else layer
+    layer.HardwareTrigger = "external"
+    rm.TriggerListeners.append(lambda resource_name: layer.FireLine(line, NumOfPulses, period))
+    return layer
+
+
+def _Range(minimum, maximum):
+    def check(value):
+        if not minimum <= value <= maximum:
+            raise GenericException("Value %r out of range [%r, %r]" % (value, minimum, maximum))
+
+    return check
+
+
+# %% NAMESPACES
+
+RegistrationMode_Append = 0
+RegistrationMode_ReplaceAll = 1
+Cleanup_None = 0
+Cleanup_Delete = 1
+TimeoutHandling_Return = 0
+TimeoutHandling_ThrowException = 1
+GrabStrategy_OneByOne = 0
+GrabStrategy_LatestImageOnly = 1
+
+genicam = types.SimpleNamespace(
+    IsWritable=IsWritable,
+    IsReadable=IsReadable,
+    GenericException=GenericException,
+    RuntimeException=RuntimeException,
+    TimeoutException=TimeoutException,
+)
+
+pylon = types.SimpleNamespace(
+    TlFactory=EmulatedTransportLayer,
+    InstantCamera=EmulatedInstantCamera,
+    InstantCameraArray=InstantCameraArray,
+    ConfigurationEventHandler=ConfigurationEventHandler,
+    ImageEventHandler=ImageEventHandler,
+    RegistrationMode_Append=RegistrationMode_Append,
+    RegistrationMode_ReplaceAll=RegistrationMode_ReplaceAll,
+    Cleanup_None=Cleanup_None,
+    Cleanup_Delete=Cleanup_Delete,
+    TimeoutHandling_Return=TimeoutHandling_Return,
+    TimeoutHandling_ThrowException=TimeoutHandling_ThrowException,
+    GrabStrategy_OneByOne=GrabStrategy_OneByOne,
+    GrabStrategy_LatestImageOnly=GrabStrategy_LatestImageOnly,
+    GenericException=GenericException,
+    RuntimeException=RuntimeException,
+    RUNTIME_EXCEPTION=RuntimeException,
+    TimeoutException=TimeoutException,
+)
+
+
+# %%
+"""
+### In a script, before TransportLayerCreator() (or set MOT_CAMERA_BACKEND=emulated)
+import EmulatedCameras
+EmulatedCameras.Configure(scenes = {'12345672': EmulatedCameras.SyntheticMOT(LoadingTime = 1.5)}, realtime = False)
+TLF = TransportLayerCreator()
+MCS = MultipleCameraSession(TLF, NumOfCamsConnected = 3)
+
+### Frames on the *TRG of the simulated AWGs
+Mg = ResourceManagerCreator(rm = SimulatedResourceManager())
+EmulatedCameras.ConnectAWG(Mg.rm)
+"""
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:12:40 2026
+
+@author: MOT_User
+
+Optimal reference image reconstruction (fringe removal) for absorption imaging.
+Each absorption frame is compared with the best linear combination of a library
+of bright frames, fitted on the pixels outside the atom ROI only. The fringes
+of the probe are then present in both the absorption and the reconstructed
+reference and cancel in the optical density.
+"""
+
+import numpy as np
+from AnalysysBMP_Exp import OpticalDensity
+
+# %% GENERAL FUNCTIONS
+
+
+def RectangularMask(shape, row_lims, col_lims):
+    """Boolean mask of the given shape, True inside row_lims x col_lims.
+    Lims are two value lists [-,-], as in Image_Matrix.
+    """
+    mask = np.zeros(shape, dtype=bool)
+    mask[row_lims[0] : row_lims[1], col_lims[0] : col_lims[1]] = True
+    return mask
+
+
+def _AsStack(frames):
+    """Stack of frames as a float64 array (frame, row, col)."""
+    stack = np.asarray(frames, dtype=np.float64)
+    if stack.ndim == 2:
+        stack = stack[np.newaxis]
+    return stack
+
+
+# %% CLASS
+
+
+class OptimalReference:
+    def __init__(self, BrightFrames, AtomMask, ImgDark=None, NumOfComponents=None, rcond=1e-10):
+        """Library of bright (probe only) frames used to rebuild the reference of every shot.
+        AtomMask is True on the pixels where atoms can be (excluded from the fit).
+        ImgDark is subtracted from every frame. NumOfComponents limits the basis to the
+        first principal components of the library (all by default).
+        The decomposition of the library is computed once and cached until the library
+        or the mask change.
+        """
+        self.dark = None if ImgDark is None else np.asarray(ImgDark, dtype=np.float64)
+        self.mask = np.asarray(AtomMask, dtype=bool)
+        self.NumOfComponents = NumOfComponents
+        self.rcond = rcond
+        self.library = np.empty((0,) + self.mask.shape)
+        self.weights = None  ### Cached projector from the masked pixels to the library coefficients.
+        self.singular_values = None
+        self.AddBrightFrames(BrightFrames)
+
+    def AddBrightFrames(self, BrightFrames):
+        """Add frames to the library. The cached decomposition is rebuilt at the next shot."""
+        stack = self._Prepare(BrightFrames)
+        if stack.shape[1:] != self.mask.shape:
+            raise ValueError("Bright frames and atom mask must have the same shape")
+        self.library = np.concatenate((self.library, stack))
+        self.weights = None
+
+    def SetAtomMask(self, AtomMask):
+        """Change the excluded region and invalidate the cached decomposition."""
+        mask = np.asarray(AtomMask, dtype=bool)
+        if mask.shape != self.library.shape[1:]:
+            raise ValueError("Atom mask and bright frames must have the same shape")
+        self.mask = mask
+        self.weights = None
+
+    def _Prepare(self, frames):
+        stack = _AsStack(frames)
+        if self.dark is not None:
+            stack = stack - self.dark
+        return stack
+
+    def Decompose(self):
+        """SVD of the library restricted to the pixels outside the atom mask.
+        Stores the least-squares projector from those pixels to the library coefficients.
+        """
+        bkg_px = ~self.mask.ravel()
+        lib = self.library.reshape(len(self.library), -1)[:, bkg_px]  ### (frames, pixels)
+        u, s, vt = np.linalg.svd(lib, full_matrices=False)
+        keep = s > self.rcond * s[0]
+        if self.NumOfComponents is not None:
+            keep[self.NumOfComponents :] = False
+        ### Coefficients c of a frame a (masked pixels): c = U S^-1 Vt a
+        self.weights = (u[:, keep] / s[keep]) @ vt[keep]  ### (frames, masked pixels)
+        self.singular_values = s
+        return self.weights
+
+    def Coefficients(self, ImgAbs):
+        """Library coefficients of every frame of the stack ImgAbs (shots, frames)."""
+        if self.weights is None:
+            self.Decompose()
+        stack = self._Prepare(ImgAbs)
+        bkg_px = ~self.mask.ravel()
+        return stack.reshape(len(stack), -1)[:, bkg_px] @ self.weights.T
+
+    def Reconstruct(self, ImgAbs):
+        """Best reference for every frame of ImgAbs (dark subtracted), same shape as the stack."""
+        stack = _AsStack(ImgAbs)
+        coeff = self.Coefficients(stack)
+        ref = coeff @ self.library.reshape(len(self.library), -1)
+        return ref.reshape(stack.shape)
+
+    def OpticalDensity(self, ImgAbs):
+        """Optical density of every frame of ImgAbs computed against its reconstructed reference."""
+        stack = self._Prepare(ImgAbs)
+        return OpticalDensity(stack, self.Reconstruct(ImgAbs))
+
+    def Residual(self, ImgAbs):
+        """RMS residual of the reconstruction outside the atom mask, one value per frame.
+        Useful to choose NumOfComponents.
+        """
+        stack = self._Prepare(ImgAbs)
+        diff = (stack - self.Reconstruct(ImgAbs))[:, ~self.mask]
+        return np.sqrt(np.mean(diff**2, axis=1))
+
+    def Save(self, FileName):
+        """Save library, mask, dark frame and decomposition to a .npz file."""
+        if self.weights is None:
+            self.Decompose()
+        np.savez(
+            FileName,
+            library=self.library,
+            mask=self.mask,
+            dark=np.zeros(0) if self.dark is None else self.dark,
+            weights=self.weights,
+            NumOfComponents=-1 if self.NumOfComponents is None else self.NumOfComponents,
+            rcond=self.rcond,
+        )
+
+
+def LoadOptimalReference(FileName):
+    """Return the OptimalReference saved by OptimalReference.Save(), with its cached basis."""
+    data = np.load(FileName)
+    num = int(data["NumOfComponents"])
+    ### The library is saved dark subtracted: the dark frame is set after loading it.
+    ref = OptimalReference(
+        data["library"],
+        data["mask"],
+        NumOfComponents=None if num < 0 else num,
+        rcond=float(data["rcond"]),
+    )
+    ref.dark = data["dark"] if data["dark"].size else None
+    ref.weights = data["weights"]
+    return ref
+
+
+# %%
+"""
+Bkg_probe_dark_mx = Image_Matrix(ImageName = 'Cam0_0_0.bmp', folder_path = folder_path + '\\' + 'Background')
+Bright = [Image_Matrix(ImageName = 'Cam0_%d_0_1.bmp' %i, folder_path = folder_path).image for i in range(100)]
+Probe = [Image_Matrix(ImageName = 'Cam0_%d_0_0.bmp' %i, folder_path = folder_path).image for i in range(100)]
+OptRef = OptimalReference(Bright, RectangularMask(Bright[0].shape, [80, 160], [40, 130]), ImgDark = Bkg_probe_dark_mx.image)
+Probe_opt_imgs = OptRef.OpticalDensity(Probe)
+"""
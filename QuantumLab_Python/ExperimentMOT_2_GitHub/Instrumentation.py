@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 09:27:44 2026
+
+@author: MOT_User
+
+Timing of the shot cycle. Spans measured with time.perf_counter_ns() around
+the methods of the instrument classes (ResourceSession, AWGSession,
+MultipleCameraSession, ...) and around the phases of the scripts, aggregated
+per name into p50/p95/max tables at the end of a run.
+
+Disabled (the default) it costs nothing on the methods: they are wrapped only
+by Enable() and restored by Disable(). A disabled Span() is a shared empty
+context manager.
+"""
+
+import contextlib
+import csv
+import functools
+import inspect
+import time
+from array import array
+
+import numpy as np
+
+# %% GENERAL FUNCTIONS
+
+TIMING_DTYPE = np.dtype(
+    [
+        ("name", "U64"),
+        ("count", np.int64),
+        ("total_ms", np.float64),
+        ("mean_ms", np.float64),
+        ("p50_ms", np.float64),
+        ("p95_ms", np.float64),
+        ("max_ms", np.float64),
+    ]
+)
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+# %% CLASS
+
+
+class ShotProfiler:
+    def __init__(self):
+        """Durations [ns] of every span, by name. Use the module instance Profiler."""
+        self.enabled = False
+        self.durations = {}  ### name: array of durations [ns].
+        self.live = None
+        self._patched = {}  ### (class, method name): original function.
+
+    def Enable(self, *classes, live=None):
+        """Start timing and wrap the public methods of classes (e.g. AWGSession,
+        MultipleCameraSession). live is a RunLog: every span is also recorded
+        there as a 'span' record (name, ns) while the run goes on.
+        """
+        self.enabled = True
+        self.live = live
+        for cls in classes:
+            for name, func in list(vars(cls).items()):
+                if name.startswith("_") or not inspect.isfunction(func) or (cls, name) in self._patched:
+                    continue
+                self._patched[(cls, name)] = func
+                setattr(cls, name, self._Wrap(func, cls.__name__ + "." + name))
+
+    def Disable(self):
+        """Stop timing and restore the original methods. The collected durations are kept."""
+        for (cls, name), func in self._patched.items():
+            setattr(cls, name, func)
+        self._patched = {}
+        self.enabled = False
+        self.live = None
+
+    def Reset(self):
+        self.durations = {}
+
+    def _Wrap(self, func, span_name):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.Add(span_name, time.perf_counter_ns() - t0)
+
+        return timed
+
+    def Add(self, name, duration_ns):
+        if name not in self.durations:
+            self.durations[name] = array("q")
+        self.durations[name].append(duration_ns)
+        if self.live is not None:
+            self.live.Record("span", name=name, ns=duration_ns)
+
+    def Span(self, name):
+        """Context manager timing a phase of the script:
+        with Profiler.Span('retrieve'): ...
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def Timed(self, name=None):
+        """Decorator version of Span for script functions (checked at every call)."""
+
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def timed(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, span_name):
+                    return func(*args, **kwargs)
+
+            return timed
+
+        return decorator
+
+    def Summary(self) -> np.ndarray:
+        """One TIMING_DTYPE row per span name, sorted by total time."""
+        out = np.zeros(len(self.durations), dtype=TIMING_DTYPE)
+        for k, (name, values) in enumerate(self.durations.items()):
+            ms = np.frombuffer(values, dtype=np.int64) * 1e-6
+            out[k] = (name, len(ms), ms.sum(), ms.mean(), *np.percentile(ms, [50, 95]), ms.max())
+        return np.sort(out, order="total_ms")[::-1]
+
+    def Histogram(self, name, bins=20):
+        """(counts, bin edges [ms]) of the durations of a span."""
+        return np.histogram(np.frombuffer(self.durations[name], dtype=np.int64) * 1e-6, bins=bins)
+
+    def Report(self):
+        """Print the summary table."""
+        print("%-50s %7s %10s %9s %9s %9s %9s" % ("span", "count", "total[ms]", "mean", "p50", "p95", "max"))
+        for row in self.Summary():
+            print("%-50s %7d %10.1f %9.3f %9.3f %9.3f %9.3f" % tuple(row))
+
+    def Export(self, FileName):
+        """Write the summary table to a CSV file."""
+        with open(FileName, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(TIMING_DTYPE.names)
+            writer.writerows(self.Summary().tolist())
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "t0")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.Add(self.name, time.perf_counter_ns() - self.t0)
+        return False
+
+
+Profiler = ShotProfiler()
+
+
+# %%
+"""
+Profiler.Enable(AWGSession, OscilloscopeSession, MultipleCameraSession, live = Log)
+with Profiler.Span('preload'):
+    time.sleep(random_sleep)
+Profiler.Report()
+Profiler.Export(folder_path + '\\' + 'Timing.csv')
+Profiler.Disable()
+"""
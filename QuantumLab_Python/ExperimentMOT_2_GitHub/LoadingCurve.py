@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:41:36 2026
+
+@author: MOT_User
+
+Loading-curve engine for MOT lifetime / background pressure measurements.
+Every frame burst is reduced to N(t) (ROI sums on the chunk timestamps) as soon
+as it is retrieved, so the frames themselves do not need to be kept or saved.
+All the runs are then fitted with the SaturatedExp loading model in one batch
+(see SweepFit.FitMany) and the loss rate is converted to a background pressure.
+The result is one row per run (see LOADING_DTYPE), written to CSV.
+
+Background pressure from the loss rate g = 1/tau of the loading curve:
+    g = n <sigma v>,    P = n k_B T = g k_B T / LossCoefficient
+LossCoefficient = <sigma v> [m^3/s] depends on the background gas and has to be
+calibrated. The default 1.5e-15 m^3/s gives the common estimate
+P [mbar] ~ 2.7e-8 / tau [s].
+
+NOTE: on Windows, scripts calling Fit() with processes > 1 must guard the call
+with if __name__ == '__main__'.
+"""
+
+import numpy as np
+from SweepFit import FitMany, WriteTable
+from TimeSeries import RoiSums, TimeBase
+
+# %% GENERAL FUNCTIONS
+
+K_BOLTZMANN = 1.380649e-23  ### J/K
+PA_TO_MBAR = 1e-2
+
+LOADING_DTYPE = np.dtype(
+    [
+        ("run", np.int64),
+        ("N", np.float64),  ### Steady state signal.
+        ("N_err", np.float64),
+        ("g", np.float64),  ### Loss rate = 1/tau [1/s].
+        ("g_err", np.float64),
+        ("c", np.float64),
+        ("c_err", np.float64),
+        ("R", np.float64),  ### Initial loading rate N g [a.u./s].
+        ("R_err", np.float64),
+        ("tau", np.float64),  ### Loading time [s].
+        ("tau_err", np.float64),
+        ("P_mbar", np.float64),
+        ("P_mbar_err", np.float64),
+        ("redchi2", np.float64),
+        ("npoints", np.int64),
+        ("duration", np.float64),  ### Time between the first and the last frame [s].
+        ("success", bool),
+    ]
+)
+
+
+def PressureFromLossRate(g, LossCoefficient: float = 1.5e-15, Temperature: float = 295):
+    """Background pressure [mbar] for a loss rate g [1/s], see the module docstring."""
+    return np.asarray(g) * K_BOLTZMANN * Temperature / LossCoefficient * PA_TO_MBAR
+
+
+def ExtractLoadingCurve(
+    frames, timestamps=None, FrameRate: float = None, ImgBkg=None, row_lims="none", col_lims="none", scale: float = 1
+):
+    """N(t) of one burst: returns (time base [s], ROI sums).
+    Times come from the chunk timestamps [ns] (e.g. MCS.CamNameToTimestampList[cam]),
+    from FrameRate if the timestamps are missing.
+    """
+    N = RoiSums(frames, ImgBkg, row_lims, col_lims, scale)
+    if timestamps is not None and all(ts is not None for ts in timestamps):
+        return TimeBase(len(N), timestamps=timestamps), N
+    if FrameRate is None:
+        raise ValueError("FrameRate is needed for frames without timestamps")
+    return TimeBase(len(N), FrameRate), N
+
+
+# %% CLASS
+
+
+class LoadingCurveEngine:
+    def __init__(
+        self,
+        FrameRate: float = None,
+        ImgBkg=None,
+        row_lims="none",
+        col_lims="none",
+        scale: float = 1,
+        LossCoefficient: float = 1.5e-15,
+        Temperature: float = 295,
+    ):
+        """Collects the loading curves of many runs and fits them in one batch.
+        Only N(t) of each run is stored. FrameRate is used for bursts without timestamps.
+        """
+        self.FrameRate = FrameRate
+        self.ImgBkg = ImgBkg
+        self.row_lims = row_lims
+        self.col_lims = col_lims
+        self.scale = scale
+        self.LossCoefficient = LossCoefficient
+        self.Temperature = Temperature
+        self.curves = []  ### List of (time base, N) of each run.
+        self.table = None
+
+    def AddRun(self, frames, timestamps=None):
+        """Reduce a frame burst to its loading curve, returns the run index."""
+        self.curves.append(
+            ExtractLoadingCurve(
+                frames, timestamps, self.FrameRate, self.ImgBkg, self.row_lims, self.col_lims, self.scale
+            )
+        )
+        return len(self.curves) - 1
+
+    def AddCurve(self, time_base, N):
+        """Add an already extracted loading curve (e.g. reprocessed from an old table)."""
+        self.curves.append((np.asarray(time_base, dtype=np.float64), np.asarray(N, dtype=np.float64)))
+        return len(self.curves) - 1
+
+    def Fit(self, processes=None) -> np.ndarray:
+        """SaturatedExp fit of every run (in parallel over processes), returns LOADING_DTYPE rows."""
+        fits = FitMany([[curve] for curve in self.curves], "saturated_exp", processes=processes)
+        out = np.zeros(len(fits), dtype=LOADING_DTYPE)
+        out["run"] = fits["group"]
+        for name in ("N", "N_err", "g", "g_err", "c", "c_err", "redchi2", "npoints", "success"):
+            out[name] = fits[name]
+        out["R"] = fits["N"] * fits["g"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["R_err"] = np.abs(out["R"]) * np.hypot(fits["N_err"] / fits["N"], fits["g_err"] / fits["g"])
+            out["tau"] = 1 / fits["g"]
+            out["tau_err"] = fits["g_err"] / fits["g"] ** 2
+        out["P_mbar"] = PressureFromLossRate(fits["g"], self.LossCoefficient, self.Temperature)
+        out["P_mbar_err"] = PressureFromLossRate(fits["g_err"], self.LossCoefficient, self.Temperature)
+        out["duration"] = [t[-1] - t[0] if len(t) else np.nan for t, _ in self.curves]
+        self.table = out
+        return out
+
+    def Save(self, FileName, curves: bool = True):
+        """Write the results table to FileName (CSV) and, if curves, the N(t) of every run
+        to FileName with .npz extension.
+        """
+        if self.table is None or len(self.table) != len(self.curves):
+            self.Fit()
+        WriteTable(self.table, FileName)
+        if curves:
+            arrays = {}
+            for k, (t, N) in enumerate(self.curves):
+                arrays["t_%d" % k] = t
+                arrays["N_%d" % k] = N
+            np.savez(FileName.rsplit(".", 1)[0] + ".npz", **arrays)
+
+
+def LoadCurves(FileName):
+    """Return a LoadingCurveEngine with the curves saved by LoadingCurveEngine.Save()."""
+    data = np.load(FileName)
+    engine = LoadingCurveEngine()
+    for k in range(len(data.files) // 2):
+        engine.AddCurve(data["t_%d" % k], data["N_%d" % k])
+    return engine
+
+
+# %%
+"""
+Engine = LoadingCurveEngine(FrameRate = 200, ImgBkg = Bkg_Cam_mx.image, scale = 1000)
+MCS.RetrievePictures(CamNameToPicNum, ListOfCamerasToBeTriggered)
+Engine.AddRun(MCS.CamNameToImageList['Cam2'], MCS.CamNameToTimestampList['Cam2'])
+if __name__ == '__main__':
+    Results = Engine.Fit()
+    Engine.Save(folder_path + '\\' + 'Loading_results.csv')
+    plt.errorbar(Results['run'], Results['P_mbar'], yerr = Results['P_mbar_err'], fmt = 'o')
+"""
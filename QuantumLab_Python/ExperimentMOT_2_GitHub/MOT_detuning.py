@@ -17,7 +17,7 @@ import time
 ### Standard library imports
 import matplotlib.pyplot as plt
 import numpy as np
-from AnalysysBMP_Exp import Image_Matrix, SubtractImgs, std_dev
+from AnalysysBMP_Exp import Image_Matrix, LoadBackgroundStats, SubtractImgs, std_dev
 from CameraResources import MultipleCameraSession, TransportLayerCreator
 from Modify_csv_with_python import ModifyCSV
 
@@ -383,9 +383,9 @@ if ListOfCamerasToBeTriggered:
 
 if TRG_performed == "y":
     index_plot = 231
+    ### Float mean of the background frames
     Bkg_Cam2_mx = Image_Matrix(
-        ImageName="Cam2_0_0.bmp", 
-        folder_path=folder_path + "\\" + "Background",
+        Array=LoadBackgroundStats(folder_path + "\\" + "Background" + "\\" + "Cam2_0_0").mean
     )
     plt.figure()
     plt.show(block=False)
@@ -429,7 +429,7 @@ experiments.
 """
 if TRG_performed == "y":
     Bkg_Cam2_mx = Image_Matrix(
-        ImageName="Cam2_0_0.bmp", folder_path=folder_path + "\\" + "Background"
+        Array=LoadBackgroundStats(folder_path + "\\" + "Background" + "\\" + "Cam2_0_0").mean
     )
     Exp_mean_Cam2_list = []
     Exp_std_Cam2_list = []
@@ -6,6 +6,8 @@ Created on Thu Apr 11 15:20:46 2019
 """
 
 import csv
+import os
+import time
 from struct import unpack
 
 import numpy as np
@@ -54,11 +56,28 @@ def SelectWaveform(Headers, WaveVectors, VectName):
             return WaveVectors[i]
     print('No match found in Headers for ' + VectName)
          
+def BackendFromEnvironment():
+    ''' Resource manager selected by MOT_VISA_BACKEND, None for the real instruments. '''
+    backend = os.environ.get('MOT_VISA_BACKEND', '')
+    if backend == 'sim':
+        from SimulatedInstruments import SimulatedResourceManager
+        return SimulatedResourceManager()
+    if backend.startswith('replay:'):
+        from VisaTrace import ReplayResourceManager
+        return ReplayResourceManager(backend[len('replay:'):], latency = 1)
+    return None
+         
 ### CLASSES
 class ResourceManagerCreator():
     ''' Create ResourceManager. '''    
-    def __init__(self):
-        self.rm = visa.ResourceManager() ### self.rm is a ResourceManager
+    def __init__(self, rm = None):
+        ### rm replaces the pyvisa ResourceManager, e.g. a VisaTrace.TracingResourceManager
+        ### to record the traffic or a VisaTrace.ReplayResourceManager to run without instruments.
+        ### Without rm, the environment variable MOT_VISA_BACKEND selects 'sim' (SimulatedInstruments)
+        ### or 'replay:<trace file>' (VisaTrace) instead of the real instruments.
+        if rm is None:
+            rm = BackendFromEnvironment()
+        self.rm = visa.ResourceManager() if rm is None else rm ### self.rm is a ResourceManager
         self.resource_list = self.rm.list_resources()
         self.OpenedResources = 0
         self.OpenedResourceNames = []
@@ -194,7 +213,7 @@ class OscilloscopeSession(ResourceSession):
         ### Grabs data from scope
         self.resource.write('CURVE?')  ### It is a query basically: write + read_raw
         data = self.resource.read_raw()
-        headerlen = 2 + int(data[1])
+        headerlen = 2 + int(chr(data[1])) ### data is bytes: data[1] is the code of the number of digits.
         #header = data[:headerlen] #
         ADC_wave = data[headerlen:-1]
         ADC_wave = np.array(unpack('%sB' % len(ADC_wave),ADC_wave))        
@@ -219,6 +238,8 @@ class AWGSession(ResourceSession):
         ### IF AWG'S EXTERNAL TRIGGERS ARE PHYSICALLY CONNECTED THERE CAN BE JUST ONE CAPTAIN.
         self.role = role
         self.triggersource = ''
+        self.TriggerHostTimes = [] ### time.monotonic_ns() just before each *TRG (same clock as the camera FrameInfo HostTime).
+        self.LastTriggerHostTime = None
         if self.role == 'Captain': 
             self.triggersource = 'BUS'
             self.resource.write('OUTP:TRIG ON')
@@ -395,7 +416,9 @@ class AWGSession(ResourceSession):
         self.resource.write('*WAI')
         if self.role == 'Captain':
             if self.resource.query('*OPC?'):
+                self.LastTriggerHostTime = time.monotonic_ns()
                 self.resource.write('*TRG')
+                self.TriggerHostTimes.append(self.LastTriggerHostTime)
                 self.resource.write('*WAI')                
                 print('TRIGGER!')
                 #self.resource.write('OUTP:TRIG OFF') ### Does not switch off the trigger output, just disable it
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 09:12:44 2026
+
+@author: MOT_User
+
+Benchmarks of the operations that set the duty cycle of the experiment, from
+waveform loading to the analysis, on simulated instruments (SimulatedInstruments,
+EmulatedCameras) and synthetic frames (SyntheticMOT), with realistic sizes:
+10k-sample waveforms, 208 to 2048 pixel square frames, 100 x 16 shot sweeps.
+
+asv style: each case is a setup function, registered with @Case, returning the
+function to time; the setup is not timed. Every case is timed with timeit
+(number of calls per repeat chosen by Timer.autorange()) and the results are
+appended to a JSON-lines history file, one record per case:
+    {'name', 'params', 'number', 'repeat', 'min_s', 'median_s', 'mean_s', 'std_s',
+     'date', 'commit', 'host', 'python', 'numpy'}   ('skipped': reason, if skipped)
+Each new result is compared with the last one of the same case on the same host:
+slower by more than threshold is reported as a regression.
+
+Run from this folder:  python PipelineBenchmark.py [-k name] [--quick]
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import tempfile
+import timeit
+from datetime import datetime
+
+os.environ["MOT_CAMERA_BACKEND"] = "emulated"  ### Never the real cameras.
+
+import matplotlib.pyplot as plt
+import numpy as np
+from AnalysysBMP_Exp import Image_Matrix, OpticalDensity, PanShotAbsorption
+from CameraResources import MultipleCameraSession, TransportLayerCreator
+from EmulatedCameras import Configure, SyntheticMOT
+from MultiResources import AWGSession, CreateArbitraryWaveformVectorFromCSVFile, ResourceManagerCreator
+from SimulatedInstruments import SimulatedResourceManager
+from SweepFit import FitMany, GlobalFit
+from TimeSeries import RoiSums
+
+# %% GENERAL FUNCTIONS
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Benchmark_history.jsonl")
+SIZES = ({"size": 208}, {"size": 1024}, {"size": 2048})
+
+CASES = []  ### (name, setup, list of parameter dicts)
+
+
+class SkipBenchmark(Exception):
+    pass
+
+
+def Case(name, params=({},)):
+    """Register setup(**p) for every parameter dict p in params (the first one is used by quick runs)."""
+
+    def decorator(setup):
+        CASES.append((name, setup, [dict(p) for p in params]))
+        return setup
+
+    return decorator
+
+
+def _Quiet():
+    ### The instrument classes print every step.
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+_TEMP = []
+
+
+def _TempDir():
+    if not _TEMP:
+        _TEMP.append(tempfile.TemporaryDirectory(prefix="mot_bench_"))
+    return _TEMP[0].name
+
+
+def _Frames(size, NumOfFrames=1, kind="absorption", seed=0):
+    """uint8 frames (frames, size, size) of a SyntheticMOT, cloud in the center."""
+    scene = SyntheticMOT(kind, center=(size / 2, size / 2), sigma=(size / 12, size / 12), ProbeCenter=(size / 2, size / 2))
+    rng = np.random.default_rng(seed)
+    x = y = np.arange(size) + 0.5
+    frames = [scene.Render(x, y, k, rng=rng) for k in range(NumOfFrames)]
+    return np.clip(np.rint(frames), 0, 255).astype(np.uint8)
+
+
+def _Commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+# %% CASES
+
+
+@Case("waveform_csv", params=({"NumOfSamples": 10000, "RowNumber": 10},))
+def WaveformCsv(NumOfSamples, RowNumber):
+    FileName = os.path.join(_TempDir(), "waveforms_%d_%d.csv" % (NumOfSamples, RowNumber))
+    values = np.round(np.random.default_rng(0).random((NumOfSamples, RowNumber)), 3)
+    header = ",".join("Wave%d" % k for k in range(RowNumber))
+    np.savetxt(FileName, values, delimiter=",", header=header, comments="", fmt="%g")
+    return lambda: CreateArbitraryWaveformVectorFromCSVFile(FileName, RowNumber)
+
+
+@Case("awg_upload", params=({"NumOfSamples": 10000}, {"NumOfSamples": 1000}))
+def AwgUpload(NumOfSamples):
+    ### No simulated latency: host side cost only (command formatting and the simulator parsing).
+    with _Quiet():
+        Mg = ResourceManagerCreator(rm=SimulatedResourceManager(latency=0, bandwidth=np.inf, realtime=False))
+        awg = AWGSession(Mg, "AWG1", role="Captain")
+    wave = np.round(0.5 + 0.5 * np.sin(np.linspace(0, 2 * np.pi, NumOfSamples)), 3).tolist()  ### As from the CSV.
+    return lambda: awg.AddArbitraryWaveformToChannelVolatileMemory(wave, "1", "MOT_switch")
+
+
+@Case("retrieve_pictures", params=tuple(dict(p, NumOfPictures=16) for p in SIZES))
+def RetrievePictures(size, NumOfPictures):
+    ### Includes the rendering of the emulated frames (noise='gaussian' to keep it cheap).
+    Configure(SerialNumbers=("12345670",), scenes={"12345670": SyntheticMOT(noise="gaussian")}, realtime=False, seed=0)
+    with _Quiet():
+        MCS = MultipleCameraSession(TransportLayerCreator(), NumOfCamsConnected=1)
+        MCS.Set_AcquisitionMode_FrameTrigger("Cam0", "On")
+        MCS.Set_Gain_Exposure("Cam0", CamExposure=150)
+        MCS.Set_ROI("Cam0", PixelWidth=size, PixelHeight=size, OffX=(2048 - size) // 2, OffY=(2048 - size) // 2)
+        MCS.EnableTimeStamp("Cam0")
+    pics = {"Cam0": NumOfPictures}
+
+    def retrieve():
+        with _Quiet():
+            MCS.ReadyForTrigger(pics, ["Cam0"])
+            MCS.RetrievePictures(pics, ["Cam0"])
+
+    return retrieve
+
+
+@Case("save_bmp", params=tuple(dict(p, NumOfPictures=16) for p in SIZES))
+def SaveBmp(size, NumOfPictures):
+    try:
+        from PIL import Image
+    except ImportError:
+        raise SkipBenchmark("PIL is not installed")
+    frames = _Frames(size, NumOfPictures)
+    folder = _TempDir()
+
+    def save():
+        for k, frame in enumerate(frames):
+            Image.fromarray(frame).save(os.path.join(folder, "Cam0_0_0_%d.bmp" % k))
+
+    return save
+
+
+@Case("optical_density", params=SIZES)
+def OpticalDensityCase(size):
+    img_abs, img_bkg, img_dark = _Frames(size, 3)
+    return lambda: OpticalDensity(img_abs, img_bkg, img_dark)
+
+
+@Case("panshot_absorption", params=SIZES[:2])
+def PanShotAbsorptionCase(size):
+    img_abs, img_bkg = _Frames(size, 2)
+    folder = _TempDir()
+
+    def panshot():
+        PanShotAbsorption(img_abs, img_bkg, folder)
+        plt.close("all")
+
+    return panshot
+
+
+@Case("roi_sums", params=({"size": 208, "NumOfFrames": 1600}, {"size": 2048, "NumOfFrames": 16}))
+def RoiSumsCase(size, NumOfFrames):
+    stack = _Frames(size, NumOfFrames, kind="fluorescence")
+    bkg = stack[0]
+    return lambda: RoiSums(stack, bkg, [size // 4, 3 * size // 4], [size // 4, 3 * size // 4])
+
+
+@Case("image_matrix_total_intensity", params=SIZES[:2])
+def TotalIntensity(size):
+    image = Image_Matrix(Array=_Frames(size, 1, kind="fluorescence")[0])
+
+    def total():
+        with _Quiet(), np.errstate(over="ignore"):  ### The uint8 sum wraps around.
+            image.GetTotalIntensity()
+
+    return total
+
+
+@Case("image_matrix_profiles", params=SIZES)
+def Profiles(size):
+    image = Image_Matrix(Array=_Frames(size, 1, kind="fluorescence")[0])
+    return lambda: (image.HorProfile(size // 2), image.VerProfile(size // 2))
+
+
+def _Sweeps(NumOfExperiments, NumOfDetunings, seed=0):
+    ### Lorentzian detuning sweeps as in Pump_and_Probe.
+    rng = np.random.default_rng(seed)
+    x = np.linspace(-30, 30, NumOfDetunings)
+    return [(x, 1 / (1 + ((x - 2) / 6) ** 2) + 0.1 + rng.normal(0, 0.03, len(x))) for _ in range(NumOfExperiments)]
+
+
+@Case("global_fit", params=({"NumOfExperiments": 100, "NumOfDetunings": 16},))
+def GlobalFitCase(NumOfExperiments, NumOfDetunings):
+    datasets = _Sweeps(NumOfExperiments, NumOfDetunings)
+    return lambda: GlobalFit(datasets, "lorentzian", shared=("x0", "gamma"))
+
+
+@Case("fit_many", params=({"NumOfExperiments": 100, "NumOfDetunings": 16},))
+def FitManyCase(NumOfExperiments, NumOfDetunings):
+    groups = [[d] for d in _Sweeps(NumOfExperiments, NumOfDetunings)]
+    return lambda: FitMany(groups, "lorentzian", processes=1)
+
+
+# %% RUNNER
+
+
+def Measure(func, repeat: int = 5):
+    """(calls per repeat, seconds per call of every repeat)."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return number, np.array(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def LoadHistory(HistoryFile=DEFAULT_HISTORY):
+    if not os.path.exists(HistoryFile):
+        return []
+    with open(HistoryFile, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def Previous(history, record):
+    """Last timed record of the same case (name, params, host) in history, None if there is none."""
+    for old in reversed(history):
+        if (
+            old["name"] == record["name"]
+            and old["params"] == record["params"]
+            and old.get("host") == record.get("host")
+            and "median_s" in old
+        ):
+            return old
+    return None
+
+
+def RunSuite(pattern=None, quick: bool = False, repeat: int = 5, HistoryFile=DEFAULT_HISTORY, threshold: float = 1.25):
+    """Run the cases whose name matches the regular expression pattern (all by default),
+    print the results with the ratio to the previous run and append them to HistoryFile
+    (None: not stored). Returns the list of records.
+    quick: only the first parameter set of each case and 2 repeats.
+    """
+    history = LoadHistory(HistoryFile) if HistoryFile else []
+    common = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": _Commit(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+    records = []
+    print("%-30s %-40s %8s %11s %11s %8s" % ("case", "params", "number", "median[ms]", "min[ms]", "ratio"))
+    for name, setup, param_list in CASES:
+        if pattern and not re.search(pattern, name):
+            continue
+        for params in param_list[:1] if quick else param_list:
+            record = {"name": name, "params": params, **common}
+            label = ", ".join("%s=%s" % kv for kv in params.items())
+            try:
+                func = setup(**params)
+                number, times = Measure(func, 2 if quick else repeat)
+            except SkipBenchmark as e:
+                record["skipped"] = str(e)
+                print("%-30s %-40s skipped: %s" % (name, label, e))
+                records.append(record)
+                continue
+            record.update(
+                number=number,
+                repeat=len(times),
+                min_s=float(times.min()),
+                median_s=float(np.median(times)),
+                mean_s=float(times.mean()),
+                std_s=float(times.std()),
+            )
+            old = Previous(history, record)
+            ratio = "" if old is None else "%.2f" % (record["median_s"] / old["median_s"])
+            flag = ""
+            if old is not None and record["median_s"] > threshold * old["median_s"]:
+                flag = "  REGRESSION (was %.3f ms at %s)" % (old["median_s"] * 1e3, old.get("commit") or old["date"])
+            print(
+                "%-30s %-40s %8d %11.3f %11.3f %8s%s"
+                % (name, label, number, record["median_s"] * 1e3, record["min_s"] * 1e3, ratio, flag)
+            )
+            records.append(record)
+    if HistoryFile:
+        with open(HistoryFile, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(r) + "\n" for r in records)
+    return records
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmarks of the acquisition to analysis pipeline.")
+    parser.add_argument("-k", "--pattern", default=None, help="regular expression on the case names")
+    parser.add_argument("--quick", action="store_true", help="first parameter set only, 2 repeats")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON-lines results history")
+    parser.add_argument("--no-store", action="store_true", help="do not append the results to the history")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown reported as regression")
+    args = parser.parse_args()
+    plt.switch_backend("Agg")
+    RunSuite(args.pattern, args.quick, args.repeat, None if args.no_store else args.history, args.threshold)
+
+
+# %%
+"""
+Records = RunSuite('panshot|optical_density', HistoryFile = None)
+History = LoadHistory()
+"""
@@ -15,22 +15,23 @@ import time
 
 ### Standard library imports
 import matplotlib.pyplot as plt
-import numpy as np
-from AnalysysBMP_Exp import Image_Matrix, SaturatedExp, SubtractImgs
+from AnalysysBMP_Exp import Image_Matrix, LoadBackgroundStats, SubtractImgs
 from CameraResources import MultipleCameraSession, TransportLayerCreator
+from LoadingCurve import LoadingCurveEngine
 ### Third party imports
 ### Local application imports
 from MultiResources import (CreateArbitraryWaveformVectorFromCSVFile,
                             SelectWaveform)
 from PIL import Image
-from scipy import optimize
-from scipy.fftpack import fft
+from SweepFit import ModelCurve
+from TimeSeries import PowerSpectrum, StreamingLoading
 
 #from Start import AWGBaseConfiguration, No_MOT, ClearAllVolatiles, AWGSafeConfiguration, CloseEverythingSafely, Background_capture
 
 #%% FOLDER REFERENCE
 folder_path = r'C:\Users\MOT_USER\Documents\Python Scripts\QuantumLabPython\ExperimentMOT_special_2\Output' + '\\' + 'Pressure_measurements'
 Exposure = 250 
+FrameRate = 200 ### Frame rate of the burst [Hz]
         
 #%% BACKGROUND
 '''
@@ -62,6 +63,8 @@ number_of_experiments = 1 ### Number of experiments performed
 AWGChannelsToBeUsed = ['AWG1_1', 'AWG2_1', 'AWG5_2']
 Captain_to_trigger = 'AWG1'
 Output_file = 'y' ### 'y' or 'n': if you want the cameras output in a file
+Live_loading = 'n' ### 'y' or 'n': also fit the loading curve while the frames are retrieved (see StreamingLoading)
+Save_pictures = 'n' ### 'y' or 'n': save every frame as BMP (the loading curves are always saved)
 #-----------------------------------------------------------------------------
 TRG_performed = 'n' ### Variable that controls if trigger has been performed ['n','y']
 WaveformList = []
@@ -176,6 +179,10 @@ if TRG == 'y':
     print('START EXPERIMENTS: ', '\n')
     try: 
         list_of_detunings = []
+        Loading_engines = {} ### Loading curves N(t) of every run, for each camera.
+        for cam in ListOfCamerasToBeTriggered:
+            Bkg_Cam_mx = Image_Matrix(Array = LoadBackgroundStats(folder_path + '\\' + 'Background' + '\\' + '%s_0_0' %cam).mean) ### Float mean of the background frames
+            Loading_engines[cam] = LoadingCurveEngine(FrameRate, ImgBkg = Bkg_Cam_mx.image, scale = 1000)
         for det in range(0, 1, 1):               
             list_of_dictionaries = [] ### Each element is a dictionary. The list length is the number of experiments.
             for i in range(number_of_experiments): 
@@ -185,8 +192,19 @@ if TRG == 'y':
                 eval('DS_%s.Trigger()' %Captain_to_trigger)  ### TRIGGER
                 time.sleep(ExperimentDuration) ### Wait for the experiment to end
                 if ListOfCamerasToBeTriggered:
-                    MCS.RetrievePictures(CamNameToPicNum, ListOfCamerasToBeTriggered) ### Retrieve Pictures form Buffer
+                    Loading = None
+                    if Live_loading == 'y':
+                        Loading = StreamingLoading(FrameRate, ImgBkg = Loading_engines[ListOfCamerasToBeTriggered[0]].ImgBkg, scale = 1000, RefitEvery = 50, CamName = ListOfCamerasToBeTriggered[0])
+                    MCS.RetrievePictures(CamNameToPicNum, ListOfCamerasToBeTriggered,
+                                         FrameCallback = None if Loading is None else Loading.AddFrame) ### Retrieve Pictures form Buffer
+                    if Loading is not None:
+                        for count, R, R_err in Loading.History:
+                            print('Frame', count, 'loading rate [a.u./s]:', R, '+-', R_err)
+                        if Loading.Errors:
+                            print('Live loading fit failed', len(Loading.Errors), 'times, last at frame', Loading.Errors[-1][0], ':', Loading.Errors[-1][1])
                     list_of_dictionaries.append(MCS.CamNameToImageList)
+                    for cam in ListOfCamerasToBeTriggered:
+                        Loading_engines[cam].AddRun(MCS.CamNameToImageList[cam], MCS.CamNameToTimestampList[cam])
                 #print('The experiment has been allowed to run for ', ExperimentDuration, ' seconds.', sep = '')
                 print('Experiment concluded.', '\n')
                 TRG_performed = 'y'
@@ -212,7 +230,7 @@ if Output_file == 'y':
         print('Experiment concluded.', '\n')
         
 #%% SAVE PICTURES TO FILE
-if TRG_performed == 'y':
+if TRG_performed == 'y' and Save_pictures == 'y':
     print('...Saving Pictures... \n')
     for l in range (0, 1, 1):
         for j in range(number_of_experiments):
@@ -233,22 +251,20 @@ if ListOfCamerasToBeTriggered:
 ''' Panshot first and last pictures'''
 if TRG_performed == 'y':                               
     for cam in ListOfCamerasToBeTriggered:    
-        Cam_first_mx = Image_Matrix(ImageName = '%s_0_0_0.bmp' %cam, folder_path = folder_path)
-        Cam_last_mx = Image_Matrix(ImageName = '%s_0_0_499.bmp' %cam, folder_path = folder_path)
-        Bkg_Cam_mx = Image_Matrix(ImageName = '%s_0_0.bmp' %cam, folder_path = folder_path + '\\' + 'Background')
+        Bkg_Cam_mx = Image_Matrix(Array = LoadBackgroundStats(folder_path + '\\' + 'Background' + '\\' + '%s_0_0' %cam).mean) ### Float mean of the background frames
         ### Plot
         plt.figure() 
         plt.subplot(121)
         plt.tight_layout()
         plt.title('%s first picture' %cam)
-        plt.imshow(SubtractImgs(Cam_first_mx.image, Bkg_Cam_mx.image), cmap= 'rainbow')
+        plt.imshow(SubtractImgs(list_of_detunings[0][0][cam][0].astype(float), Bkg_Cam_mx.image), cmap= 'rainbow')
         plt.colorbar() 
         plt.ylabel('row [pixel]')
         plt.xlabel('col [pixel]')    
         plt.subplot(122)
         plt.tight_layout()
         plt.title('%s last picture' %cam)
-        plt.imshow(SubtractImgs(Cam_last_mx.image, Bkg_Cam_mx.image), cmap= 'rainbow')
+        plt.imshow(SubtractImgs(list_of_detunings[0][0][cam][-1].astype(float), Bkg_Cam_mx.image), cmap= 'rainbow')
         plt.colorbar() 
         plt.ylabel('row [pixel]')
         plt.xlabel('col [pixel]')    
@@ -257,15 +273,14 @@ if TRG_performed == 'y':
 #%% LOADING TIME PLOT
 if TRG_performed == 'y':  
     for cam in ListOfCamerasToBeTriggered:
-        Bkg_Cam_mx = Image_Matrix(ImageName = '%s_0_0.bmp' %cam, folder_path = folder_path + '\\' + 'Background')
-        Cam_imgs = [(SubtractImgs(list_of_detunings[0][0][cam][i], Bkg_Cam_mx.image)) for i in range(CamNameToPicNum[cam])] 
-        Px_Cam_list = [[Cam_imgs[i][m,n] for m in range(0, Bkg_Cam_mx.image.shape[0]) for n in range(0, Bkg_Cam_mx.image.shape[1])] for i in range(CamNameToPicNum[cam])]
-        Px_sum_cam_list = [(sum(Px_Cam_list[i])/1000) for i in range(CamNameToPicNum[cam])]
-        time_base = np.array([i for i in np.arange(0, 2.5, 0.005)])
-        ### FIT
-        popt, pcov = optimize.curve_fit(SaturatedExp, time_base, Px_sum_cam_list, method = 'trf')
-        print('Fit Parameters [a,x0,sigma, c] %s:' %cam, popt) ### [a,x0,sigma, c]
-        fit_array = SaturatedExp(time_base, *popt)        
+        ### FIT of every run, results table saved instead of the pictures
+        Loading_fit = Loading_engines[cam].Fit(processes = 1)
+        Loading_engines[cam].Save(folder_path + '\\' + 'LoadingResults_%s.csv' %cam)
+        print('Fit Parameters [N, g, c] %s:' %cam, Loading_fit[['N', 'g', 'c']]) ### [N, g, c]
+        print('Loading rate [a.u./s] %s:' %cam, Loading_fit['R'], '+-', Loading_fit['R_err'])
+        print('Background pressure [mbar] %s:' %cam, Loading_fit['P_mbar'], '+-', Loading_fit['P_mbar_err'])
+        time_base, Px_sum_cam_list = Loading_engines[cam].curves[0]
+        fit_array = ModelCurve(time_base, Loading_fit[0], 'saturated_exp')
         ###PLOT
         plt.figure() 
         plt.tight_layout()
@@ -277,30 +292,20 @@ if TRG_performed == 'y':
         plt.savefig(folder_path + '\\' + 'LoadingTime_%s' %cam + '.pdf', format='pdf')
         plt.show(block = False)
 
-        ### Fourier Transform of raw intensity
+        ### Welch power spectral density of the raw intensity
+        f_psd, I_psd = PowerSpectrum(Px_sum_cam_list, fs = FrameRate, nperseg = 128)
         plt.figure()
-        I_fft_arr = fft(np.array(Px_sum_cam_list))
-        tf = np.linspace(0, int(len(I_fft_arr)/(2*ExperimentDuration)), int(len(I_fft_arr)/2))  
-        plt.plot(tf[10:], (2.0/len(I_fft_arr)) * np.abs(I_fft_arr[10:len(I_fft_arr)//2]))
+        plt.semilogy(f_psd[1:], I_psd[1:])
         plt.xlabel('Frequency [Hz]')
-        plt.ylabel('Intensity [a.u.]')
+        plt.ylabel('PSD [a.u.$^2$/Hz]')
         plt.tight_layout()
         plt.grid()
         plt.savefig(folder_path + '\\' + 'LoadingTime_Fourier_%s' %cam + '.pdf', format='pdf')
         plt.show(block = False)
-        
-        ### Fourier Transform Log plot
-        plt.figure()
-        plt.plot(tf[0:], (2.0/len(I_fft_arr)) * np.log(np.abs(I_fft_arr[0:len(I_fft_arr)//2])))
-        plt.xlabel('Frequency [Hz]')
-        plt.ylabel('Intensity Log [a.u.]')
-        plt.tight_layout()
-        plt.grid()
-        plt.show(block = False)
     
 #%% Release Memory
 if TRG == 'y':
-    del list_of_detunings, list_of_dictionaries, Cam_imgs, Px_Cam_list
+    del list_of_detunings, list_of_dictionaries
     gc.collect()
 
 
@@ -12,16 +12,18 @@ import numpy as np
 from AnalysysBMP_Exp import (
     DivideImgs,
     Image_Matrix,
+    LoadBackgroundStats,
     LogImg,
-    SaturatedExp,
+    RoiOpticalDensityError,
     SubtractImgs,
     std_dev,
 )
-from scipy import optimize
+from SweepFit import GlobalFit, ModelCurve
 
 """
 Takes pictures generated by Pump_duration and plots the optical density as a function of pump duration with and without rod.
-Error bar refers to the confidence interval of an average over pixels.
+Error bar is the optical density noise propagated from the background statistics (NumOfFrames > 1 in Background_capture),
+or the confidence interval of an average over pixels for older backgrounds saved as a single frame.
 """
 
 pic_num = 22
@@ -39,12 +41,10 @@ row_lims = [121, 124]
 col_lims = [85, 88]
 Pix_num = (row_lims[1] - row_lims[0]) * (col_lims[1] - col_lims[0])
 
-Bkg_probe_mx = Image_Matrix(
-    ImageName="Cam0_0_1.bmp", folder_path=folder_path + "\\" + "Background"
-)
-Bkg_probe_dark_mx = Image_Matrix(
-    ImageName="Cam0_0_0.bmp", folder_path=folder_path + "\\" + "Background"
-)
+Bkg_probe_stats = LoadBackgroundStats(folder_path + "\\" + "Background" + "\\" + "Cam0_0_1")
+Bkg_probe_dark_stats = LoadBackgroundStats(folder_path + "\\" + "Background" + "\\" + "Cam0_0_0")
+Bkg_probe_mx = Image_Matrix(Array=Bkg_probe_stats.mean)
+Bkg_probe_dark_mx = Image_Matrix(Array=Bkg_probe_dark_stats.mean)
 Probe_imgs = [
     (Image_Matrix(ImageName="Cam0_%d_0_0.bmp" % i, folder_path=folder_path).image)
     for i in range(pic_num)
@@ -71,7 +71,13 @@ Px_list = [
 ]
 Px_mean_ROD_list = [np.mean(Px_list[i]) for i in range(pic_num)]
 Px_std_ROD_list = [std_dev(Px_list[i]) for i in range(pic_num)]
-Px_std_avg_ROD_list = [std_dev(Px_list[i]) / np.sqrt(Pix_num) for i in range(pic_num)]
+if Bkg_probe_stats.count > 1:
+    Px_std_avg_ROD_list = [
+        RoiOpticalDensityError(Probe_imgs[i], Bkg_probe_stats, Bkg_probe_dark_stats, row_lims, col_lims)
+        for i in range(pic_num)
+    ]
+else:
+    Px_std_avg_ROD_list = [std_dev(Px_list[i]) / np.sqrt(Pix_num) for i in range(pic_num)]
 
 
 ### without ROD
@@ -86,12 +92,10 @@ row_lims = [121, 124]
 col_lims = [85, 88]
 Pix_num = (row_lims[1] - row_lims[0]) * (col_lims[1] - col_lims[0])
 
-Bkg_probe_mx = Image_Matrix(
-    ImageName="Cam0_0_1.bmp", folder_path=folder_path + "\\" + "Background"
-)
-Bkg_probe_dark_mx = Image_Matrix(
-    ImageName="Cam0_0_0.bmp", folder_path=folder_path + "\\" + "Background"
-)
+Bkg_probe_stats = LoadBackgroundStats(folder_path + "\\" + "Background" + "\\" + "Cam0_0_1")
+Bkg_probe_dark_stats = LoadBackgroundStats(folder_path + "\\" + "Background" + "\\" + "Cam0_0_0")
+Bkg_probe_mx = Image_Matrix(Array=Bkg_probe_stats.mean)
+Bkg_probe_dark_mx = Image_Matrix(Array=Bkg_probe_dark_stats.mean)
 Probe_imgs = [
     (Image_Matrix(ImageName="Cam0_%d_0_0.bmp" % i, folder_path=folder_path).image)
     for i in range(pic_num)
@@ -118,7 +122,13 @@ Px_list = [
 ]
 Px_mean_NOROD_list = [np.mean(Px_list[i]) for i in range(pic_num)]
 Px_std_NOROD_list = [std_dev(Px_list[i]) for i in range(pic_num)]
-Px_std_avg_NOROD_list = [std_dev(Px_list[i]) / np.sqrt(Pix_num) for i in range(pic_num)]
+if Bkg_probe_stats.count > 1:
+    Px_std_avg_NOROD_list = [
+        RoiOpticalDensityError(Probe_imgs[i], Bkg_probe_stats, Bkg_probe_dark_stats, row_lims, col_lims)
+        for i in range(pic_num)
+    ]
+else:
+    Px_std_avg_NOROD_list = [std_dev(Px_list[i]) / np.sqrt(Pix_num) for i in range(pic_num)]
 
 
 ### PLOT
@@ -133,19 +143,20 @@ plt.grid()
 plt.legend(("with rod", "no rod"))
 
 ### FIT
-popt, pcov = optimize.curve_fit(
-    SaturatedExp, base, np.array(Px_mean_ROD_list), method="trf"
-)
-print("Fit Parameters:", popt)  ### [a,x0,sigma]
-fit_array = SaturatedExp(base, *popt)
-plt.plot(base, fit_array, "b-")
-
-popt, pcov = optimize.curve_fit(
-    SaturatedExp, base, np.array(Px_mean_NOROD_list), method="trf"
+### Both datasets in one fit, pass shared = ('g',) to constrain a common pumping rate.
+### Unweighted like the original curve_fit; 'y' weights the points with the error bars.
+Weighted_fit = "n"
+Fit_results = GlobalFit(
+    [
+        (base, Px_mean_ROD_list, Px_std_avg_ROD_list if Weighted_fit == "y" else None),
+        (base, Px_mean_NOROD_list, Px_std_avg_NOROD_list if Weighted_fit == "y" else None),
+    ],
+    model="saturated_exp",
 )
-print("Fit Parameters:", popt)  ### [a,x0,sigma]
-fit_array = SaturatedExp(base, *popt)
-plt.plot(base, fit_array, "r-")
+print("Fit Parameters:", Fit_results[["N", "g", "c"]])  ### [N,g,c]
+print("Fit Errors:", Fit_results[["N_err", "g_err", "c_err"]])
+plt.plot(base, ModelCurve(base, Fit_results[0]), "b-")
+plt.plot(base, ModelCurve(base, Fit_results[1]), "r-")
 
 ### SAVE FIGURE
 plt.show(block=False)
@@ -9,20 +9,23 @@ Controls AWGs, oscilloscopes and cameras.
 
 """
 
+import csv
 import gc
 import random
-import sys
 import time
 
 ### Standard library imports
 import matplotlib.pyplot as plt
 import numpy as np
-from AnalysysBMP_Exp import DivideImgs, Image_Matrix, LogImg, SubtractImgs, std_dev
-from CameraResources import MultipleCameraSession, TransportLayerCreator
+from AnalysysBMP_Exp import DivideImgs, Image_Matrix, LoadBackgroundStats, LogImg, RoiOpticalDensityError, SubtractImgs, std_dev
+from CameraResources import FRAME_INFO_DTYPE, MultipleCameraSession, TransportLayerCreator
+from Instrumentation import Profiler
 
 ### Local application imports
-from MultiResources import CreateArbitraryWaveformVectorFromCSVFile, SelectWaveform
+from MultiResources import AWGSession, CreateArbitraryWaveformVectorFromCSVFile, ResourceSession, SelectWaveform
 from PIL import Image
+from RunLog import RunLog
+from ShotStore import ShotStore
 from tqdm import tqdm
 
 # from Start import AWGBaseConfiguration, No_MOT, ClearAllVolatiles, AWGSafeConfiguration, CloseEverythingSafely, Background_capture
@@ -80,7 +83,9 @@ AWGChannelsToBeUsed = [
     "AWG5_2",
 ]
 Captain_to_trigger = "AWG1"
-Output_file = "y"  ### 'y' or 'n': if you want the cameras output in a file
+Output_file = "y"  ### 'y' or 'n': if you want the experiment log in RunLog.jsonl (see RunLog)
+Profile_shots = "n"  ### 'y' or 'n': time every instrument call and phase of the shot (see Instrumentation)
+Memory_budget_MB = 256  ### RAM for the frames of the sweep, the rest is spilled to folder_path\Shots (see ShotStore)
 # -----------------------------------------------------------------------------
 TRG_performed = "n"  ### Variable that controls if trigger has been performed ['n','y']
 WaveformList = []
@@ -251,13 +256,20 @@ TRG = input("Do you want to trigger (y/n)? ")
 time.sleep(0.1)
 
 # %%% OUTPUT TO FILE
-"""Choose the file name where you want to store the log of the experiment."""
+"""Choose the file name where you want to store the log of the experiment.
+Shot parameters, triggers and frame metadata are records of the run log,
+read them back with RunLogReader(...).ShotTable()."""
+Log = None
+Print = print
 if Output_file == "y":
-    orig_stdout = sys.stdout
     print("\n Output to file \n")
-    Output_destination = folder_path + "\\" + "output.txt"
-    f = open(Output_destination, "w")
-    sys.stdout = f
+    Log = RunLog(folder_path + "\\" + "RunLog.jsonl")
+    Print = Log.Message
+    if ListOfCamerasToBeTriggered:
+        MCS.RunLog = Log
+if Profile_shots == "y":
+    Profiler.Reset()
+    Profiler.Enable(ResourceSession, AWGSession, MultipleCameraSession, live=Log)
 
 # %% PREPARE CAMERAS
 try:
@@ -283,10 +295,8 @@ try:
         MCS.EnableTimeStamp("Cam1")
 
 except Exception as excep:
-    if Output_file == "y":
-        sys.stdout = orig_stdout
-        f.close()
-        print("\n Output to console \n")
+    if Log is not None:
+        Log.Message("Camera error:", excep)
     print(excep)
     print(" \n !!! Something went wrong with Cameras!")
     TRG = "n"
@@ -296,12 +306,20 @@ time.sleep(0.1)
 ### The MOT should be destroied before moving to a different detuning.
 if TRG == "y":
     print("START EXPERIMENTS: ", "\n")
+    detunings = np.arange(0, 4, 0.25)
+    Shots = ShotStore(
+        folder_path + "\\" + "Shots",
+        NumOfDetunings=len(detunings),
+        NumOfExperiments=number_of_experiments,
+        CamNameToPicNum={cam: CamNameToPicNum[cam] for cam in ListOfCamerasToBeTriggered},
+        MemoryBudget=Memory_budget_MB * 1e6,
+    )
     try:
-        list_of_detunings = []
-        for det in tqdm(np.arange(0, 4, 0.25)):
+        list_of_frame_infos = []  ### One row per picture: detuning, experiment, camera, frame metadata, trigger time.
+        for det_num, det in enumerate(tqdm(detunings)):
             det_value = init_detuning + det
             DS_AWG1.ApplyDCVoltage(Load="1000", AWGChannelNum="2", Volt=str(det_value))
-            print("MOT detuning [V]: ", str(det_value))
+            Print("MOT detuning [V]: ", str(det_value))
             if "AWG1_1" in AWGChannelsToBeUsed:
                 FunctionName = Mg.ResourceNameToJob["AWG1_1"]
                 FunctionVector = SelectWaveform(Headers, WaveformList, FunctionName)
@@ -317,63 +335,79 @@ if TRG == "y":
                     VLow="0",
                 )
             time.sleep(6)  ### LOAD
-            list_of_dictionaries = (
-                []
-            )  ### Each element is a dictionary. The list length is the number of experiments.
             for i in range(number_of_experiments):
-                print("Experiment", i)
+                Print("Experiment", i)
+                random_sleep = (round(random.random(), 3)) / 2
+                if Log is not None:
+                    Log.Shot(detuning_num=det_num, detuning_V=det_value, experiment=i, random_sleep=random_sleep)
                 if ListOfCamerasToBeTriggered:
                     MCS.ReadyForTrigger(
                         CamNameToPicNum, ListOfCamerasToBeTriggered
                     )  ### Cameras Ready for trigger
                 ###--------------------------------------
-                time.sleep(1.2)  ### FIXED PRE-LOAD
-                random_sleep = (round(random.random(), 3)) / 2
-                time.sleep(random_sleep)  ### RANDOM PRE-LOAD
-                print("Random loading interval [s]: ", "\n", str(random_sleep))
+                with Profiler.Span("preload"):
+                    time.sleep(1.2)  ### FIXED PRE-LOAD
+                    time.sleep(random_sleep)  ### RANDOM PRE-LOAD
                 ###--------------------------------------
                 eval("DS_%s.Trigger()" % Captain_to_trigger)  ### TRIGGER
-                time.sleep(ExperimentDuration)  ### Wait for the experiment to end
+                if Log is not None:
+                    Log.Trigger(Captain_to_trigger, eval("DS_%s.LastTriggerHostTime" % Captain_to_trigger))
+                with Profiler.Span("experiment"):
+                    time.sleep(ExperimentDuration)  ### Wait for the experiment to end
                 if ListOfCamerasToBeTriggered:
                     MCS.RetrievePictures(
                         CamNameToPicNum, ListOfCamerasToBeTriggered
                     )  ### Retrieve Pictures form Buffer
-                    list_of_dictionaries.append(MCS.CamNameToImageList)
+                    Shots.Add(det_num, i, MCS.CamNameToImageList)  ### Spilled to disk beyond the memory budget.
+                    trigger_time = eval("DS_%s.LastTriggerHostTime" % Captain_to_trigger)
+                    for cam in ListOfCamerasToBeTriggered:
+                        for row in MCS.FrameInfoArray(cam).tolist():
+                            list_of_frame_infos.append(
+                                (det_num, det_value, i, cam, *row, trigger_time, random_sleep)
+                            )
                 # print('The experiment has been allowed to run for ', ExperimentDuration, ' seconds.', sep = '')
-                print("Experiment concluded.", "\n")
+                Print("Experiment concluded.")
                 TRG_performed = "y"
-            list_of_detunings.append(list_of_dictionaries)
             DS_AWG1.ApplyDCVoltage(Load="1000", AWGChannelNum="1", Volt="9")
             time.sleep(0.1)  ### NO MOT
     except Exception as excep:
-        if Output_file == "y":
-            sys.stdout = orig_stdout
-            f.close()
-            print("\n Output to console \n")
+        if Log is not None:
+            Log.Message("Experiment error:", excep)
         print(excep)
         print("\n !!! Something went wrong!")
         TRG_performed = "n"
+    Shots.Flush()  ### Every acquired shot on disk, also after an error.
 else:
     print("Trigger hasn't been performed", "\n")
 time.sleep(0.1)
 
 # %% OUTPUT TO STANDARD OUTPUT
-if Output_file == "y":
-    if sys.stdout != orig_stdout:
-        sys.stdout = orig_stdout
-        f.close()
-        print("\n Output to console \n")
+Profiler.live = None
+if Log is not None:
+    Log.Close()
+    if ListOfCamerasToBeTriggered:
+        MCS.RunLog = None
+    print("\n Output to console \n")
     if TRG_performed == "y":
         print("Experiment concluded.", "\n")
 
 # %% SAVE PICTURES TO FILE
 if TRG_performed == "y":
+    ### Frame metadata on the host clock: align pictures and triggers without the output.txt log.
+    with open(folder_path + "\\" + "FrameInfo.csv", "w", newline="") as frame_info_file:
+        writer = csv.writer(frame_info_file)
+        writer.writerow(
+            ("Detuning_num", "Detuning_V", "Experiment", "Camera")
+            + FRAME_INFO_DTYPE.names
+            + ("TriggerHostTime", "RandomSleep")
+        )
+        writer.writerows(list_of_frame_infos)
     print("...Saving Pictures... \n")
     for l in range(0, 16, 1):
         for j in range(number_of_experiments):
             for i in ListOfCamerasToBeTriggered:
                 for k in range(CamNameToPicNum[i]):
-                    im = Image.fromarray(list_of_detunings[l][j][i][k])
+                    im = Image.fromarray(Shots.Frame(l, j, i, k))
                     img_name_tosave = (
                         folder_path
                         + "\\"
@@ -386,7 +420,12 @@ if TRG_performed == "y":
                         + str(k)
                         + ".bmp"
                     )
-                    im.save(img_name_tosave)
+                    with Profiler.Span("save_bmp"):
+                        im.save(img_name_tosave)
+if Profile_shots == "y":
+    Profiler.Disable()
+    Profiler.Report()
+    Profiler.Export(folder_path + "\\" + "Timing.csv")
 
 # %% CLOSE DEVICES AND GO BACK TO NORMAL CONFIGURATION
 AWGBaseConfiguration()
@@ -465,22 +504,20 @@ if TRG_performed == "y":
 # %% FIXED DETUNING, OPT DENSITY vs. # OF EXPERIMENTS
 """ Optical Density vs. number of experiments to check if the loading time is correct. To compare with the
 random loading you find in 'output.txt' file, which is the log of the experiment.
-Error bar refers to the confidence interval of an average over pixels.
+Error bar is the noise of the pixel averaged optical density, propagated from the
+variance of the background frames (see OpticalDensityUncertainty).
 """
 if TRG_performed == "y":
     row_lims = [121, 124]
     col_lims = [85, 88]
     Pix_num = (row_lims[1] - row_lims[0]) * (col_lims[1] - col_lims[0])
 
-    Bkg_probe_mx = Image_Matrix(
-        ImageName="Cam0_0_1.bmp", folder_path=folder_path + "\\" + "Background"
-    )
-    Bkg_probe_dark_mx = Image_Matrix(
-        ImageName="Cam0_0_0.bmp", folder_path=folder_path + "\\" + "Background"
-    )
-    Probe_imgs = [
-        list_of_detunings[5][i]["Cam0"][0] for i in range(number_of_experiments)
-    ]
+    ### Float mean and variance of the background frames
+    Bkg_probe_stats = LoadBackgroundStats(folder_path + "\\" + "Background" + "\\" + "Cam0_0_1")
+    Bkg_probe_dark_stats = LoadBackgroundStats(folder_path + "\\" + "Background" + "\\" + "Cam0_0_0")
+    Bkg_probe_mx = Image_Matrix(Array=Bkg_probe_stats.mean)
+    Bkg_probe_dark_mx = Image_Matrix(Array=Bkg_probe_dark_stats.mean)
+    Probe_imgs = Shots.Stack("Cam0")[5, :, 0]  ### Read lazily from the memmap.
 
     Probe_opt_imgs = [
         LogImg(
@@ -498,7 +535,8 @@ if TRG_performed == "y":
     Px_mean_list = [np.mean(Px_list[i]) for i in range(number_of_experiments)]
     Px_std_list = [std_dev(Px_list[i]) for i in range(number_of_experiments)]
     Px_std_avg_list = [
-        std_dev(Px_list[i]) / np.sqrt(Pix_num) for i in range(number_of_experiments)
+        RoiOpticalDensityError(Probe_imgs[i], Bkg_probe_stats, Bkg_probe_dark_stats, row_lims, col_lims)
+        for i in range(number_of_experiments)
     ]
 
     fig = plt.figure()
@@ -519,5 +557,5 @@ if TRG_performed == "y":
 
 # %% Release Memory
 if TRG == "y":
-    del list_of_detunings, list_of_dictionaries, Probe_imgs, Probe_opt_imgs, Px_list
+    del Shots, Probe_imgs, Probe_opt_imgs, Px_list
     gc.collect()
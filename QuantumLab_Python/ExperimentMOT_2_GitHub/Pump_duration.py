@@ -17,7 +17,8 @@ import time
 ### Standard library imports
 import matplotlib.pyplot as plt
 import numpy as np
-from AnalysysBMP_Exp import (DivideImgs, Image_Matrix, LogImg, SubtractImgs,
+from AnalysysBMP_Exp import (DivideImgs, Image_Matrix, LoadBackgroundStats,
+                             LogImg, RoiOpticalDensityError, SubtractImgs,
                              std_dev)
 from CameraResources import MultipleCameraSession, TransportLayerCreator
 from Modify_csv_with_python import ModifyCSV
@@ -304,14 +305,19 @@ if TRG_performed == 'y':
     
 #%% FIXED DETUNING, OPT DENSITY vs. # OF EXPERIMENTS 
 ''' Optical Density vs. duration
+Error bar is the noise of the pixel averaged optical density, propagated from the
+variance of the background frames (see OpticalDensityUncertainty).
 '''
 if TRG_performed == 'y':
     row_lims  = [121,124]
     col_lims  = [85,88]
     Pix_num = (row_lims[1] - row_lims[0])*(col_lims[1] - col_lims[0])
                 
-    Bkg_probe_mx = Image_Matrix(ImageName = 'Cam0_0_1.bmp', folder_path = folder_path + '\\' + 'Background')   
-    Bkg_probe_dark_mx = Image_Matrix(ImageName = 'Cam0_0_0.bmp', folder_path = folder_path + '\\' + 'Background')   
+    ### Float mean and variance of the background frames
+    Bkg_probe_stats = LoadBackgroundStats(folder_path + '\\' + 'Background' + '\\' + 'Cam0_0_1')
+    Bkg_probe_dark_stats = LoadBackgroundStats(folder_path + '\\' + 'Background' + '\\' + 'Cam0_0_0')
+    Bkg_probe_mx = Image_Matrix(Array = Bkg_probe_stats.mean)
+    Bkg_probe_dark_mx = Image_Matrix(Array = Bkg_probe_dark_stats.mean)
     Probe_imgs = [list_of_durations[i][0]['Cam0'][0] for i in range(pic_tot)]
     
     Probe_opt_imgs = [LogImg(DivideImgs(SubtractImgs(Bkg_probe_mx.image, Bkg_probe_dark_mx.image), \
@@ -319,13 +325,13 @@ if TRG_performed == 'y':
     Px_list = [[Probe_opt_imgs[i][m,n] for m in range(*row_lims) for n in range(*col_lims)] for i in range(pic_tot)]
     Px_mean_list = [np.mean(Px_list[i]) for i in range(pic_tot)]
     Px_std_list = [std_dev(Px_list[i]) for i in range(pic_tot)]
-    Px_std_avg_list = [std_dev(Px_list[i])/np.sqrt(Pix_num) for i in range(pic_tot)]
+    Px_std_avg_list = [RoiOpticalDensityError(Probe_imgs[i], Bkg_probe_stats, Bkg_probe_dark_stats, row_lims, col_lims) for i in range(pic_tot)]
     
     fig = plt.figure()
     plt.title('Pixel Averaged \n Optical Density')
     plt.xlabel('Pump duration [us]')
     plt.yscale('log')
-    plt.errorbar([(i*5) for i in range(pic_tot)], Px_mean_list, fmt = 'o', yerr=Px_std_list, xerr=None)
+    plt.errorbar([(i*5) for i in range(pic_tot)], Px_mean_list, fmt = 'o', yerr=Px_std_avg_list, xerr=None)
     plt.grid()
     plt.show(block = False)
     plt.savefig(folder_path + '\\' + 'OptDens_vs_PumpDuration.pdf', format='pdf')
@@ -19,8 +19,8 @@ import time
 ### Standard library imports
 import matplotlib.pyplot as plt
 import numpy as np
-from AnalysysBMP_Exp import (DivideImgs, Image_Matrix, LogImg, SubtractImgs,
-                             std_dev)
+from AnalysysBMP_Exp import (DivideImgs, Image_Matrix, LoadBackgroundStats,
+                             LogImg, SubtractImgs, std_dev)
 from CameraResources import MultipleCameraSession, TransportLayerCreator
 ### Local application imports
 from MultiResources import (CreateArbitraryWaveformVectorFromCSVFile,
@@ -241,8 +241,8 @@ if ListOfCamerasToBeTriggered:
 # %% Check PICTURES   
 if TRG_performed == 'y':
     ### Check dark background
-    Bkg_probe_mx = Image_Matrix(ImageName = 'Cam0_0_1.bmp', folder_path = folder_path + '\\' + 'Background')      
-    Bkg_probe_dark_mx = Image_Matrix(ImageName = 'Cam0_0_0.bmp', folder_path = folder_path + '\\' + 'Background')                 
+    Bkg_probe_mx = Image_Matrix(Array = LoadBackgroundStats(folder_path + '\\' + 'Background' + '\\' + 'Cam0_0_1').mean)      
+    Bkg_probe_dark_mx = Image_Matrix(Array = LoadBackgroundStats(folder_path + '\\' + 'Background' + '\\' + 'Cam0_0_0').mean)                 
                         
     for i in range(0, 16, 4):                                                             
         ### Probe
@@ -280,8 +280,8 @@ if TRG_performed == 'y':
     col_lims  = [85,88]
     Exp_mean_list = []
     Exp_std_list = []
-    Bkg_probe_mx = Image_Matrix(ImageName = 'Cam0_0_1.bmp', folder_path = folder_path + '\\' + 'Background')      
-    Bkg_probe_dark_mx = Image_Matrix(ImageName = 'Cam0_0_0.bmp', folder_path = folder_path + '\\' + 'Background')     
+    Bkg_probe_mx = Image_Matrix(Array = LoadBackgroundStats(folder_path + '\\' + 'Background' + '\\' + 'Cam0_0_1').mean)      
+    Bkg_probe_dark_mx = Image_Matrix(Array = LoadBackgroundStats(folder_path + '\\' + 'Background' + '\\' + 'Cam0_0_0').mean)     
     
     for j in range(0, 16, 1):                
         Probe_imgs = [list_of_detunings[j][i]['Cam0'][0] for i in range(number_of_experiments)]        
@@ -313,8 +313,8 @@ if TRG_performed == 'y':
     col_lims  = [106,109]
     Pix_num = (row_lims[1] - row_lims[0])*(col_lims[1] - col_lims[0])
                 
-    Bkg_probe_mx = Image_Matrix(ImageName = 'Cam0_0_1.bmp', folder_path = folder_path + '\\' + 'Background')   
-    Bkg_probe_dark_mx = Image_Matrix(ImageName = 'Cam0_0_0.bmp', folder_path = folder_path + '\\' + 'Background')   
+    Bkg_probe_mx = Image_Matrix(Array = LoadBackgroundStats(folder_path + '\\' + 'Background' + '\\' + 'Cam0_0_1').mean)   
+    Bkg_probe_dark_mx = Image_Matrix(Array = LoadBackgroundStats(folder_path + '\\' + 'Background' + '\\' + 'Cam0_0_0').mean)   
     Probe_imgs = [list_of_detunings[0][i]['Cam0'][0] for i in range(number_of_experiments)]
     
     Probe_opt_imgs = [LogImg(DivideImgs(SubtractImgs(Bkg_probe_mx.image, Bkg_probe_dark_mx.image), SubtractImgs(Probe_imgs[i],Bkg_probe_dark_mx.image))) for i in range(number_of_experiments)]
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 14:12:05 2026
+
+@author: MOT_User
+
+Structured run log, replaces the redirection of sys.stdout to output.txt.
+Typed records (shot parameters, triggers, frames, messages) are put in a ring
+buffer by the acquisition loop and written by a background thread to an
+append-only JSON-lines file, so no formatting or file flushing happens in the
+shot cycle. RunLogReader reads the file back and gives per-shot tables.
+
+Every record is a JSON object with:
+    'kind': record type ('shot', 'trigger', 'frame', 'message', ...)
+    't': time.monotonic_ns() when the record was made (same clock as the camera FrameInfo)
+    'shot': number of the current shot (-1 before the first one)
+and its own fields.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# %% WRITER
+
+
+class RunLog:
+    def __init__(self, FileName, capacity: int = 65536, FlushInterval: float = 0.5, echo: bool = False):
+        """Open FileName in append mode and start the writer thread.
+        capacity is the size of the ring buffer: if the writer falls behind, the oldest
+        records are dropped and counted in self.dropped.
+        echo also prints the 'message' records to the console.
+        """
+        self.FileName = FileName
+        self.capacity = capacity
+        self.FlushInterval = FlushInterval
+        self.echo = echo
+        self.buffer = deque()
+        self.dropped = 0
+        self.shot = -1
+        self.file = open(FileName, "a", encoding="utf-8")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._Writer, name="RunLogWriter", daemon=True)
+        self._thread.start()
+
+    def Record(self, kind: str, **fields):
+        """Add a record to the ring buffer. Cheap: no formatting and no I/O."""
+        if len(self.buffer) >= self.capacity:
+            try:
+                self.buffer.popleft()
+                self.dropped += 1
+            except IndexError:  ### Emptied by the writer in the meantime.
+                pass
+        fields["kind"] = kind
+        fields["t"] = time.monotonic_ns()
+        fields["shot"] = self.shot
+        self.buffer.append(fields)
+
+    def Shot(self, **parameters):
+        """Start a new shot and record its parameters (detuning, random pre-load, ...).
+        Returns the shot number.
+        """
+        self.shot += 1
+        self.Record("shot", **parameters)
+        return self.shot
+
+    def Trigger(self, Device: str, HostTime=None):
+        """Record a trigger, HostTime is e.g. AWGSession.LastTriggerHostTime."""
+        self.Record("trigger", device=Device, host_time=HostTime)
+
+    def Frame(self, CameraName: str, info: dict):
+        """Record the metadata of a frame (a CamNameToFrameInfoList dict)."""
+        self.Record("frame", camera=CameraName, **info)
+
+    def Message(self, *args):
+        """Replacement of print() for the experiment log."""
+        text = " ".join(str(a) for a in args)
+        self.Record("message", text=text)
+        if self.echo:
+            print(text)
+
+    def _Drain(self):
+        lines = []
+        while self.buffer:
+            lines.append(json.dumps(self.buffer.popleft(), separators=(",", ":"), default=_JsonDefault))
+        if lines:
+            self.file.write("\n".join(lines) + "\n")
+            self.file.flush()
+
+    def _Writer(self):
+        while not self._stop.wait(self.FlushInterval):
+            self._Drain()
+        self._Drain()
+
+    def Close(self):
+        """Stop the writer thread after writing every pending record."""
+        if self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+        if not self.file.closed:
+            if self.dropped:
+                record = {"kind": "dropped", "t": time.monotonic_ns(), "shot": self.shot, "count": self.dropped}
+                self.file.write(json.dumps(record) + "\n")
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
+
+
+def _JsonDefault(value):
+    ### numpy scalars and arrays coming from the camera and the analysis.
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+# %% READER
+
+
+class RunLogReader:
+    def __init__(self, FileName):
+        """All the records of a run log file, in order."""
+        with open(FileName, encoding="utf-8") as f:
+            self.records = [json.loads(line) for line in f if line.strip()]
+
+    def Records(self, kind=None, shot=None):
+        """Records of the given kind and/or shot."""
+        return [
+            r for r in self.records if (kind is None or r["kind"] == kind) and (shot is None or r["shot"] == shot)
+        ]
+
+    def Messages(self):
+        """The message records as text lines, like the old output.txt."""
+        return [r["text"] for r in self.Records("message")]
+
+    def ShotTable(self) -> np.ndarray:
+        """One row per shot: its parameters, trigger host time and frame timing [ns].
+        Columns: shot, start (time of the 'shot' record), the shot parameters,
+        trigger, frames (number of frame records), first_frame, last_frame (HostTime),
+        trigger_to_last_frame. Missing values are NaN (or '' for text parameters).
+        """
+        shots = self.Records("shot")
+        params = []
+        for r in shots:
+            params += [k for k in r if k not in ("kind", "t", "shot") and k not in params]
+        rows = {r["shot"]: dict(r) for r in shots}
+        for r in self.Records("trigger"):
+            if r["shot"] in rows and "trigger" not in rows[r["shot"]]:
+                rows[r["shot"]]["trigger"] = r["host_time"] if r["host_time"] is not None else r["t"]
+        for r in self.Records("frame"):
+            row = rows.get(r["shot"])
+            if row is None:
+                continue
+            row["frames"] = row.get("frames", 0) + 1
+            row["first_frame"] = min(row.get("first_frame", r["HostTime"]), r["HostTime"])
+            row["last_frame"] = max(row.get("last_frame", r["HostTime"]), r["HostTime"])
+        dtype = [("shot", np.int64), ("start", np.float64)]
+        for p in params:
+            numeric = all(isinstance(row.get(p, 0), (int, float, type(None))) for row in rows.values())
+            dtype.append((p, np.float64 if numeric else "U64"))
+        dtype += [(name, np.float64) for name in ("trigger", "frames", "first_frame", "last_frame", "trigger_to_last_frame")]
+        out = np.zeros(len(rows), dtype=dtype)
+        for k, (shot, row) in enumerate(sorted(rows.items())):
+            row["start"] = row["t"]
+            if "trigger" in row and "last_frame" in row:
+                row["trigger_to_last_frame"] = row["last_frame"] - row["trigger"]
+            for name in out.dtype.names:
+                value = row.get(name)
+                if out.dtype[name].kind == "U":
+                    out[name][k] = "" if value is None else str(value)
+                else:
+                    out[name][k] = np.nan if value is None else value
+        return out
+
+
+# %%
+"""
+Log = RunLog(folder_path + '\\' + 'RunLog.jsonl')
+MCS.RunLog = Log
+Log.Shot(detuning = det_value, experiment = i, random_sleep = random_sleep)
+DS_AWG1.Trigger()
+Log.Trigger('AWG1', DS_AWG1.LastTriggerHostTime)
+Log.Close()
+
+Shots = RunLogReader(folder_path + '\\' + 'RunLog.jsonl').ShotTable()
+plt.plot(Shots['random_sleep'], Shots['trigger_to_last_frame'] * 1e-6, 'o')
+"""
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 11:36:02 2026
+
+@author: MOT_User
+
+Memory-bounded store of the frames of a sweep (detuning, experiment, picture)
+for every camera, replaces the nested lists of CamNameToImageList dicts kept
+in RAM until the end of the run.
+
+Completed shots stay in RAM until MemoryBudget bytes are exceeded, then they
+are spilled to one .npy file per camera, (detunings, experiments, pictures,
+row, col), written through a memory map that is unmapped after every spill:
+the resident memory stays at about MemoryBudget whatever the sweep length.
+The analysis reads the frames back lazily as read-only memmap slices.
+
+Files in folder:
+    ShotStore.json      sweep dimensions, frame shape and dtype of every camera
+    <cam>_frames.npy    frames
+    <cam>_written.npy   bool (detunings, experiments, pictures): frame acquired
+"""
+
+import json
+import os
+from collections import defaultdict
+
+import numpy as np
+
+# %% CLASS
+
+INDEX_FILE = "ShotStore.json"
+
+
+class ShotStore:
+    def __init__(self, folder, NumOfDetunings: int, NumOfExperiments: int, CamNameToPicNum, MemoryBudget: float = 256e6):
+        """Empty store in folder (created if missing). CamNameToPicNum as for RetrievePictures,
+        cameras with 0 pictures are ignored. MemoryBudget [bytes] of frames kept in RAM.
+        """
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.NumOfDetunings = NumOfDetunings
+        self.NumOfExperiments = NumOfExperiments
+        self.CamNameToPicNum = {cam: n for cam, n in CamNameToPicNum.items() if n > 0}
+        self.MemoryBudget = MemoryBudget
+        self.layout = {}  ### Camera: (frame shape, dtype string), known from its first frame.
+        self.written = {
+            cam: np.zeros((NumOfDetunings, NumOfExperiments, n), dtype=bool) for cam, n in self.CamNameToPicNum.items()
+        }
+        self.pending = []  ### (detuning, experiment, camera, picture, frame) not on disk yet.
+        self.PendingBytes = 0
+        self.SpillCount = 0
+        self._readers = {}  ### Camera: read-only memmap of its frames.
+
+    def _Path(self, cam, what):
+        return os.path.join(self.folder, "%s_%s.npy" % (cam, what))
+
+    def _WriteIndex(self):
+        index = {
+            "NumOfDetunings": self.NumOfDetunings,
+            "NumOfExperiments": self.NumOfExperiments,
+            "CamNameToPicNum": self.CamNameToPicNum,
+            "layout": {cam: [list(shape), dtype] for cam, (shape, dtype) in self.layout.items()},
+        }
+        with open(os.path.join(self.folder, INDEX_FILE), "w") as f:
+            json.dump(index, f, indent=1)
+
+    def _Create(self, cam, frame):
+        shape = (self.NumOfDetunings, self.NumOfExperiments, self.CamNameToPicNum[cam]) + frame.shape
+        mm = np.lib.format.open_memmap(self._Path(cam, "frames"), mode="w+", dtype=frame.dtype, shape=shape)
+        del mm
+        self.layout[cam] = (frame.shape, frame.dtype.str)
+        self._WriteIndex()
+
+    def Add(self, detuning: int, experiment: int, CamNameToImageList):
+        """Store the pictures of a shot (MCS.CamNameToImageList) at (detuning, experiment)."""
+        for cam, frames in CamNameToImageList.items():
+            if cam not in self.CamNameToPicNum:
+                continue
+            for picture, frame in enumerate(frames[: self.CamNameToPicNum[cam]]):
+                frame = np.asarray(frame)
+                if cam not in self.layout:
+                    self._Create(cam, frame)
+                elif frame.shape != self.layout[cam][0] or frame.dtype.str != self.layout[cam][1]:
+                    raise ValueError("%s: frame %s %s, the store has %s %s" % (cam, frame.shape, frame.dtype, *self.layout[cam]))
+                self.pending.append((detuning, experiment, cam, picture, frame))
+                self.PendingBytes += frame.nbytes
+        if self.PendingBytes > self.MemoryBudget:
+            self.Spill()
+
+    def Spill(self):
+        """Write the shots held in RAM to disk and release them."""
+        if not self.pending:
+            return
+        by_cam = defaultdict(list)
+        for item in self.pending:
+            by_cam[item[2]].append(item)
+        for cam, items in by_cam.items():
+            self._readers.pop(cam, None)
+            mm = np.lib.format.open_memmap(self._Path(cam, "frames"), mode="r+")
+            for detuning, experiment, _, picture, frame in items:
+                mm[detuning, experiment, picture] = frame
+                self.written[cam][detuning, experiment, picture] = True
+            mm.flush()
+            del mm  ### Unmapped: the written pages do not stay in this process.
+            np.save(self._Path(cam, "written"), self.written[cam])
+        self.pending = []
+        self.PendingBytes = 0
+        self.SpillCount += 1
+
+    def Flush(self):
+        """Everything on disk (call it at the end of the sweep, also after an error)."""
+        self.Spill()
+        self._WriteIndex()
+
+    # Reading
+
+    def Stack(self, cam) -> np.ndarray:
+        """Read-only memmap (detunings, experiments, pictures, row, col) of cam.
+        Slices are read from disk only when used, e.g. Stack('Cam0')[5, :, 0].
+        """
+        if cam not in self.layout:
+            raise KeyError("No frames of " + cam)
+        if any(item[2] == cam for item in self.pending):
+            self.Spill()
+        if cam not in self._readers:
+            self._readers[cam] = np.load(self._Path(cam, "frames"), mmap_mode="r")
+        return self._readers[cam]
+
+    def Frame(self, detuning: int, experiment: int, cam, picture: int = 0) -> np.ndarray:
+        """One frame, as list_of_detunings[detuning][experiment][cam][picture] was."""
+        return self.Stack(cam)[detuning, experiment, picture]
+
+    def Written(self, cam) -> np.ndarray:
+        """bool (detunings, experiments, pictures): True where a frame was acquired."""
+        if any(item[2] == cam for item in self.pending):
+            self.Spill()
+        return self.written[cam]
+
+
+def OpenShotStore(folder, MemoryBudget: float = 256e6) -> ShotStore:
+    """Reopen the store written in folder (e.g. by a previous run) for the analysis."""
+    with open(os.path.join(folder, INDEX_FILE)) as f:
+        index = json.load(f)
+    store = ShotStore(folder, index["NumOfDetunings"], index["NumOfExperiments"], index["CamNameToPicNum"], MemoryBudget)
+    for cam, (shape, dtype) in index["layout"].items():
+        store.layout[cam] = (tuple(shape), dtype)
+        if os.path.exists(store._Path(cam, "written")):
+            store.written[cam] = np.load(store._Path(cam, "written"))
+    return store
+
+
+# %%
+"""
+Shots = ShotStore(folder_path + '\\' + 'Shots', NumOfDetunings = 16, NumOfExperiments = 100,
+                  CamNameToPicNum = CamNameToPicNum, MemoryBudget = 256e6)
+Shots.Add(det_num, i, MCS.CamNameToImageList)
+Shots.Flush()
+
+Shots = OpenShotStore(folder_path + '\\' + 'Shots')
+Probe_imgs = Shots.Stack('Cam0')[5, :, 0]  ### 100 frames, read lazily.
+"""
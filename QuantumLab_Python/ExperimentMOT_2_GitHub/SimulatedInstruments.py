@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 10:05:31 2026
+
+@author: MOT_User
+
+In-process simulation of the VISA instruments of MultiResources: Keysight 33500
+AWGs and the Tektronix MDO3024 oscilloscope. Implements the SCPI subset used
+by AWGSession and OscilloscopeSession (DATA:ARB, FUNC:ARB, BURS, TRIG, *TRG,
+APPL:DC, OUTP, WFMOutpre?, CURVE?, SYST:ERR?, ...); any other setting is
+stored and returned by the corresponding query.
+Every command costs a configurable latency plus its size over a configurable
+bandwidth, either slept (realtime) or only added to the simulated clock.
+
+Use it with ResourceManagerCreator(rm = SimulatedResourceManager()) or by
+setting the environment variable MOT_VISA_BACKEND=sim.
+"""
+
+import re
+import time
+
+import numpy as np
+
+# %% GENERAL FUNCTIONS
+
+AWG_VENDOR_ID = "0x0957"  ### Keysight
+SCOPE_VENDOR_ID = "0x0699"  ### Tektronix
+
+DEFAULT_RESOURCES = (
+    "USB0::0x0957::0x2807::MY58000111::INSTR",
+    "USB0::0x0957::0x2807::MY58000112::INSTR",
+    "USB0::0x0957::0x2807::MY58000113::INSTR",
+    "USB0::0x0957::0x2807::MY58000114::INSTR",
+    "USB0::0x0957::0x2807::MY58000115::INSTR",
+    "USB0::0x0699::0x0408::C053116::INSTR",
+)
+
+
+def SplitCommand(message: str):
+    """(HEADER, arguments) of a SCPI command, header upper case without the leading ':'."""
+    message = message.strip()
+    header, _, args = message.partition(" ")
+    return header.lstrip(":").upper(), args.strip()
+
+
+def IEEEBlock(payload: bytes) -> bytes:
+    """Definite length arbitrary block: #<digits><length><payload>\\n"""
+    length = str(len(payload))
+    return ("#%d%s" % (len(length), length)).encode("ascii") + payload + b"\n"
+
+
+# %% CLASSES
+
+
+class SimulatedResource:
+    def __init__(self, name, manager):
+        """Common part of the simulated instruments: settings store, error queue, timing."""
+        self.name = name
+        self.manager = manager
+        self.session = manager.NextSession()
+        self.timeout = 10000
+        self.settings = {}
+        self.errors = []
+        self.pending = b""  ### Response waiting for read_raw().
+        self.CommandCount = 0
+
+    def _Cost(self, header, nbytes):
+        base = self.manager.CommandLatency.get(header, self.manager.latency)
+        self.manager.Spend(base + nbytes / self.manager.bandwidth)
+        self.CommandCount += 1
+
+    def _Error(self, code, text):
+        self.errors.append('%+d,"%s"' % (code, text))
+
+    def write(self, message, *args, **kwargs):
+        header, arguments = SplitCommand(message)
+        self._Cost(header, len(message))
+        if header.endswith("?"):
+            self.pending = self.Query(header, arguments).encode("ascii")
+            if header == "CURVE?":
+                self.pending = self.Curve()
+        else:
+            self.Command(header, arguments)
+        return len(message)
+
+    def query(self, message, *args, **kwargs):
+        header, arguments = SplitCommand(message)
+        response = self.Query(header, arguments)
+        self._Cost(header, len(message) + len(response))
+        return response + "\n"
+
+    def read_raw(self, *args, **kwargs):
+        data, self.pending = self.pending, b""
+        self.manager.Spend(len(data) / self.manager.bandwidth)
+        return data
+
+    def close(self):
+        pass
+
+    def Curve(self):
+        return IEEEBlock(b"")
+
+    def Command(self, header, arguments):
+        if header in ("*RST", "*CLS"):
+            self.errors = []
+            if header == "*RST":
+                self.settings = {}
+            return
+        if header == "*WAI":
+            return
+        self.settings[header] = arguments
+
+    def Query(self, header, arguments):
+        if header == "*IDN?":
+            return self.IDN
+        if header == "*OPC?":
+            return "1"
+        if header in ("SYST:ERR?", "SYSTEM:ERROR?"):
+            return self.errors.pop(0) if self.errors else '+0,"No error"'
+        key = header[:-1]
+        if key in self.settings:
+            return self.settings[key]
+        return self.DEFAULTS.get(key, "0")
+
+
+class SimulatedAWG33500(SimulatedResource):
+    IDN = "Agilent Technologies,33522B,MY58000000,5.02-1.19-2.00-52-00"
+    MAX_POINTS = 65536
+    DEFAULTS = {"OUTP:SYNC": "0", "OUTP:TRIG": "0"}
+
+    def __init__(self, name, manager):
+        """Two channel Keysight 33500 AWG: volatile arbitrary memory, outputs, burst and triggers."""
+        SimulatedResource.__init__(self, name, manager)
+        self.volatile = {1: {}, 2: {}}  ### Channel: {waveform name: numpy array}.
+        self.TriggerTimes = []  ### Simulated clock [s] of every *TRG.
+
+    def _Channel(self, header):
+        m = re.match(r"(SOUR|OUTP|TRIG)(\d)", header)
+        return int(m.group(2)) if m else 1
+
+    def Command(self, header, arguments):
+        ch = self._Channel(header)
+        if header == "*TRG":
+            self.TriggerTimes.append(self.manager.clock)
+            for listener in self.manager.TriggerListeners:
+                listener(self.name)
+            return
+        if header.endswith("DATA:VOL:CLE"):
+            self.volatile[ch] = {}
+            return
+        if header.endswith(":DATA:ARB"):
+            name, _, values = arguments.partition(",")
+            points = np.array(values.split(","), dtype=float) if values.strip() else np.zeros(0)
+            if len(points) > self.MAX_POINTS:
+                self._Error(-833, "Data out of memory")
+                return
+            if np.any(np.abs(points) > 1):
+                self._Error(-222, "Data out of range")
+                return
+            self.volatile[ch][name.strip().upper()] = points
+            return
+        if header.endswith(":FUNC:ARB"):
+            if arguments.upper() not in self.volatile[ch]:
+                self._Error(-224, "Specified arb waveform does not exist")
+                return
+        if re.search(r":APPL:DC$", header):
+            offset = arguments.split(",")[-1].strip()
+            self.settings["SOUR%d:FUNC" % ch] = "DC"
+            self.settings["SOUR%d:VOLT:OFFS" % ch] = offset
+            self.settings["SOUR%d:APPL" % ch] = '"DC +1.0E+03,+1.000E-01,%s"' % offset
+        SimulatedResource.Command(self, header, arguments)
+        if re.match(r"OUTP\d$", header):
+            self.settings[header] = "1" if arguments.upper() in ("ON", "1") else "0"
+
+
+class SimulatedMDO3024(SimulatedResource):
+    IDN = "TEKTRONIX,MDO3024,C053116,CF:91.1CT FV:v1.30"
+    DEFAULTS = {
+        "WFMOUTPRE:YMULT": "4.0E-2",
+        "WFMOUTPRE:YZERO": "0.0E+0",
+        "WFMOUTPRE:YOFF": "0.0E+0",
+        "WFMOUTPRE:XINC": "1.0E-6",
+        "ACQ:STATE": "1",
+        "HORIZONTAL:RECORDLENGTH": "10000",
+    }
+
+    def Curve(self):
+        """Waveform of the selected channel as 1 byte RPB points in an IEEE block:
+        a saturating rise with noise, as the MOT fluorescence on the photodiode.
+        """
+        n = int(self.settings.get("HORIZONTAL:RECORDLENGTH", self.DEFAULTS["HORIZONTAL:RECORDLENGTH"]))
+        t = np.arange(n) / n
+        wave = 40 + 150 * (1 - np.exp(-5 * t)) + self.manager.rng.normal(0, 2, n)
+        return IEEEBlock(np.clip(wave, 0, 255).astype(np.uint8).tobytes())
+
+
+class SimulatedResourceManager:
+    def __init__(
+        self,
+        resources=DEFAULT_RESOURCES,
+        latency: float = 1e-3,
+        bandwidth: float = 1e6,
+        CommandLatency=None,
+        realtime: bool = True,
+        seed=None,
+    ):
+        """Stand-in of pyvisa.ResourceManager with simulated instruments.
+        resources: identity strings, AWGs or scope chosen by the USB vendor ID.
+        latency [s] of every command (CommandLatency = {HEADER: s} overrides it per command),
+        bandwidth [bytes/s] of the link. With realtime False the time is only accumulated
+        in self.clock [s] and nothing sleeps.
+        """
+        self.resources = tuple(resources)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.CommandLatency = {k.upper(): v for k, v in (CommandLatency or {}).items()}
+        self.realtime = realtime
+        self.clock = 0.0
+        self.sessions = 0
+        self.rng = np.random.default_rng(seed)
+        self.opened = {}
+        self.TriggerListeners = []  ### Called with the resource name on every *TRG (see EmulatedCameras.ConnectAWG).
+
+    def NextSession(self):
+        self.sessions += 1
+        return self.sessions
+
+    def Spend(self, seconds):
+        self.clock += seconds
+        if self.realtime and seconds > 0:
+            time.sleep(seconds)
+
+    def list_resources(self, *args, **kwargs):
+        return self.resources
+
+    def open_resource(self, resource_name, *args, **kwargs):
+        if resource_name not in self.resources:
+            raise ValueError("Simulated resource not found: " + resource_name)
+        if AWG_VENDOR_ID in resource_name:
+            instrument = SimulatedAWG33500(resource_name, self)
+        elif SCOPE_VENDOR_ID in resource_name:
+            instrument = SimulatedMDO3024(resource_name, self)
+        else:
+            raise ValueError("No simulation for " + resource_name)
+        self.opened[resource_name] = instrument
+        return instrument
+
+    def close(self):
+        self.opened = {}
+
+
+# %%
+"""
+Mg = ResourceManagerCreator(rm = SimulatedResourceManager(latency = 2e-3, bandwidth = 1e6, realtime = False))
+DS_AWG1 = AWGSession(Mg, 'AWG1', role = 'Captain')
+DS_AWG1.AddArbitraryWaveformToChannelVolatileMemory(FunctionVector, AWGChannelNum = '1', FuncName = 'MOT_switch')
+print('Simulated time [s]:', Mg.rm.clock)
+"""
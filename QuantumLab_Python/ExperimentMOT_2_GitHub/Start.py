@@ -15,7 +15,7 @@ import time
 
 ### Standard library imports
 import matplotlib.pyplot as plt
-from AnalysysBMP_Exp import Image_Matrix
+from AnalysysBMP_Exp import Image_Matrix, RunningImageStats
 from CameraResources import MultipleCameraSession, TransportLayerCreator
 from Modify_csv_with_python import ModifyCSV
 
@@ -143,7 +143,7 @@ def CloseEverythingSafely():
     return None
 
 
-def Background_capture(MeasType, Camera, Exposure, folder_path):
+def Background_capture(MeasType, Camera, Exposure, folder_path, NumOfFrames=20):
     """
     NOTE: check that the camera configuration corresponds to the one in the
     script used to call this function.
@@ -153,6 +153,10 @@ def Background_capture(MeasType, Camera, Exposure, folder_path):
     MeasType = ['Scattering', 'Pump', 'Probe'].
     If exposure is less than 50 us, camera exposure time is set to 50. All the rest is
     changed to the requested exposure time.
+    NumOfFrames backgrounds are triggered and reduced on the fly into mean, variance
+    and hot pixel mask: mean and variance are saved as float arrays Camera_0_k_mean.npy
+    and Camera_0_k_var.npy (read them with LoadBackgroundStats), the rest as
+    Camera_0_k_stats.npz. Camera_0_k.bmp keeps the rounded mean for a quick look.
     """
     if Exposure <= 50:
         exp_cam = 50
@@ -171,7 +175,7 @@ def Background_capture(MeasType, Camera, Exposure, folder_path):
 
     ### INITIALISATION
     ExperimentDuration = 0.02  ### Experiment Duration in seconds.
-    number_of_experiments = 1  ### Number of experiments performed
+    number_of_experiments = NumOfFrames  ### Number of experiments performed
     MeasType_to_channel = {
         "Scattering": ["AWG1_1", "AWG2_1", "AWG5_2"],
         "Pump": ["AWG1_1", "AWG2_1", "AWG3_1", "AWG4_1", "AWG5_2"],
@@ -453,10 +457,12 @@ def Background_capture(MeasType, Camera, Exposure, folder_path):
     ### TRIGGER
     if TRG == "y" and Status == "OK":
         try:
-            list_of_dictionaries = (
-                []
-            )  ### Each element is a dictionary. The list length is the number of experiments.
-            for i in range(number_of_experiments):
+            ### One RunningImageStats per picture: frames are not kept in memory.
+            CamNameToStatsList = {
+                i: [RunningImageStats() for k in range(CamNameToPicNum[i])]
+                for i in ListOfCamerasToBeTriggered
+            }
+            for j in range(number_of_experiments):
                 print("Background of " + MeasType + " " + Camera)
                 if ListOfCamerasToBeTriggered:
                     MCS.ReadyForTrigger(
@@ -469,7 +475,9 @@ def Background_capture(MeasType, Camera, Exposure, folder_path):
                     MCS.RetrievePictures(
                         CamNameToPicNum, ListOfCamerasToBeTriggered
                     )  ### Retrieve Pictures from Buffer
-                    list_of_dictionaries.append(MCS.CamNameToImageList)
+                    for i in ListOfCamerasToBeTriggered:
+                        for k, img in enumerate(MCS.CamNameToImageList[i]):
+                            CamNameToStatsList[i][k].Add(img)
                 print(
                     "The experiment has been allowed to run for ",
                     ExperimentDuration,
@@ -493,23 +501,15 @@ def Background_capture(MeasType, Camera, Exposure, folder_path):
 
     ### SAVE PICTURES TO FILE
     if TRG_performed == "y":
-        for j in range(number_of_experiments):
-            for i in ListOfCamerasToBeTriggered:
-                for k in range(CamNameToPicNum[i]):
-                    im = Image.fromarray(list_of_dictionaries[j][i][k])
-                    img_name_tosave = (
-                        folder_path
-                        + "\\"
-                        + "Background"
-                        + "\\"
-                        + i
-                        + "_"
-                        + str(j)
-                        + "_"
-                        + str(k)
-                        + ".bmp"
-                    )
-                    im.save(img_name_tosave)
+        for i in ListOfCamerasToBeTriggered:
+            for k in range(CamNameToPicNum[i]):
+                stats = CamNameToStatsList[i][k]
+                im = Image.fromarray(stats.mean.round().clip(0, 255).astype("uint8"))
+                img_name_tosave = (
+                    folder_path + "\\" + "Background" + "\\" + i + "_0_" + str(k)
+                )
+                im.save(img_name_tosave + ".bmp")
+                stats.Save(img_name_tosave)
 
     ### OUTPUT TO STANDARD OUTPUT
     if Output_file == "y":
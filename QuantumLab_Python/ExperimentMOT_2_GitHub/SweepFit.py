@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:20:47 2026
+
+@author: MOT_User
+
+Fits of 1-D sweep curves (pump duration, detuning, loading time, ...).
+Models: SaturatedExp, Lorentzian and Gauss of AnalysysBMP_Exp, with analytic Jacobians.
+Several datasets can be fitted simultaneously with some parameters shared
+between them (e.g. the same rate with and without rod), bootstrap errors are
+computed in parallel over a process pool and many independent fits (months of
+data) can be batch processed the same way.
+Results are structured arrays (one row per dataset) that can be written to CSV.
+
+NOTE: on Windows, scripts calling Bootstrap() or FitMany() with processes > 1 must
+guard the call with if __name__ == '__main__'.
+"""
+
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from AnalysysBMP_Exp import Gauss, Lorentzian, SaturatedExp
+from scipy import optimize
+
+# %% MODELS
+
+
+def SaturatedExpJacobian(x, N, g, c):
+    e = np.exp(-g * x)
+    return np.column_stack((1 - e, N * x * e, np.ones_like(x)))
+
+
+def SaturatedExpGuess(x, y):
+    order = np.argsort(x)
+    x, y = x[order], y[order]
+    c = y[0]
+    N = y[-1] - c
+    ### Rate from the point closest to 63% of the rise.
+    k = np.argmin(np.abs(y - c - 0.63 * N))
+    g = 1 / x[k] if x[k] > 0 else 3 / max(np.ptp(x), 1e-12)
+    return np.array([N, g, c])
+
+
+def LorentzianJacobian(x, a, x0, gamma, k):
+    hw2 = (gamma / 2) ** 2
+    den = (x - x0) ** 2 + hw2
+    f = hw2 / den
+    return np.column_stack(
+        (f, a * f * 2 * (x - x0) / den, a * gamma / 2 * (x - x0) ** 2 / den**2, np.ones_like(x))
+    )
+
+
+def GaussJacobian(x, a, x0, sigma, k):
+    d = x - x0
+    pdf = np.exp(-0.5 * (d / sigma) ** 2) / (np.sqrt(2 * np.pi) * sigma)
+    return np.column_stack(
+        (pdf, a * pdf * d / sigma**2, a * pdf * (d**2 / sigma**3 - 1 / sigma), np.ones_like(x))
+    )
+
+
+def PeakGuess(x, y):
+    """Guess (a, x0, width, k) of a single peak (or dip): k from the edges, width from the FWHM."""
+    order = np.argsort(x)
+    x, y = x[order], y[order]
+    edge = max(len(y) // 10, 1)
+    k = np.median(np.concatenate((y[:edge], y[-edge:])))
+    i = np.argmax(np.abs(y - k))
+    a = y[i] - k
+    above = np.abs(y - k) >= np.abs(a) / 2
+    fwhm = np.ptp(x[above]) if above.sum() > 1 else np.ptp(x) / 10
+    return np.array([a, x[i], max(fwhm, 1e-12), k])
+
+
+def _GaussGuess(x, y):
+    a, x0, fwhm, k = PeakGuess(x, y)
+    sigma = fwhm / 2.355
+    return np.array([a * np.sqrt(2 * np.pi) * sigma, x0, sigma, k])
+
+
+### name: (function, jacobian, parameter names, initial guess)
+MODELS = {
+    "saturated_exp": (SaturatedExp, SaturatedExpJacobian, ("N", "g", "c"), SaturatedExpGuess),
+    "lorentzian": (Lorentzian, LorentzianJacobian, ("a", "x0", "gamma", "k"), PeakGuess),
+    "gauss": (Gauss, GaussJacobian, ("a", "x0", "sigma", "k"), _GaussGuess),
+}
+
+
+def ResultDtype(model: str) -> np.dtype:
+    names = MODELS[model][2]
+    return np.dtype(
+        [("dataset", np.int64)]
+        + [(name, np.float64) for name in names]
+        + [(name + "_err", np.float64) for name in names]
+        + [("redchi2", np.float64), ("npoints", np.int64), ("success", bool)]
+    )
+
+
+# %% GLOBAL FIT
+
+
+def _AsDatasets(datasets):
+    """List of (x, y, yerr) float arrays, yerr is None for unweighted points.
+    Points with non-finite x, y or yerr, or yerr <= 0, are dropped and reported.
+    """
+    out = []
+    for k, data in enumerate(datasets):
+        x = np.asarray(data[0], dtype=np.float64)
+        y = np.asarray(data[1], dtype=np.float64)
+        yerr = None if len(data) < 3 or data[2] is None else np.asarray(data[2], dtype=np.float64)
+        ok = np.isfinite(x) & np.isfinite(y)
+        if yerr is not None:
+            ok &= np.isfinite(yerr) & (yerr > 0)
+            yerr = yerr[ok]
+        if not ok.all():
+            print("Dataset %d: %d points dropped (non-finite, or yerr <= 0) at x =" % (k, np.count_nonzero(~ok)), x[~ok])
+        out.append((x[ok], y[ok], yerr))
+    return out
+
+
+class _Layout:
+    def __init__(self, names, shared, num_sets):
+        """Position of every (dataset, parameter) in the global parameter vector:
+        shared parameters first, then the local parameters of each dataset.
+        """
+        unknown = set(shared) - set(names)
+        if unknown:
+            raise ValueError("Unknown shared parameters %s" % sorted(unknown))
+        self.shared = [names.index(n) for n in names if n in shared]
+        self.local = [names.index(n) for n in names if n not in shared]
+        self.index = np.empty((num_sets, len(names)), dtype=np.int64)
+        self.index[:, self.shared] = np.arange(len(self.shared))
+        self.index[:, self.local] = len(self.shared) + np.arange(num_sets * len(self.local)).reshape(
+            num_sets, -1
+        )
+        self.size = len(self.shared) + num_sets * len(self.local)
+
+    def Pack(self, params):
+        """Global vector from the (datasets, parameters) matrix (shared taken from the first set)."""
+        p = np.empty(self.size)
+        p[self.index[::-1]] = params[::-1]
+        return p
+
+
+def GlobalFit(datasets, model: str = "saturated_exp", shared=(), init_guess=None, bounds=None) -> np.ndarray:
+    """Simultaneous least-squares fit of datasets [(x, y), (x, y, yerr), ...] with the
+    parameters listed in shared common to all of them.
+    init_guess is a (datasets, parameters) array or one parameter row for all datasets,
+    the automatic guess of the model is used by default.
+    bounds: dict {parameter name: (low, high)}.
+    Returns a ResultDtype(model) array, one row per dataset; shared parameters are repeated.
+    """
+    func, jac_func, names, guess = MODELS[model]
+    data = _AsDatasets(datasets)
+    layout = _Layout(list(names), shared, len(data))
+    if init_guess is None:
+        p0 = np.array([guess(x, y) for x, y, _ in data])
+    else:
+        p0 = np.broadcast_to(np.asarray(init_guess, dtype=np.float64), (len(data), len(names)))
+    ### Shared parameters start from the mean of the single dataset guesses.
+    p0 = np.array(p0)
+    p0[:, layout.shared] = p0[:, layout.shared].mean(axis=0)
+    lower = np.full(layout.size, -np.inf)
+    upper = np.full(layout.size, np.inf)
+    for name, (low, high) in (bounds or {}).items():
+        cols = layout.index[:, names.index(name)]
+        lower[cols], upper[cols] = low, high
+    p_start = np.clip(layout.Pack(p0), lower, upper)
+
+    sizes = [len(x) for x, _, _ in data]
+    starts = np.concatenate(([0], np.cumsum(sizes)))
+    weights = [np.ones_like(y) if yerr is None else 1 / yerr for _, y, yerr in data]
+
+    def residuals(p):
+        return np.concatenate(
+            [(func(x, *p[layout.index[k]]) - y) * w for k, ((x, y, _), w) in enumerate(zip(data, weights))]
+        )
+
+    def jac(p):
+        J = np.zeros((starts[-1], layout.size))
+        for k, ((x, _, _), w) in enumerate(zip(data, weights)):
+            ### Shared columns collect the derivatives of every dataset.
+            J[starts[k] : starts[k + 1], layout.index[k]] = jac_func(x, *p[layout.index[k]]) * w[:, np.newaxis]
+        return J
+
+    res = optimize.least_squares(residuals, p_start, jac=jac, bounds=(lower, upper), method="trf")
+    dof = max(starts[-1] - layout.size, 1)
+    redchi2 = 2 * res.cost / dof
+    try:
+        cov = np.linalg.inv(res.jac.T @ res.jac) * redchi2
+        err = np.sqrt(np.clip(np.diag(cov), 0, None))
+    except np.linalg.LinAlgError:
+        err = np.full(layout.size, np.nan)
+    out = np.zeros(len(data), dtype=ResultDtype(model))
+    out["dataset"] = np.arange(len(data))
+    for j, name in enumerate(names):
+        out[name] = res.x[layout.index[:, j]]
+        out[name + "_err"] = err[layout.index[:, j]]
+    r = res.fun
+    for k in range(len(data)):
+        local_dof = max(sizes[k] - len(layout.local), 1)
+        out["redchi2"][k] = np.sum(r[starts[k] : starts[k + 1]] ** 2) / local_dof
+    out["npoints"] = sizes
+    out["success"] = res.success
+    return out
+
+
+def FitCurve(x, y, model: str = "saturated_exp", yerr=None, init_guess=None, bounds=None) -> np.ndarray:
+    """Fit of a single dataset, see GlobalFit."""
+    return GlobalFit([(x, y, yerr)], model, (), init_guess, bounds)
+
+
+def ModelCurve(x, result, model: str = "saturated_exp"):
+    """Evaluate the model at x for one row of a result table."""
+    func, _, names, _ = MODELS[model]
+    return func(np.asarray(x, dtype=np.float64), *[float(result[name]) for name in names])
+
+
+# %% BOOTSTRAP AND BATCH
+
+
+def _FailedRow(model, num_sets):
+    out = np.zeros(num_sets, dtype=ResultDtype(model))
+    out["dataset"] = np.arange(num_sets)
+    for name in ResultDtype(model).names[1:-2]:
+        out[name] = np.nan
+    return out
+
+
+def _BootstrapWorker(args):
+    data, model, shared, p0, bounds, seed = args
+    rng = np.random.default_rng(seed)
+    resampled = []
+    for x, y, yerr in data:
+        pick = rng.integers(0, len(x), len(x))
+        resampled.append((x[pick], y[pick], None if yerr is None else yerr[pick]))
+    try:
+        return GlobalFit(resampled, model, shared, p0, bounds)
+    except (ValueError, RuntimeError, np.linalg.LinAlgError):
+        return _FailedRow(model, len(data))
+
+
+def _Run(worker, jobs, processes, chunksize):
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1 or len(jobs) < 2 * chunksize:
+        return [worker(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(worker, jobs, chunksize=chunksize))
+
+
+def Bootstrap(
+    datasets,
+    model: str = "saturated_exp",
+    shared=(),
+    NumOfSamples: int = 200,
+    bounds=None,
+    seed=None,
+    processes=None,
+    chunksize: int = 8,
+) -> np.ndarray:
+    """GlobalFit with errors from a bootstrap over the points of every dataset.
+    The _err columns are the standard deviation of the NumOfSamples resampled fits
+    (failed fits, i.e. exceptions or success False, excluded), the parameters are those of the fit to the original data.
+    The samples run in parallel over processes (number of cores by default, 1 serially).
+    """
+    data = _AsDatasets(datasets)
+    out = GlobalFit(data, model, shared, bounds=bounds)
+    names = MODELS[model][2]
+    p0 = np.column_stack([out[name] for name in names])
+    seeds = np.random.SeedSequence(seed).spawn(NumOfSamples)
+    jobs = [(data, model, shared, p0, bounds, s) for s in seeds]
+    samples = np.stack(_Run(_BootstrapWorker, jobs, processes, chunksize))  ### (samples, datasets)
+    failed = ~samples["success"]
+    for name in names:
+        samples[name][failed] = np.nan
+        out[name + "_err"] = np.nanstd(samples[name], axis=0, ddof=1)
+    return out
+
+
+def _FitManyWorker(args):
+    datasets, model, shared, bounds = args
+    try:
+        return GlobalFit(datasets, model, shared, bounds=bounds)
+    except (ValueError, RuntimeError, np.linalg.LinAlgError):
+        return _FailedRow(model, len(datasets))
+
+
+def FitMany(groups, model: str = "saturated_exp", shared=(), bounds=None, processes=None, chunksize: int = 4) -> np.ndarray:
+    """Independent GlobalFit of every group of datasets (e.g. one group per measurement day).
+    Returns one table with an extra 'group' column, fits run in parallel over processes.
+    """
+    jobs = [(_AsDatasets(datasets), model, shared, bounds) for datasets in groups]
+    rows = _Run(_FitManyWorker, jobs, processes, chunksize)
+    dtype = np.dtype([("group", np.int64)] + ResultDtype(model).descr)
+    out = np.zeros(sum(len(r) for r in rows), dtype=dtype)
+    k = 0
+    for group, r in enumerate(rows):
+        out["group"][k : k + len(r)] = group
+        for name in r.dtype.names:
+            out[name][k : k + len(r)] = r[name]
+        k += len(r)
+    return out
+
+
+def WriteTable(table: np.ndarray, FileName):
+    """Write a structured result array to a CSV file with a header line."""
+    with open(FileName, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(table.dtype.names)
+        writer.writerows(table.tolist())
+
+
+def ReadTable(FileName) -> np.ndarray:
+    """Read back a table written by WriteTable."""
+    return np.genfromtxt(FileName, delimiter=",", names=True, dtype=None, encoding="utf-8")
+
+
+# %%
+"""
+if __name__ == '__main__':
+    Results = Bootstrap([(base, Px_mean_ROD_list, Px_std_avg_ROD_list), (base, Px_mean_NOROD_list, Px_std_avg_NOROD_list)],
+                        model = 'saturated_exp', shared = ('g',), NumOfSamples = 500)
+    WriteTable(Results, 'Pump_duration_fit.csv')
+    plt.plot(base, ModelCurve(base, Results[0]), 'b-')
+"""
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:02:13 2026
+
+@author: MOT_User
+
+Time series of frame bursts (e.g. the MOT fluorescence of Pressure_measurements):
+per-frame ROI sums, Welch power spectral densities and loading-curve fits.
+StreamingLoading does the same while the frames arrive, so that the loading
+rate (and hence the pressure) is updated live during the burst.
+"""
+
+import numpy as np
+from AnalysysBMP_Exp import SubtractImgs
+from scipy import signal
+from SweepFit import FitCurve
+
+# %% GENERAL FUNCTIONS
+
+
+def RoiSums(stack, ImgBkg=None, row_lims="none", col_lims="none", scale: float = 1) -> np.ndarray:
+    """Sum of the pixels in the ROI of every frame of stack (shots, row, col), divided by scale.
+    ImgBkg is subtracted from every frame with SubtractImgs.
+    row_lims and col_lims are two value lists [-,-] (whole frame by default).
+    """
+    stack = np.asarray(stack)
+    if stack.ndim == 2:
+        stack = stack[np.newaxis]
+    if row_lims == "none":
+        row_lims = [0, stack.shape[1]]
+    if col_lims == "none":
+        col_lims = [0, stack.shape[2]]
+    ### Cast to float: uint8 frames would wrap around in the subtraction.
+    roi = stack[:, row_lims[0] : row_lims[1], col_lims[0] : col_lims[1]].astype(np.float64)
+    if ImgBkg is not None:
+        bkg = np.asarray(ImgBkg, dtype=np.float64)[row_lims[0] : row_lims[1], col_lims[0] : col_lims[1]]
+        roi = SubtractImgs(roi, bkg)
+    return roi.sum(axis=(1, 2)) / scale
+
+
+def TimeBase(NumOfPoints: int, FrameRate: float = None, timestamps=None) -> np.ndarray:
+    """Time of every frame in s: from the camera timestamps (ns, first frame at 0)
+    if available, otherwise NumOfPoints samples at FrameRate [Hz].
+    """
+    if timestamps is not None:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        return (timestamps - timestamps[0]) * 1e-9
+    return np.arange(NumOfPoints) / FrameRate
+
+
+def SamplingRate(time_base) -> float:
+    """Mean sampling rate [Hz] of a time base in s."""
+    time_base = np.asarray(time_base, dtype=np.float64)
+    return (len(time_base) - 1) / (time_base[-1] - time_base[0])
+
+
+def PowerSpectrum(data, fs: float, nperseg: int = 128, noverlap=None, window="hann", detrend="linear"):
+    """Welch power spectral density of data sampled at fs [Hz].
+    Returns (frequencies [Hz], PSD [a.u.^2 / Hz]).
+    The loading curve is removed segment by segment with a linear detrend.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    nperseg = min(nperseg, len(data))
+    return signal.welch(data, fs=fs, window=window, nperseg=nperseg, noverlap=noverlap, detrend=detrend)
+
+
+def FitLoading(time_base, data, yerr=None, init_guess=None) -> np.ndarray:
+    """Fit of the loading curve data(t) = N (1 - exp(-g t)) + c.
+    Returns a SweepFit result table (one row) with the loading rate R = N g appended.
+    """
+    fit = FitCurve(time_base, data, "saturated_exp", yerr=yerr, init_guess=init_guess)
+    return LoadingRate(fit)
+
+
+def LoadingRate(fit: np.ndarray) -> np.ndarray:
+    """Append the initial loading rate R = N g [a.u./s] and its error to a saturated_exp table."""
+    out = np.zeros(fit.shape, dtype=fit.dtype.descr + [("R", np.float64), ("R_err", np.float64)])
+    for name in fit.dtype.names:
+        out[name] = fit[name]
+    out["R"] = fit["N"] * fit["g"]
+    out["R_err"] = np.abs(out["R"]) * np.sqrt((fit["N_err"] / fit["N"]) ** 2 + (fit["g_err"] / fit["g"]) ** 2)
+    return out
+
+
+# %% CLASSES
+
+
+class RunningWelch:
+    def __init__(self, fs: float, nperseg: int = 128, noverlap=None, window="hann", detrend="linear"):
+        """Welch PSD accumulated segment by segment while the samples arrive.
+        Spectrum() gives the same result as PowerSpectrum() on all the samples added so far
+        (up to the last incomplete segment).
+        """
+        self.fs = fs
+        self.nperseg = nperseg
+        self.step = nperseg - (nperseg // 2 if noverlap is None else noverlap)
+        self.window = window
+        self.detrend = detrend
+        self.pending = np.zeros(0)
+        self.psd_sum = None
+        self.NumOfSegments = 0
+
+    def Add(self, samples):
+        self.pending = np.concatenate((self.pending, np.atleast_1d(np.asarray(samples, dtype=np.float64))))
+        while len(self.pending) >= self.nperseg:
+            f, psd = signal.periodogram(
+                self.pending[: self.nperseg], fs=self.fs, window=self.window, detrend=self.detrend
+            )
+            self.freq = f
+            self.psd_sum = psd if self.psd_sum is None else self.psd_sum + psd
+            self.NumOfSegments += 1
+            self.pending = self.pending[self.step :]
+
+    def Spectrum(self):
+        """Returns (frequencies [Hz], PSD), None before the first complete segment."""
+        if self.psd_sum is None:
+            return None
+        return self.freq, self.psd_sum / self.NumOfSegments
+
+
+class StreamingLoading:
+    def __init__(
+        self,
+        FrameRate: float,
+        ImgBkg=None,
+        row_lims="none",
+        col_lims="none",
+        scale: float = 1,
+        RefitEvery: int = 25,
+        Window: int = 1000,
+        nperseg: int = 128,
+        CamName=None,
+        callback=None,
+    ):
+        """Loading curve built frame by frame.
+        Every frame is reduced to its ROI sum (see RoiSums) and fed to a RunningWelch.
+        Every RefitEvery frames the loading curve is refitted on at most Window frames evenly
+        spaced over the burst (all of them if Window is None), starting from the previous
+        result, so that a refit costs the same however long the burst. The fitted rates are
+        kept in History and callback(self) is called; both run in the retrieval loop, so the
+        callback should be quick (print or plot History after RetrievePictures).
+        Frame times come from the camera timestamps [ns] when given, otherwise from FrameRate.
+        Use AddFrame as FrameCallback of MultipleCameraSession.RetrievePictures(),
+        if CamName is given the frames of the other cameras are ignored.
+        """
+        self.FrameRate = FrameRate
+        self.ImgBkg = ImgBkg
+        self.row_lims = row_lims
+        self.col_lims = col_lims
+        self.scale = scale
+        self.RefitEvery = RefitEvery
+        self.Window = Window
+        self.CamName = CamName
+        self.callback = callback
+        self.welch = RunningWelch(FrameRate, nperseg)
+        self.sums = np.zeros(256)
+        self.times = np.zeros(256)
+        self.count = 0
+        self.first_timestamp = None
+        self.result = None
+        self.History = []  ### (frame count, R, R_err) of every successful refit.
+        self.Errors = []  ### (frame count, exception) of every failed refit.
+
+    def AddFrame(self, cam_name, Imagenum, img, timestamp=None):
+        """Add one frame. The signature matches the FrameCallback of RetrievePictures."""
+        if self.CamName is not None and cam_name != self.CamName:
+            return
+        if self.count == len(self.sums):
+            self.sums = np.concatenate((self.sums, np.zeros(len(self.sums))))
+            self.times = np.concatenate((self.times, np.zeros(len(self.times))))
+        value = RoiSums(img, self.ImgBkg, self.row_lims, self.col_lims, self.scale)[0]
+        if timestamp is None:
+            t = self.count / self.FrameRate
+        else:
+            if self.first_timestamp is None:
+                self.first_timestamp = timestamp
+            t = (timestamp - self.first_timestamp) * 1e-9
+        self.sums[self.count] = value
+        self.times[self.count] = t
+        self.count += 1
+        self.welch.Add(value)
+        if self.count >= 4 and self.count % self.RefitEvery == 0:
+            self.Refit()
+
+    def Refit(self):
+        init_guess = None
+        if self.result is not None and self.result["success"][0]:
+            init_guess = [self.result[name][0] for name in ("N", "g", "c")]
+        step = 1 if self.Window is None else -(-self.count // self.Window)
+        try:
+            self.result = FitLoading(self.times[: self.count : step], self.sums[: self.count : step], init_guess=init_guess)
+        except (ValueError, RuntimeError, np.linalg.LinAlgError) as excep:
+            self.Errors.append((self.count, excep))
+            return
+        self.History.append((self.count, self.result["R"][0], self.result["R_err"][0]))
+        if self.callback is not None:
+            self.callback(self)
+
+    @property
+    def Data(self):
+        """(time base [s], ROI sums) of the frames added so far."""
+        return self.times[: self.count], self.sums[: self.count]
+
+    @property
+    def Rate(self):
+        """Last fitted loading rate R = N g, NaN before the first fit."""
+        return np.nan if self.result is None else self.result["R"][0]
+
+    def Spectrum(self):
+        return self.welch.Spectrum()
+
+
+# %%
+"""
+Loading = StreamingLoading(FrameRate = 200, ImgBkg = Bkg_Cam_mx.image, scale = 1000, CamName = 'Cam2')
+MCS.RetrievePictures(CamNameToPicNum, ListOfCamerasToBeTriggered, FrameCallback = Loading.AddFrame)
+for count, R, R_err in Loading.History:
+    print('Frame %d, loading rate %.3g +- %.2g' %(count, R, R_err))
+f, psd = Loading.Spectrum()
+plt.semilogy(f, psd)
+"""
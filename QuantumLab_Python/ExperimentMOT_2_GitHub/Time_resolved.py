@@ -19,6 +19,7 @@ import time
 import matplotlib.pyplot as plt
 from AnalysysBMP_Exp import Image_Matrix, SubtractImgs
 from CameraResources import MultipleCameraSession, TransportLayerCreator
+from LoadingCurve import LoadingCurveEngine
 from PIL import Image
 
 ### Third party imports
@@ -39,6 +40,7 @@ folder_path = folder_path + '\\' + dirName
 #%%    
 ### Define exposures for background and experiment (200-500 us)
 Exposure_Cam2 = 500
+FrameRate = 200 ### Frame rate of the burst [Hz], for the loading curves if the chunk timestamps are missing
 det_value = 3.25
 
 #%% BACKGROUND
@@ -69,6 +71,7 @@ Assumes Resource Mangaer alredy created and resources already opened.
 ExperimentDuration = 31 ### Experiment Duration in seconds. 
 number_of_experiments = 1 ### Number of experiments performed
 Output_file = 'y' ### 'y' or 'n': if you want the cameras output in a file
+Save_pictures = 'n' ### 'y' or 'n': save every frame as BMP (the loading curves are always saved)
 #-----------------------------------------------------------------------------
 TRG_performed = 'n' ### Variable that controls if trigger has been performed ['n','y']
 WaveformList = []
@@ -144,6 +147,10 @@ if TRG == 'y':
     print('START EXPERIMENTS: ', '\n')
     try: 
         list_of_detunings = []
+        Loading_engines = {} ### Loading curves N(t) of every run from the chunk timestamps, for each camera.
+        for cam in ListOfCamerasToBeTriggered:
+            Bkg_Cam_mx = Image_Matrix(ImageName = cam + '_0_0.bmp', folder_path = folder_path + '\\' + 'Background')
+            Loading_engines[cam] = LoadingCurveEngine(FrameRate, ImgBkg = Bkg_Cam_mx.image, scale = 1000)
         for det in range(0, 1, 1):       
             print('MOT detuning [V]: ', str(det_value))
             DS_AWG1.ApplyDCVoltage(Load ='1000', AWGChannelNum = '2', Volt = str(det_value))
@@ -160,6 +167,8 @@ if TRG == 'y':
                 if ListOfCamerasToBeTriggered:
                     MCS.RetrievePictures(CamNameToPicNum, ListOfCamerasToBeTriggered) ### Retrieve Pictures from Buffer
                     list_of_dictionaries.append(MCS.CamNameToImageList)
+                    for cam in ListOfCamerasToBeTriggered:
+                        Loading_engines[cam].AddRun(MCS.CamNameToImageList[cam], MCS.CamNameToTimestampList[cam])
                 print('Experiment concluded.', '\n')
                 TRG_performed = 'y'
             list_of_detunings.append(list_of_dictionaries)
@@ -184,7 +193,7 @@ if Output_file == 'y':
         print('Experiment concluded.', '\n')
         
 #%% SAVE PICTURES TO FILE
-if TRG_performed == 'y':
+if TRG_performed == 'y' and Save_pictures == 'y':
    print('...Saving Pictures... \n')
    for l in range(0, 1, 1):
         for j in range(number_of_experiments):
@@ -205,10 +214,8 @@ if ListOfCamerasToBeTriggered:
 if TRG_performed == 'y':
     for i in ListOfCamerasToBeTriggered:
         Bkg_Cam2_mx = Image_Matrix(ImageName = i + '_0_0.bmp', folder_path = folder_path + '\\' + 'Background')  
-        Cam2_mx = Image_Matrix(ImageName = i + '_0_0_0.bmp', folder_path = folder_path)
-        Cam2_img = SubtractImgs(Cam2_mx.image, Bkg_Cam2_mx.image)
-        Cam2_last_mx = Image_Matrix(ImageName = i + '_0_0_%d.bmp' %(CamNameToPicNum[i]-1), folder_path = folder_path)
-        Cam2_last_img = SubtractImgs(Cam2_last_mx.image, Bkg_Cam2_mx.image)
+        Cam2_img = SubtractImgs(list_of_detunings[0][0][i][0].astype(float), Bkg_Cam2_mx.image)
+        Cam2_last_img = SubtractImgs(list_of_detunings[0][0][i][-1].astype(float), Bkg_Cam2_mx.image)
         
         ### PLOTS
         plt.figure()     
@@ -236,6 +243,15 @@ if TRG_performed == 'y':
         plt.show(block = False)
         plt.savefig(folder_path + '\\' + 'panshot.pdf', format='pdf')
 
+#%% LOADING CURVES
+''' Loading fit of every run, results table instead of the pictures'''
+if TRG_performed == 'y':
+    for i in ListOfCamerasToBeTriggered:
+        Loading_fit = Loading_engines[i].Fit(processes = 1)
+        Loading_engines[i].Save(folder_path + '\\' + 'LoadingResults_%s.csv' %i)
+        print('Loading time [s] %s:' %i, Loading_fit['tau'], '+-', Loading_fit['tau_err'])
+        print('Background pressure [mbar] %s:' %i, Loading_fit['P_mbar'], '+-', Loading_fit['P_mbar_err'])
+
 #%% Release Memory
 if TRG == 'y':
     del list_of_detunings, list_of_dictionaries
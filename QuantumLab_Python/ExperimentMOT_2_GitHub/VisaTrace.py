@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 15:48:19 2026
+
+@author: MOT_User
+
+Recording and replay of the VISA traffic of MultiResources.
+TracingResourceManager wraps a pyvisa ResourceManager: every write, query and
+read_raw of the opened resources is logged with its response and latency to a
+JSON-lines trace file. ReplayResourceManager serves the recorded responses
+without any instrument attached, with no delay, the recorded latencies or
+scaled ones. Both are passed to ResourceManagerCreator(rm = ...).
+
+Trace records: {'t': monotonic ns, 'dt': latency ns, 'res': identity string,
+'op': 'write' | 'query' | 'read_raw', 'cmd': command, 'resp': text response,
+'raw': base64 response of read_raw}
+"""
+
+import base64
+import json
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+# %% RECORDING
+
+
+class TracingResource:
+    def __init__(self, resource, trace, name):
+        """Proxy of a pyvisa resource logging every command to trace (a TracingResourceManager)."""
+        self._resource = resource
+        self._trace = trace
+        self._name = name
+
+    def _Call(self, op, func, cmd, *args):
+        t = time.monotonic_ns()
+        t0 = time.perf_counter_ns()
+        resp = func(*args)
+        record = {"t": t, "dt": time.perf_counter_ns() - t0, "res": self._name, "op": op, "cmd": cmd}
+        if op == "query":
+            record["resp"] = resp
+        elif op == "read_raw":
+            record["raw"] = base64.b64encode(resp).decode("ascii")
+        self._trace.Add(record)
+        return resp
+
+    def write(self, message, *args, **kwargs):
+        return self._Call("write", lambda: self._resource.write(message, *args, **kwargs), message)
+
+    def query(self, message, *args, **kwargs):
+        return self._Call("query", lambda: self._resource.query(message, *args, **kwargs), message)
+
+    def read_raw(self, *args, **kwargs):
+        return self._Call("read_raw", lambda: self._resource.read_raw(*args, **kwargs), "")
+
+    def close(self):
+        return self._resource.close()
+
+    def __getattr__(self, name):
+        ### session, timeout, ... of the real resource.
+        return getattr(self._resource, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._resource, name, value)
+
+
+class TracingResourceManager:
+    def __init__(self, rm, FileName, FlushEvery: int = 1000):
+        """Wrap the pyvisa ResourceManager rm, the trace is appended to FileName."""
+        self.rm = rm
+        self.FileName = FileName
+        self.FlushEvery = FlushEvery
+        self.records = []
+        self.file = open(FileName, "a", encoding="utf-8")
+
+    def Add(self, record):
+        self.records.append(record)
+        if len(self.records) >= self.FlushEvery:
+            self.Flush()
+
+    def Flush(self):
+        if self.records:
+            self.file.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in self.records))
+            self.file.flush()
+            self.records = []
+
+    def list_resources(self, *args, **kwargs):
+        return self.rm.list_resources(*args, **kwargs)
+
+    def open_resource(self, resource_name, *args, **kwargs):
+        return TracingResource(self.rm.open_resource(resource_name, *args, **kwargs), self, resource_name)
+
+    def close(self):
+        self.Flush()
+        self.file.close()
+        self.rm.close()
+
+
+# %% REPLAY
+
+
+class ReplayError(LookupError):
+    pass
+
+
+def LoadTrace(FileName):
+    """List of the records of a trace file."""
+    with open(FileName, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayResource:
+    def __init__(self, name, records, latency, session):
+        """Resource answering with the recorded responses of name.
+        Responses are served in the recorded order for each command; when they run out the
+        last one is repeated.
+        """
+        self._name = name
+        self._latency = latency
+        self.session = session
+        self.timeout = 10000
+        self._responses = defaultdict(deque)  ### (op, cmd): responses in order.
+        self._last = {}
+        self._write_dt = defaultdict(deque)
+        for r in records:
+            if r["op"] == "write":
+                self._write_dt[r["cmd"]].append(r["dt"])
+            else:
+                resp = r.get("resp") if r["op"] == "query" else base64.b64decode(r["raw"])
+                self._responses[(r["op"], r["cmd"])].append((resp, r["dt"]))
+
+    def _Wait(self, dt):
+        if self._latency is None or dt is None:
+            return
+        time.sleep(dt * 1e-9 * self._latency)
+
+    def _Serve(self, op, cmd):
+        key = (op, cmd)
+        if self._responses[key]:
+            self._last[key] = self._responses[key].popleft()
+        elif key not in self._last:
+            raise ReplayError("%s: no recorded response to %s %r" % (self._name, op, cmd))
+        resp, dt = self._last[key]
+        self._Wait(dt)
+        return resp
+
+    def write(self, message, *args, **kwargs):
+        dts = self._write_dt.get(message)
+        self._Wait(dts.popleft() if dts else None)
+        return len(message)
+
+    def query(self, message, *args, **kwargs):
+        return self._Serve("query", message)
+
+    def read_raw(self, *args, **kwargs):
+        return self._Serve("read_raw", "")
+
+    def close(self):
+        pass
+
+
+class ReplayResourceManager:
+    def __init__(self, FileName, latency=None):
+        """Replay the trace FileName. latency: None to answer at once, 1 for the recorded
+        latencies, any other number to scale them.
+        """
+        self.records = LoadTrace(FileName)
+        self.latency = latency
+        self.by_resource = defaultdict(list)
+        for r in self.records:
+            self.by_resource[r["res"]].append(r)
+
+    def list_resources(self, *args, **kwargs):
+        return tuple(self.by_resource)
+
+    def open_resource(self, resource_name, *args, **kwargs):
+        if resource_name not in self.by_resource:
+            raise ReplayError("Resource %s is not in the trace" % resource_name)
+        session = list(self.by_resource).index(resource_name) + 1
+        return ReplayResource(resource_name, self.by_resource[resource_name], self.latency, session)
+
+    def close(self):
+        pass
+
+
+# %% ANALYSIS
+
+
+def CommandHead(cmd: str) -> str:
+    """SCPI header of a command without its arguments, e.g. 'SOUR1:DATA:ARB'."""
+    return cmd.split(" ", 1)[0].split(",", 1)[0]
+
+
+def TraceSummary(FileName_or_records) -> np.ndarray:
+    """Latency statistics [ms] by resource, operation and command header, sorted by total time."""
+    records = LoadTrace(FileName_or_records) if isinstance(FileName_or_records, str) else FileName_or_records
+    groups = defaultdict(list)
+    for r in records:
+        groups[(r["res"], r["op"], CommandHead(r["cmd"]))].append(r["dt"] * 1e-6)
+    dtype = [
+        ("res", "U64"),
+        ("op", "U8"),
+        ("cmd", "U64"),
+        ("count", np.int64),
+        ("total_ms", np.float64),
+        ("p50_ms", np.float64),
+        ("p95_ms", np.float64),
+        ("max_ms", np.float64),
+    ]
+    out = np.zeros(len(groups), dtype=dtype)
+    for k, ((res, op, cmd), dts) in enumerate(groups.items()):
+        dts = np.array(dts)
+        out[k] = (res, op, cmd, len(dts), dts.sum(), *np.percentile(dts, [50, 95]), dts.max())
+    return np.sort(out, order="total_ms")[::-1]
+
+
+# %%
+"""
+### Record a lab run
+Mg = ResourceManagerCreator(rm = TracingResourceManager(visa.ResourceManager(), folder_path + '\\' + 'visa_trace.jsonl'))
+...
+Mg.CloseResourceManager()
+print(TraceSummary(folder_path + '\\' + 'visa_trace.jsonl')[:10])
+
+### Replay it on a laptop with the recorded latencies
+Mg = ResourceManagerCreator(rm = ReplayResourceManager('visa_trace.jsonl', latency = 1))
+DS_AWG1 = AWGSession(Mg, 'AWG1', role = 'Captain')
+"""
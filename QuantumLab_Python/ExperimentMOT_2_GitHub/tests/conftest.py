@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+The modules of ExperimentMOT_2_GitHub import each other by name (they are run
+from this folder), so the folder goes on sys.path for the tests.
+"""
+
+import os
+import sys
+
+import matplotlib
+
+matplotlib.use("Agg")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
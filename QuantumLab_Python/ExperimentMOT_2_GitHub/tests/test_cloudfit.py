@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+CloudFit: the analytic Gauss2D Jacobian against finite differences and fits of
+synthetic clouds, also binned and over a stack.
+"""
+
+import numpy as np
+import pytest
+from CloudFit import FitCloud, FitStack, Gauss2D, Gauss2DJacobian, ThomasFermi2D
+
+PARAMS = [31.3, 22.7, 7.5, 4.2, 0.4, 1.3, 0.05]  ### x0, y0, wx, wy, theta, amp, offset
+
+
+def NumericalJacobian(x, y, params, step=1e-6):
+    jac = np.empty((x.size, len(params)))
+    for k in range(len(params)):
+        h = step * max(abs(params[k]), 1)
+        up, down = list(params), list(params)
+        up[k] += h
+        down[k] -= h
+        jac[:, k] = (Gauss2D(x, y, *up) - Gauss2D(x, y, *down)) / (2 * h)
+    return jac
+
+
+def Cloud(func=Gauss2D, params=PARAMS, shape=(48, 64), noise=0.0, seed=0):
+    y, x = np.indices(shape)
+    img = func(x.astype(float), y.astype(float), *params)
+    return img + np.random.default_rng(seed).normal(0, noise, shape)
+
+
+@pytest.mark.parametrize("theta", [0.0, 0.4, -1.2])
+def test_gauss_jacobian_matches_finite_differences(theta):
+    y, x = np.indices((48, 64))
+    x, y = x.ravel().astype(float), y.ravel().astype(float)
+    params = PARAMS[:4] + [theta] + PARAMS[5:]
+    np.testing.assert_allclose(Gauss2DJacobian(x, y, *params), NumericalJacobian(x, y, params), rtol=1e-5, atol=1e-9)
+
+
+@pytest.mark.parametrize("binning", [1, 2])
+def test_gauss_fit_recovers_cloud(binning):
+    fit = FitCloud(Cloud(noise=0.01), "gauss", binning=binning)
+    assert fit["success"][0]
+    expected = {"x0": 31.3, "y0": 22.7, "wx": 7.5, "wy": 4.2, "theta": 0.4, "amp": 1.3}
+    for name, value in expected.items():
+        assert fit[name][0] == pytest.approx(value, abs=0.05 * max(abs(value), 1))
+
+
+def test_axes_are_ordered():
+    ### Minor axis given first: the fit swaps them and turns theta by pi/2.
+    fit = FitCloud(Cloud(params=[31.3, 22.7, 4.2, 7.5, 0.4, 1.3, 0.05]), "gauss")
+    assert fit["wx"][0] == pytest.approx(7.5, rel=1e-3)
+    assert fit["wy"][0] == pytest.approx(4.2, rel=1e-3)
+    assert fit["theta"][0] == pytest.approx(0.4 - np.pi / 2, abs=1e-3)
+
+
+def test_thomas_fermi_fit():
+    params = [30.0, 24.0, 14.0, 9.0, 0.0, 1.0, 0.0]
+    fit = FitCloud(Cloud(ThomasFermi2D, params, noise=0.005), "thomas_fermi")
+    assert fit["x0"][0] == pytest.approx(30.0, abs=0.2)
+    assert fit["wx"][0] == pytest.approx(14.0, rel=0.05)
+    assert fit["wy"][0] == pytest.approx(9.0, rel=0.05)
+
+
+def test_fit_stack_rows():
+    stack = np.stack([Cloud(noise=0.01, seed=k) for k in range(3)] + [np.zeros((48, 64))])
+    fits = FitStack(stack, processes=1)
+    assert len(fits) == 4
+    assert np.all(fits["success"][:3])
+    np.testing.assert_allclose(fits["x0"][:3], 31.3, atol=0.1)
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+CloudMoments: moments of a synthetic cloud and the absolute / relative threshold.
+"""
+
+import numpy as np
+import pytest
+from CloudMoments import CloudAxes, StackMoments
+
+
+def Cloud(amp=2.0, shape=(60, 80)):
+    y, x = np.indices(shape)
+    return amp * np.exp(-0.5 * (((x - 45) / 6.0) ** 2 + ((y - 25) / 3.0) ** 2))
+
+
+def test_moments_of_gaussian():
+    moments = StackMoments(Cloud(), offset=None)
+    assert moments["x0"][0] == pytest.approx(45, abs=1e-6)
+    assert moments["y0"][0] == pytest.approx(25, abs=1e-6)
+    major, minor, theta = CloudAxes(moments)
+    assert major[0] == pytest.approx(6.0, rel=1e-3)
+    assert minor[0] == pytest.approx(3.0, rel=1e-3)
+
+
+def test_threshold_is_absolute_by_default():
+    img = Cloud(amp=2.0)
+    ### 0.5 is an OD: the pixels below 0.5, not below a quarter of the peak, are cut.
+    absolute = StackMoments(img, offset=None, threshold=0.5)
+    relative = StackMoments(img, offset=None, threshold=0.25, relative=True)
+    assert absolute["N"][0] == pytest.approx(relative["N"][0])
+    assert StackMoments(img, offset=None, threshold=0.5, relative=True)["N"][0] < absolute["N"][0]
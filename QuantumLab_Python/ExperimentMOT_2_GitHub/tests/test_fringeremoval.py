@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+FringeRemoval: reconstruction of a fringed reference from a synthetic library,
+cache invalidation and the Save / LoadOptimalReference round trip.
+"""
+
+import numpy as np
+import pytest
+from FringeRemoval import LoadOptimalReference, OptimalReference, RectangularMask
+
+SHAPE = (40, 50)
+ROWS, COLS = [8, 32], [10, 40]  ### Cloud below 1e-12 outside
+
+
+def Fringes(phase, rng=None, noise=0.0):
+    """Probe with moving fringes: any phase is a combination of three patterns."""
+    y, x = np.indices(SHAPE)
+    envelope = 1000 * np.exp(-(((x - 25) / 40.0) ** 2 + ((y - 20) / 30.0) ** 2))
+    img = envelope * (1 + 0.3 * np.sin(0.7 * x + 0.2 * y + phase)) + 50
+    if noise:
+        img = img + rng.normal(0, noise, SHAPE)
+    return img
+
+
+def Library(num=20, seed=0, noise=0.0):
+    rng = np.random.default_rng(seed)
+    return [Fringes(phase, rng, noise) for phase in rng.uniform(0, 2 * np.pi, num)]
+
+
+def Shot(phase=1.234, od=1.0):
+    y, x = np.indices(SHAPE)
+    cloud = od * np.exp(-0.5 * (((x - 25) / 2.0) ** 2 + ((y - 20) / 1.5) ** 2))
+    ### The camera offset (dark level) is not absorbed
+    return (Fringes(phase) - 50) * np.exp(-cloud) + 50, Fringes(phase)
+
+
+def test_reference_rebuilt_under_the_atoms():
+    dark = np.full(SHAPE, 50.0)
+    ref = OptimalReference(Library(), RectangularMask(SHAPE, ROWS, COLS), ImgDark=dark)
+    shot, probe = Shot()
+    rebuilt = ref.Reconstruct(shot)[0]
+    np.testing.assert_allclose(rebuilt, probe - dark, rtol=1e-6)
+    od = ref.OpticalDensity(shot)[0]
+    outside = ~ref.mask
+    assert np.abs(od[outside]).max() < 1e-6
+    ### The cloud is recovered inside the mask, the fringes are gone
+    y, x = np.indices(SHAPE)
+    expected = np.exp(-0.5 * (((x - 25) / 2.0) ** 2 + ((y - 20) / 1.5) ** 2))
+    np.testing.assert_allclose(od, expected, atol=1e-6)
+    ### A bright frame with other fringes leaves them in the optical density
+    naive = np.log((Library(1, seed=5)[0] - dark) / (shot - dark))
+    assert np.abs(naive[outside]).max() > 0.1
+
+
+def test_noisy_library_residual():
+    ref = OptimalReference(Library(noise=5.0), RectangularMask(SHAPE, ROWS, COLS), NumOfComponents=3)
+    shot, probe = Shot(phase=4.0)
+    assert ref.Residual(shot)[0] < 5.0
+    assert ref.Residual(np.stack([shot, shot])).shape == (2,)
+
+
+def test_cache_invalidated_by_library_and_mask():
+    ref = OptimalReference(Library(4), RectangularMask(SHAPE, ROWS, COLS))
+    shot, probe = Shot()
+    assert ref.Coefficients(shot).shape == (1, 4)
+    weights = ref.weights
+    assert weights is not None
+    ref.Coefficients(shot)
+    assert ref.weights is weights  ### Cached between shots
+    ref.AddBrightFrames(Library(3, seed=1))
+    assert ref.weights is None
+    assert ref.Coefficients(shot).shape == (1, 7)
+    wide = RectangularMask(SHAPE, [5, 35], [5, 45])
+    ref.SetAtomMask(wide)
+    assert ref.weights is None
+    ref.Coefficients(shot)
+    assert ref.weights.shape == (7, (~wide).sum())
+
+
+def test_shape_mismatch_rejected():
+    ref = OptimalReference(Library(3), RectangularMask(SHAPE, ROWS, COLS))
+    with pytest.raises(ValueError):
+        ref.SetAtomMask(np.zeros((SHAPE[0] + 1, SHAPE[1]), dtype=bool))
+    with pytest.raises(ValueError):
+        ref.AddBrightFrames(np.zeros((2, SHAPE[0], SHAPE[1] + 1)))
+
+
+@pytest.mark.parametrize("dark, num", [(None, None), (np.full(SHAPE, 50.0), 3)])
+def test_save_load_round_trip(tmp_path, dark, num):
+    ref = OptimalReference(Library(), RectangularMask(SHAPE, ROWS, COLS), ImgDark=dark, NumOfComponents=num)
+    file_name = str(tmp_path / "optref.npz")
+    ref.Save(file_name)
+    loaded = LoadOptimalReference(file_name)
+    assert loaded.NumOfComponents == num
+    assert loaded.rcond == ref.rcond
+    np.testing.assert_array_equal(loaded.mask, ref.mask)
+    np.testing.assert_array_equal(loaded.library, ref.library)
+    np.testing.assert_array_equal(loaded.weights, ref.weights)
+    if dark is None:
+        assert loaded.dark is None
+    else:
+        np.testing.assert_array_equal(loaded.dark, dark)
+    shot, probe = Shot()
+    np.testing.assert_allclose(loaded.OpticalDensity(shot), ref.OpticalDensity(shot))
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+SweepFit: analytic Jacobians against finite differences, global fits with shared
+parameters and the bootstrap.
+"""
+
+import numpy as np
+import pytest
+from AnalysysBMP_Exp import Gauss, Lorentzian, SaturatedExp
+from SweepFit import (
+    Bootstrap,
+    FitCurve,
+    GaussJacobian,
+    GlobalFit,
+    LorentzianJacobian,
+    SaturatedExpJacobian,
+)
+
+
+def NumericalJacobian(func, x, params, step=1e-6):
+    jac = np.empty((len(x), len(params)))
+    for k in range(len(params)):
+        h = step * max(abs(params[k]), 1)
+        up, down = list(params), list(params)
+        up[k] += h
+        down[k] -= h
+        jac[:, k] = (func(x, *up) - func(x, *down)) / (2 * h)
+    return jac
+
+
+@pytest.mark.parametrize(
+    "func, jac_func, params",
+    [
+        (SaturatedExp, SaturatedExpJacobian, [3.0, 0.2, 0.5]),
+        (Lorentzian, LorentzianJacobian, [2.0, 1.5, 0.8, 0.1]),
+        (Gauss, GaussJacobian, [2.0, -0.5, 1.2, 0.3]),
+    ],
+)
+def test_jacobian_matches_finite_differences(func, jac_func, params):
+    x = np.linspace(-5, 20, 60)
+    np.testing.assert_allclose(jac_func(x, *params), NumericalJacobian(func, x, params), rtol=1e-6, atol=1e-8)
+
+
+def test_fit_recovers_saturated_exp():
+    rng = np.random.default_rng(1)
+    x = np.linspace(0, 50, 80)
+    y = SaturatedExp(x, 2.0, 0.1, 0.3) + rng.normal(0, 0.01, x.size)
+    fit = FitCurve(x, y, "saturated_exp", yerr=np.full(x.size, 0.01))
+    assert fit["success"][0]
+    for name, value in (("N", 2.0), ("g", 0.1), ("c", 0.3)):
+        assert abs(fit[name][0] - value) < 5 * fit[name + "_err"][0]
+
+
+def test_shared_parameter_is_common():
+    rng = np.random.default_rng(2)
+    x = np.linspace(0, 50, 80)
+    datasets = [(x, SaturatedExp(x, N, 0.1, 0.0) + rng.normal(0, 0.01, x.size), None) for N in (1.0, 3.0)]
+    fit = GlobalFit(datasets, "saturated_exp", shared=("g",))
+    assert fit["g"][0] == fit["g"][1]
+    assert fit["g"][0] == pytest.approx(0.1, rel=0.02)
+    np.testing.assert_allclose(fit["N"], [1.0, 3.0], rtol=0.02)
+
+
+def test_bootstrap_excludes_failed_fits(monkeypatch):
+    import SweepFit
+
+    rng = np.random.default_rng(3)
+    x = np.linspace(0, 50, 40)
+    datasets = [(x, SaturatedExp(x, 2.0, 0.1, 0.3) + rng.normal(0, 0.01, x.size), None)]
+    worker = SweepFit._BootstrapWorker
+    calls = []
+
+    def FailEveryOther(args):
+        result = worker(args)
+        calls.append(None)
+        if len(calls) % 2:
+            ### A fit that did not converge, far from the others.
+            result["N"] = 1e6
+            result["success"] = False
+        return result
+
+    monkeypatch.setattr(SweepFit, "_BootstrapWorker", FailEveryOther)
+    fit = Bootstrap(datasets, "saturated_exp", NumOfSamples=20, seed=0, processes=1)
+    assert len(calls) == 20
+    assert 0 < fit["N_err"][0] < 0.1
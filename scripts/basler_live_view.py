@@ -3,14 +3,32 @@
 Basler Camera Live View Script
 Displays live video feed from a connected Basler camera using pypylon library
 in a real-time OpenCV window.
+
+Monochrome cameras are displayed in their native Mono8/Mono12 format: each
+frame is downscaled to the window size before it is converted to BGR and the
+overlays are drawn on the small image (see live_view_utils.to_display).
+
+Press 'a' to analyse the frames on a worker thread (ROI sum, peak, centroid,
+RMS width, focus and saturation, see frame_analysis): the numbers are drawn
+on the image and a strip chart window shows their history.
+
+With --serve PORT the frames are also streamed over HTTP as /cam0/ (see
+frame_streaming); add --no-window to run without a local window.
 """
 
+import argparse
 import os
 import sys
 import time
 import cv2
 from pypylon import pylon
 
+from frame_analysis import FrameAnalysisWorker, draw_overlay, draw_strip_chart
+from frame_streaming import add_stream_arguments, server_from_args
+from live_view_utils import make_frame_converter, to_display, window_size
+
+STRIP_CHART_RATE = 5.0  # Strip chart redraws per second, whatever the camera FPS
+
 # ...existing code...
 def initialize_camera():
     """Initialize and configure the Basler camera."""
@@ -76,11 +94,11 @@ def initialize_camera():
         # Set camera parameters for optimal live view
         camera.MaxNumBuffer = 5  # Smaller buffer for live view
 
-        # Set pixel format (try to set, skip if not available)
+        # Keep the native pixel format (Mono8/Mono12 are displayed without conversion)
         try:
-            camera.PixelFormat.SetValue(pylon.PixelType_BGR8packed)
+            print(f"Pixel format: {camera.PixelFormat.GetValue()}")
         except Exception as e:
-            print(f"Could not set pixel format: {e}")
+            print(f"Could not read pixel format: {e}")
 
         # Set acquisition mode to continuous
         try:
@@ -107,31 +125,43 @@ def initialize_camera():
         return None
 
 
-def display_live_view(camera):
-    """Display live video feed from the camera."""
+def display_live_view(camera, stream=None, show_window=True):
+    """Display live video feed from the camera.
+
+    stream: FrameBroadcaster the frames are also published to; show_window False
+    only streams them (stop with Ctrl+C).
+    """
     try:
-        # Create image converter
-        converter = pylon.ImageFormatConverter()
-        converter.OutputPixelFormat = pylon.PixelType_BGR8packed
-        converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
+        # Native frames for Mono8/Mono12, pylon converter only for packed or colour formats
+        convert, bits = make_frame_converter(camera)
         
         # Start grabbing
         camera.StartGrabbing(pylon.GrabStrategy_LatestImageOnly)
         
         # Create window
         window_name = "Basler Camera Live View"
-        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+        if show_window:
+            cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
         
         # Variables for FPS calculation
         frame_count = 0
         start_time = time.time()
         fps_update_interval = 30  # Update FPS every 30 frames
+        fps = 0.0
+        display_size = (640, 480)
         
         print("\nLive view started!")
         print("Controls:")
         print("  - Press 'q' or ESC to quit")
         print("  - Press 'f' to toggle fullscreen")
         print("  - Press 's' to save current frame")
+        print("  - Press 'a' to toggle the frame analysis, 'r' to select its ROI, 'c' to clear it")
+        
+        # Frame analysis (off until 'a' is pressed)
+        analysis = None
+        roi = None
+        chart_window = "Basler Camera Analysis"
+        next_chart = 0.0
         
         fullscreen = False
         frame_save_count = 0
@@ -172,38 +202,45 @@ def display_live_view(camera):
             grabResult = camera.RetrieveResult(5000, pylon.TimeoutHandling_ThrowException)
             
             if grabResult.GrabSucceeded():
-                # Convert to OpenCV format
-                image = converter.Convert(grabResult)
-                img_array = image.GetArray()
+                # Native frame (full resolution, kept for saving)
+                img_array = convert(grabResult)
+                if analysis is not None:
+                    analysis.submit(img_array)  # Never waits for the worker
+                if stream is not None:
+                    stream.publish(img_array, bits)  # Never waits for the clients
+                if not show_window:
+                    frame_count += 1
+                    grabResult.Release()
+                    continue
                 
-                # Calculate and display FPS
+                # Calculate FPS and follow the window size
                 frame_count += 1
                 if frame_count % fps_update_interval == 0:
                     elapsed_time = time.time() - start_time
                     fps = fps_update_interval / elapsed_time
-                    
-                    # Add FPS text to image
-                    img_display = img_array.copy()
-                    cv2.putText(img_display, f"FPS: {fps:.1f}", (10, 30), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                    
-                    # Add frame counter
-                    cv2.putText(img_display, f"Frame: {frame_count}", (10, 70), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                    
-                    # Add controls info (include exposure controls)
-                    cv2.putText(img_display, "Press 'q' to quit", (10, img_display.shape[0] - 110), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                    cv2.putText(img_display, "Press 'f' for fullscreen", (10, img_display.shape[0] - 80), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                    cv2.putText(img_display, "Press 's' to save frame", (10, img_display.shape[0] - 50), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                    cv2.putText(img_display, "Press '[' / ']' to decrease / increase exposure", (10, img_display.shape[0] - 20), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                    
+                    display_size = window_size(window_name, display_size)
                     start_time = time.time()
-                else:
-                    img_display = img_array
+                
+                # Downscale to the window before the BGR conversion, overlays on the small image
+                img_display = to_display(img_array, *display_size, bits=bits)
+                cv2.putText(img_display, f"FPS: {fps:.1f}", (10, 25), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                cv2.putText(img_display, f"Frame: {frame_count}", (10, 55), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                
+                # Add controls info (include exposure controls)
+                cv2.putText(img_display, "q: quit  f: fullscreen  s: save", (10, img_display.shape[0] - 35), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                cv2.putText(img_display, "[ / ]: decrease / increase exposure", (10, img_display.shape[0] - 12), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                
+                # Latest analysis results, strip chart at its own rate
+                scale = img_display.shape[1] / img_array.shape[1]
+                if analysis is not None:
+                    draw_overlay(img_display, analysis.latest, scale)
+                    if time.time() >= next_chart:
+                        cv2.imshow(chart_window, draw_strip_chart(analysis.history))
+                        next_chart = time.time() + 1.0 / STRIP_CHART_RATE
                 
                 # Display the image
                 cv2.imshow(window_name, img_display)
@@ -229,10 +266,34 @@ def display_live_view(camera):
                     if not os.path.exists(output_dir):
                         os.makedirs(output_dir)
                     
-                    filename = f"basler_frame_{timestamp}_{frame_save_count:03d}.jpg"
+                    # Full resolution native frame; more than 8 bits only fit in PNG
+                    ext = "jpg" if img_array.dtype == "uint8" else "png"
+                    filename = f"basler_frame_{timestamp}_{frame_save_count:03d}.{ext}"
                     filepath = os.path.join(output_dir, filename)
                     cv2.imwrite(filepath, img_array)
                     print(f"Frame saved to: {filepath}")
+                elif key == ord('a'):  # 'a' key to toggle the frame analysis
+                    if analysis is None:
+                        analysis = FrameAnalysisWorker(roi=roi, saturation_level=2 ** bits - 1)
+                        analysis.start()
+                        print("Frame analysis on")
+                    else:
+                        analysis.stop()
+                        analysis = None
+                        cv2.destroyWindow(chart_window)
+                        print("Frame analysis off")
+                elif key == ord('r'):  # 'r' key to select the analysis ROI on the displayed image
+                    x, y, w, h = cv2.selectROI(window_name, img_display, False)
+                    if w > 0 and h > 0:
+                        roi = (int(x / scale), int(y / scale), int(w / scale), int(h / scale))
+                        print(f"Analysis ROI: {roi}")
+                        if analysis is not None:
+                            analysis.roi = roi
+                elif key == ord('c'):  # 'c' key to analyse the whole frame again
+                    roi = None
+                    if analysis is not None:
+                        analysis.roi = None
+                    print("Analysis ROI cleared")
                 elif key == ord(']'):
                     print("Increasing exposure...")
                     # Increase exposure (best-effort)
@@ -266,6 +327,8 @@ def display_live_view(camera):
             grabResult.Release()
         
         # Clean up
+        if analysis is not None:
+            analysis.stop()
         camera.StopGrabbing()
         cv2.destroyAllWindows()
         
@@ -284,6 +347,11 @@ def display_live_view(camera):
 
 def main():
     """Main function to run the live view script."""
+    parser = argparse.ArgumentParser(description="Live view of a Basler camera")
+    add_stream_arguments(parser)
+    args = parser.parse_args()
+    server = server_from_args(args)
+    
     print("Basler Camera Live View")
     print("=" * 30)
     
@@ -296,14 +364,20 @@ def main():
         sys.exit(1)
     
     try:
-        # Start live view
-        display_live_view(camera)
+        # Start live view (and the HTTP stream)
+        stream = None
+        if server is not None:
+            stream = server.add_stream("cam0")
+            server.start()
+        display_live_view(camera, stream, show_window=server is None or not args.no_window)
         
     except Exception as e:
         print(f"Error: {e}")
         
     finally:
         # Clean up
+        if server is not None:
+            server.stop()
         if camera.IsOpen():
             camera.Close()
         print("Camera closed successfully")
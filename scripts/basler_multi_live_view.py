@@ -10,8 +10,18 @@ Controls:
   - Press 'c' to cycle selected camera
   - Press '[' / ']' to decrease / increase exposure on selected camera (if supported)
   - Press 'f' to toggle fullscreen on selected camera's window
+
+Every camera is grabbed by its own thread (see live_view_utils), the display
+loop only renders new frames, at most MAX_DISPLAY_FPS times per second.
+Monochrome cameras stay in their native pixel format; the display loop
+downscales only the frames it shows to the window size and annotates the
+small image.
+
+With --serve PORT every camera is also streamed over HTTP as /cam<idx>/
+(see frame_streaming); add --no-window to run without local windows.
 """
 
+import argparse
 import os
 import sys
 import math
@@ -19,17 +29,17 @@ import time
 import cv2
 from pypylon import pylon
 
+from frame_streaming import add_stream_arguments, server_from_args
+from live_view_utils import CameraGrabThread, make_frame_converter, to_display
+
 WINDOW_BASE_NAME = "Basler Camera"
+MAX_DISPLAY_FPS = 30.0
 
 def create_camera(device):
     """Create and configure a Basler camera for live view."""
     cam = pylon.InstantCamera(pylon.TlFactory.GetInstance().CreateDevice(device))
     cam.Open()
     cam.MaxNumBuffer = 5
-    try:
-        cam.PixelFormat.SetValue(pylon.PixelType_BGR8packed)
-    except Exception:
-        pass
     try:
         cam.AcquisitionMode.SetValue(pylon.AcquisitionMode_Continuous)
     except Exception:
@@ -74,11 +84,11 @@ def init_cameras():
                 "model": model,
                 "serial": serial,
                 "window_name": f"{WINDOW_BASE_NAME} {idx} - {model} (S/N:{serial})",
-                "converter": pylon.ImageFormatConverter(),
+                "convert": None,
+                "bits": 8,
+                "display_size": (640, 480),
                 "frame": None,
-                "frames_count": 0,
-                "fps_time": time.time(),
-                "fps": 0.0,
+                "grabber": None,
                 "fullscreen": False,
                 "exposure_supported": False,
                 "exp_val": None,
@@ -88,13 +98,10 @@ def init_cameras():
         except Exception as e:
             print(f"Could not initialize camera {idx}: {e}")
 
-    # Configure converters and exposure settings per camera
+    # Configure frame conversion (native Mono when possible) and exposure settings per camera
     for cam_info in cameras:
-        conv = cam_info["converter"]
-        conv.OutputPixelFormat = pylon.PixelType_BGR8packed
-        conv.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
-
         cam = cam_info["camera"]
+        cam_info["convert"], cam_info["bits"] = make_frame_converter(cam)
         # Try to setup exposure controls (best-effort)
         try:
             if hasattr(cam, "ExposureAuto"):
@@ -119,13 +126,23 @@ def init_cameras():
     return cameras
 
 def start_grabbing_all(cameras):
-    for cam_info in cameras:
+    for idx, cam_info in enumerate(cameras):
         try:
             cam_info["camera"].StartGrabbing(pylon.GrabStrategy_LatestImageOnly)
         except Exception as e:
             print(f"Warning: could not start grabbing for {cam_info['window_name']}: {e}")
+            continue
+        cam_info["grabber"] = CameraGrabThread(
+            cam_info["camera"],
+            convert=cam_info["convert"],
+            name=f"grab-cam{idx}",
+        )
+        cam_info["grabber"].start()
 
 def stop_and_close_all(cameras):
+    for cam_info in cameras:
+        if cam_info["grabber"] is not None:
+            cam_info["grabber"].stop()
     for cam_info in cameras:
         cam = cam_info["camera"]
         try:
@@ -158,6 +175,7 @@ def tile_windows(cameras, max_win_w=640, max_win_h=480, gap=10):
 
     screen_x, screen_y = 0, 0
     for idx, cam_info in enumerate(cameras):
+        cam_info["display_size"] = (win_w, win_h)
         r = idx // cols
         c = idx % cols
         x = screen_x + c * (win_w + gap)
@@ -174,7 +192,9 @@ def save_frames(cameras, out_dir="output"):
         frame = cam_info.get("frame")
         if frame is None:
             continue
-        filename = f"basler_cam{idx}_{cam_info['serial']}_{ts}.jpg"
+        # Full resolution frame; more than 8 bits only fit in PNG
+        ext = "jpg" if frame.dtype == "uint8" else "png"
+        filename = f"basler_cam{idx}_{cam_info['serial']}_{ts}.{ext}"
         filepath = os.path.join(out_dir, filename)
         try:
             cv2.imwrite(filepath, frame)
@@ -188,6 +208,12 @@ def clamp(val, mn, mx):
     return max(mn, min(val, mx))
 
 def main():
+    parser = argparse.ArgumentParser(description="Live view of all the connected Basler cameras")
+    add_stream_arguments(parser)
+    args = parser.parse_args()
+    server = server_from_args(args)
+    show_window = server is None or not args.no_window
+
     print("Basler Multi-Camera Live View")
     print("=" * 30)
     cameras = init_cameras()
@@ -204,16 +230,24 @@ def main():
             pass
 
     # Prepare windows tiled
-    tile_windows(cameras)
+    if show_window:
+        tile_windows(cameras)
 
     # Start grabbing
     start_grabbing_all(cameras)
 
+    # One HTTP stream per camera
+    if server is not None:
+        for idx, cam_info in enumerate(cameras):
+            cam_info["stream"] = server.add_stream(f"cam{idx}", bits=cam_info["bits"])
+        server.start()
+
     # Display loop variables
     running = True
     selected_idx = 0
     frame_save_count = 0
-    fps_update_interval = 30
+    display_interval = 1.0 / MAX_DISPLAY_FPS
+    next_display = time.perf_counter()
 
     print("\nLive view started! Controls:")
     print("  - Press 'q' or ESC to quit")
@@ -226,46 +260,34 @@ def main():
         # main loop
         while running:
             for idx, cam_info in enumerate(cameras):
-                cam = cam_info["camera"]
-                if not cam.IsGrabbing():
+                grabber = cam_info["grabber"]
+                if grabber is None:
                     continue
-                try:
-                    grabResult = cam.RetrieveResult(2000, pylon.TimeoutHandling_ThrowException)
-                except Exception as e:
-                    # skip on timeout or errors
+                # Only the newest frame of each camera, never wait for a camera
+                item = grabber.mailbox.take()
+                if item is None:
                     continue
+                _, frame, _ = item
+                cam_info["frame"] = frame
+                if cam_info.get("stream") is not None:
+                    cam_info["stream"].publish(frame)  # Never waits for the clients
+                if not show_window:
+                    continue
+
+                # Downscale here, only the frames actually shown; annotate the small copy only
+                disp = to_display(frame, *cam_info["display_size"], bits=cam_info["bits"])
+                cv2.putText(disp, f"Cam {idx} {cam_info['model']} (S/N:{cam_info['serial']})", (10, 25),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+                cv2.putText(disp, f"FPS: {grabber.fps:.1f}", (10, 55),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                cv2.putText(disp, f"Selected: {'*' if idx == selected_idx else ' '}", (10, 85),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255) if idx == selected_idx else (255, 255, 255), 2)
 
-                if grabResult and grabResult.GrabSucceeded():
-                    # convert and store
-                    img = cam_info["converter"].Convert(grabResult)
-                    frame = img.GetArray()
-                    cam_info["frame"] = frame
-
-                    # Update FPS
-                    cam_info["frames_count"] += 1
-                    if cam_info["frames_count"] % fps_update_interval == 0:
-                        elapsed = time.time() - cam_info["fps_time"]
-                        if elapsed > 0:
-                            cam_info["fps"] = fps_update_interval / elapsed
-                        cam_info["fps_time"] = time.time()
-
-                    # Annotate frame with info
-                    disp = frame.copy()
-                    cv2.putText(disp, f"Cam {idx} {cam_info['model']} (S/N:{cam_info['serial']})", (10, 25),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                    cv2.putText(disp, f"FPS: {cam_info['fps']:.1f}", (10, 55),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-                    cv2.putText(disp, f"Selected: {'*' if idx == selected_idx else ' '}", (10, 85),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255) if idx == selected_idx else (255, 255, 255), 2)
-
-                    # Display the frame
-                    cv2.imshow(cam_info["window_name"], disp)
-
-                if grabResult:
-                    grabResult.Release()
+                # Display the frame
+                cv2.imshow(cam_info["window_name"], disp)
 
             # Handle key input
-            key = cv2.waitKey(1) & 0xFF
+            key = cv2.waitKey(1) & 0xFF if show_window else 255
             if key != 255:  # a key was pressed
                 if key == ord('q') or key == 27:
                     running = False
@@ -312,8 +334,13 @@ def main():
                             print(f"Could not decrease exposure on camera {selected_idx}: {e}")
                     else:
                         print("Exposure adjustment not supported on this camera.")
-            # small sleep to reduce CPU usage
-            time.sleep(0.001)
+            # Cap the display rate: the grab threads keep running meanwhile
+            next_display += display_interval
+            delay = next_display - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_display = time.perf_counter()
 
     except KeyboardInterrupt:
         print("\nLive view interrupted by user")
@@ -323,6 +350,8 @@ def main():
 
     finally:
         print("\nStopping and closing cameras...")
+        if server is not None:
+            server.stop()
         stop_and_close_all(cameras)
         cv2.destroyAllWindows()
         print("Done.")
@@ -1,10 +1,11 @@
 import matplotlib.pyplot as plt
 from datetime import datetime
-import csv
 import time
 import sys
 import json
 from instrumental.drivers.vacuum.ngc import NGC2D, Gauge, GaugeSelection
+from live_plot import LivePlot
+from timeseries_store import TimeSeriesWriter
 from utils import read_temperature_data, initialize_serial_connection, initialize_pressure_gauge, load_config
 
 
@@ -28,8 +29,8 @@ if __name__ == "__main__":
 
     
     # Initialize connections
-    #ser_cube = initialize_serial_connection(temp_sensor_port_cube)
-    #ser_bellow = initialize_serial_connection(temp_sensor_port_bellow)
+    #ser_cube = initialize_serial_connection(temp_sensor_port_cube, config.get('temperature_sensor_baudrate', 9600))
+    #ser_bellow = initialize_serial_connection(temp_sensor_port_bellow, config.get('temperature_sensor_baudrate', 9600))
 
     pressure_gauge_port = config.get('pressure_gauge_port')
     
@@ -44,38 +45,36 @@ if __name__ == "__main__":
     
     # Temperature plot
     thermistors = ["Sublimation pump", "Chamber sleeve", "Bellow sleeve","Metal interface", "Ion gauge", "Quartz cube"]
-    temp_lines = [ax1.plot([], [], label=thermistors[i])[0] for i in range(6)]
+    # Bounded min/max history, blitted redraws at most twice a second
+    plot = LivePlot(fig, max_fps=2)
+    for i in range(6):
+        plot.add_line(i, ax1, label=thermistors[i])
     ax1.set_ylim(0, 120)  # Temperature range
-    ax1.set_xlabel('Time')
+    ax1.set_xlabel('Time (s)')
     ax1.set_ylabel('Temperature (°C)')
     ax1.legend()
     
     # Pressure plot
-    pressure_line, = ax2.plot([], [], label='Pressure')
+    plot.add_line("pressure", ax2, label='Pressure')
     ax2.set_yscale('log')  # Use log scale for pressure
-    ax2.set_xlabel('Time')
+    ax2.set_xlabel('Time (s)')
     ax2.set_ylabel('Pressure (mbar)')
     ax2.legend()
 
     # Add text annotation for bakeout status
-    bakeout_text = ax2.text(0.02, 0.95, '', transform=ax2.transAxes, 
-                           bbox=dict(facecolor='white', alpha=0.8))
+    bakeout_text = plot.add_artist(ax2.text(0.02, 0.95, '', transform=ax2.transAxes, 
+                                            bbox=dict(facecolor='white', alpha=0.8)))
 
-    # Data storage]
-    temps = [[], [], [], [], [], []]
-    temperature_times = []
-    pressures = []
-    pressure_times = []
     time.sleep(10)
-    # CSV file for storage
-    with open('temperature_pressure_data.csv', 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['Time', 'Sublimation pump', 'Chamber sleeve', 'Bellow sleeve','Metal interface', 'Ion gauge', 'Quartz cube', 'Pressure (mbar)'])
+    # Binary storage, batched writes (CSV on demand: python timeseries_store.py temperature_pressure_data.ts --csv ...)
+    with TimeSeriesWriter('temperature_pressure_data.ts', thermistors + ['Pressure (mbar)']) as store:
         
         print("Starting data collection...")
+        start_time = datetime.now()
         while True:
             try:
                 current_time = datetime.now()
+                elapsed_seconds = (current_time - start_time).total_seconds()
                 # Read temperature data
                 #temp_values = read_temperature_data(ser_cube)+read_temperature_data(ser_bellow)
                 temp_values = [0,0,0,0,0,0]
@@ -95,40 +94,18 @@ if __name__ == "__main__":
                     bakeout_text.set_text(bakeout_status)
                 
                 if None not in [pressure, pressure_gauge_port]:
-                    pressure_times.append(current_time)
-
-                    # Convert times to seconds for plotting
-                    time_seconds = [(t - pressure_times[0]).total_seconds() for t in pressure_times]
-
                     # Update pressure data
-                    pressures.append(pressure)
-                    pressure_line.set_data(time_seconds, pressures)
-                    # Update pressure plot
-                    ax2.set_xlim(min(time_seconds), max(time_seconds))
-                    ax2.set_ylim(min(pressures) * 0.1, max(pressures) * 10)
+                    plot.append("pressure", elapsed_seconds, pressure)
 
                 if None not in [temp_values, temp_sensor_port_bellow, temp_sensor_port_cube]:
-                    temperature_times.append(current_time)
                     # Update temperature data
                     for i in range(6):
-                        temps[i].append(temp_values[i])
-                    
-                    # Convert times to seconds for plotting
-                    time_seconds = [(t - temperature_times[0]).total_seconds() for t in temperature_times]
-                    
-                    # Update temperature plot
-                    for i in range(6):
-                        temp_lines[i].set_data(time_seconds, temps[i])
-                    ax1.set_xlim(min(time_seconds), max(time_seconds))
-                    ax1.set_ylim(min(min(t) for t in temps) - 5, max(max(t) for t in temps) + 5)
-                    
+                        plot.append(i, elapsed_seconds, temp_values[i])
                     
-                    # Redraw the plot
-                    fig.canvas.draw()
-                    fig.canvas.flush_events()                  
-                # Save to CSV
-                writer.writerow([current_time] + temp_values + [pressure])
-                f.flush()
+                    # Redraw the plot (throttled)
+                    plot.update()
+                # Save to the store
+                store.append(current_time.timestamp(), temp_values + [pressure])
                 print(f"Data saved: Temperatures {temp_values}, Pressure {pressure:.2e} mbar")
                         
             except KeyboardInterrupt:
@@ -5,8 +5,9 @@ import time
 from datetime import datetime
 
 import matplotlib.pyplot as plt
-from utils import (initialize_serial_connection, load_config,
-                   read_temperature_data)
+from live_plot import LivePlot
+from utils import (TemperatureStream, initialize_serial_connection,
+                   load_config, read_temperature_data)
 
 if __name__ == "__main__":
     plt.ion()  # Interactive mode
@@ -20,49 +21,48 @@ if __name__ == "__main__":
         sys.exit(1)
 
     # Initialize connection
-    ser = initialize_serial_connection(temp_sensor_port)
+    ser = initialize_serial_connection(temp_sensor_port, config.get('temperature_sensor_baudrate', 9600))
 
     # Create figure
     fig, ax = plt.subplots(figsize=(10, 6))
     
-    # Temperature plot
-    temp_line, = ax.plot([], [], label='Temperature')
+    # Temperature plot: bounded min/max history, blitted redraws at most twice a second
+    plot = LivePlot(fig, max_fps=2)
+    plot.add_line("temperature", ax, label='Temperature')
     ax.set_ylim(0, 120)  # Temperature range
     ax.set_xlabel('Time (seconds)')
     ax.set_ylabel('Temperature (°C)')
     ax.legend()
 
-    # Data storage
-    temps = []
-    temperature_times = []
     time.sleep(10)
+    stream = None
+    if config.get('temperature_sensor_streaming', False):
+        # Streaming mode of read_temperatures.ino: decoded on a reader thread, one sample per second logged
+        stream = TemperatureStream(ser).start()
     # CSV file for storage
     with open('temperature_data.csv', 'w', newline='') as f:
         writer = csv.writer(f)
         writer.writerow(['Time', 'Temperature'])
         
         print("Starting data collection...")
+        start_time = datetime.now()
         while True:
             try:
+                if stream is not None:
+                    time.sleep(1)
                 current_time = datetime.now()
                 # Read temperature data
-                temp_value = read_temperature_data(ser)[0]
+                if stream is not None:
+                    temp_value = stream.latest(max_age=2)[0]
+                else:
+                    temp_value = read_temperature_data(ser)[0]
                 print(temp_value)
                 
-                temperature_times.append(current_time)
-                temps.append(temp_value)
-                
-                # Convert times to seconds for plotting
-                time_seconds = [(t - temperature_times[0]).total_seconds() for t in temperature_times]
-                
                 # Update temperature plot
-                temp_line.set_data(time_seconds, temps)
-                ax.set_xlim(min(time_seconds), max(time_seconds))
-                ax.set_ylim(min(temps) - 5, max(temps) + 5)
+                plot.append("temperature", (current_time - start_time).total_seconds(), temp_value)
                 
-                # Redraw the plot
-                fig.canvas.draw()
-                fig.canvas.flush_events()
+                # Redraw the plot (throttled)
+                plot.update()
                 
                 # Save to CSV
                 writer.writerow([current_time, temp_value])
@@ -76,5 +76,7 @@ if __name__ == "__main__":
                 print(f"Unexpected error: {e}")
                 time.sleep(1)  # Prevent tight loop on error
                 
+    if stream is not None:
+        stream.stop()
     ser.close()
     print("Connection closed")
\ No newline at end of file
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Per-frame analysis for the live view, to align the MOT optics on numbers.
+
+FrameAnalysisWorker runs on its own thread: the display loop submits frames
+without waiting (a frame arriving while the previous one is analysed replaces
+it) and reads the latest results. The analysis works on the ROI, decimated to
+at most max_pixels, and gives:
+    sum, peak         ROI sum and maximum [counts]
+    cx, cy            centroid [full frame pixels]
+    sx, sy            RMS widths [full frame pixels]
+    focus             variance of the Laplacian (compare at the same ROI/decimation)
+    saturated         fraction of ROI pixels at the saturation level
+
+draw_overlay() annotates the display image, draw_strip_chart() renders the
+rolling history at its own rate, independent of the camera frame rate.
+"""
+
+import collections
+import math
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from live_view_utils import LatestFrameMailbox
+
+STRIP_CHART_KEYS = ("sum", "peak", "cx", "cy", "sx", "sy", "focus", "saturated")
+STRIP_CHART_COLOURS = ((0, 255, 0), (0, 200, 255), (255, 128, 0), (255, 0, 255),
+                       (255, 255, 0), (0, 128, 255), (128, 128, 255), (0, 0, 255))
+
+
+def laplacian_variance(image):
+    """Focus metric: variance of the 4-neighbour Laplacian of a 2D image."""
+    f = image.astype(np.float32, copy=False)
+    if f.shape[0] < 3 or f.shape[1] < 3:
+        return 0.0
+    lap = f[:-2, 1:-1] + f[2:, 1:-1] + f[1:-1, :-2] + f[1:-1, 2:] - 4 * f[1:-1, 1:-1]
+    return float(lap.var())
+
+
+def analyse_frame(frame, roi=None, max_pixels=512 * 512, saturation_level=255):
+    """Statistics of frame in roi = (x, y, w, h) (whole frame if None), see the module docstring."""
+    x0, y0 = 0, 0
+    if roi is not None:
+        x0, y0, w, h = roi
+        frame = frame[y0 : y0 + h, x0 : x0 + w]
+    step = max(1, math.ceil(math.sqrt(frame.shape[0] * frame.shape[1] / max_pixels)))
+    image = frame[::step, ::step]
+    if image.ndim == 3:
+        # Colour: channels averaged on the cropped, decimated pixels only
+        image = image.mean(axis=2)
+    data = image.astype(np.float64)
+    total = float(data.sum())
+    result = {
+        "time": time.time(),
+        "roi": (x0, y0, frame.shape[1], frame.shape[0]),
+        "step": step,
+        "sum": total * step * step,  # Estimate of the full ROI sum
+        "peak": float(data.max()) if data.size else 0.0,
+        "focus": laplacian_variance(image),
+        "saturated": float(np.count_nonzero(image >= saturation_level)) / max(image.size, 1),
+        "cx": math.nan,
+        "cy": math.nan,
+        "sx": math.nan,
+        "sy": math.nan,
+    }
+    if total > 0:
+        py = data.sum(axis=1) / total
+        px = data.sum(axis=0) / total
+        ys = np.arange(data.shape[0]) * step
+        xs = np.arange(data.shape[1]) * step
+        cx, cy = float(px @ xs), float(py @ ys)
+        result["sx"] = math.sqrt(max(float(px @ (xs - cx) ** 2), 0.0))
+        result["sy"] = math.sqrt(max(float(py @ (ys - cy) ** 2), 0.0))
+        result["cx"], result["cy"] = cx + x0, cy + y0
+    return result
+
+
+class FrameAnalysisWorker(threading.Thread):
+    """Analyse submitted frames on a worker thread, at most max_rate times per second.
+
+    latest holds the last result (None at first), history the last history_len ones.
+    """
+
+    def __init__(self, roi=None, max_pixels=512 * 512, saturation_level=255, max_rate=20.0, history_len=600):
+        super().__init__(name="frame-analysis", daemon=True)
+        self.roi = roi
+        self.max_pixels = max_pixels
+        self.saturation_level = saturation_level
+        self.max_rate = max_rate
+        self.mailbox = LatestFrameMailbox()
+        self.history = collections.deque(maxlen=history_len)
+        self.latest = None
+        self.analysed = 0
+        self.last_error = None
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+
+    def submit(self, frame):
+        """Hand a frame to the worker, never blocks."""
+        self.mailbox.put(frame)
+        self._wake.set()
+
+    def run(self):
+        period = 1.0 / self.max_rate if self.max_rate else 0.0
+        while not self._stop_event.is_set():
+            if not self._wake.wait(0.2):
+                continue
+            self._wake.clear()
+            item = self.mailbox.take()
+            if item is None:
+                continue
+            started = time.perf_counter()
+            try:
+                result = analyse_frame(item[1], self.roi, self.max_pixels, self.saturation_level)
+                self.latest = result
+                self.history.append(result)
+                self.analysed += 1
+            except Exception as e:
+                self.last_error = str(e)
+            # Rate limit: frames submitted meanwhile are replaced by the newest one
+            rest = period - (time.perf_counter() - started)
+            if rest > 0:
+                self._stop_event.wait(rest)
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        self._wake.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
+def draw_overlay(img, result, scale, origin=(10, 90)):
+    """Draw ROI, centroid, RMS ellipse and the numbers of result on the display image.
+
+    scale: display pixels per frame pixel.
+    """
+    if result is None:
+        return img
+    x, y, w, h = result["roi"]
+    cv2.rectangle(img, (int(x * scale), int(y * scale)), (int((x + w) * scale), int((y + h) * scale)), (0, 255, 255), 1)
+    if not math.isnan(result["cx"]):
+        center = (int(result["cx"] * scale), int(result["cy"] * scale))
+        cv2.drawMarker(img, center, (0, 0, 255), cv2.MARKER_CROSS, 12, 1)
+        axes = (max(1, int(result["sx"] * scale)), max(1, int(result["sy"] * scale)))
+        cv2.ellipse(img, center, axes, 0, 0, 360, (0, 0, 255), 1)
+    lines = [
+        f"sum {result['sum']:.4g}  peak {result['peak']:.0f}",
+        f"c ({result['cx']:.1f}, {result['cy']:.1f})  rms ({result['sx']:.1f}, {result['sy']:.1f})",
+        f"focus {result['focus']:.4g}  sat {100 * result['saturated']:.2f}%",
+    ]
+    for k, line in enumerate(lines):
+        cv2.putText(img, line, (origin[0], origin[1] + 22 * k), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+    return img
+
+
+def draw_strip_chart(history, keys=STRIP_CHART_KEYS, width=600, row_height=60):
+    """Rolling chart of the history, one row per key, each trace scaled to its own range."""
+    chart = np.zeros((row_height * len(keys), width, 3), dtype=np.uint8)
+    results = list(history)[-width:]
+    for row, key in enumerate(keys):
+        top = row * row_height
+        colour = STRIP_CHART_COLOURS[row % len(STRIP_CHART_COLOURS)]
+        cv2.line(chart, (0, top + row_height - 1), (width - 1, top + row_height - 1), (60, 60, 60), 1)
+        values = np.array([r[key] for r in results], dtype=float)
+        finite = values[np.isfinite(values)]
+        label = key
+        if finite.size:
+            lo, hi = float(finite.min()), float(finite.max())
+            span = hi - lo if hi > lo else 1.0
+            ys = top + row_height - 4 - (values - lo) / span * (row_height - 20)
+            xs = np.arange(len(values)) + width - len(values)
+            points = np.column_stack([xs, ys])[np.isfinite(ys)].astype(np.int32)
+            if len(points) > 1:
+                cv2.polylines(chart, [points], False, colour, 1)
+            label = f"{key} {values[-1]:.4g}  [{lo:.4g}, {hi:.4g}]"
+        cv2.putText(chart, label, (5, top + 14), cv2.FONT_HERSHEY_SIMPLEX, 0.45, colour, 1)
+    return chart
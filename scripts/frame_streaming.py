@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+HTTP streaming of live camera frames, for a remote live view of the cameras
+of the Raspberry Pi (any browser, no local OpenCV window needed).
+
+The grab loop only calls FrameBroadcaster.publish(frame), which swaps a
+reference and returns: an encoder thread downscales the newest frame to
+Mono8 (see live_view_utils.downscale) and encodes it once, as JPEG or raw
+bytes, within the configured frame rate and bitrate. Every client has its own
+server thread that sends the newest encoded frame when it is ready for one,
+so a slow client skips frames (per-client dropping) without slowing down the
+encoder, the other clients or the camera.
+
+URLs of FrameStreamServer, for each stream <name>:
+    /                       index page with the MJPEG streams
+    /<name>/stream.mjpg     multipart MJPEG (browsers, VLC, cv2.VideoCapture)
+    /<name>/frame.jpg       latest frame as JPEG
+    /<name>/stream.raw      raw Mono8 frames, each after a RAW_HEADER
+    /<name>/frame.raw       latest raw Mono8 frame (X-Width/X-Height headers)
+    /stats                  JSON statistics of the streams and clients
+
+The live view scripts serve their cameras with --serve PORT (see
+add_stream_arguments), e.g. basler_live_view.py --serve 8080 --no-window.
+"""
+
+import json
+import struct
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+from live_view_utils import downscale
+
+RAW_HEADER = struct.Struct("<QIII")  # seq, width, height, payload bytes
+BOUNDARY = "frame"
+
+
+class FrameBroadcaster:
+    """Encode the newest published frame once and hand it to any number of clients.
+
+    max_size: (width, height) the frames are downscaled to fit in; max_fps: encoded frames
+    per second; bitrate [bit/s]: frames are skipped while the encoded output would exceed it
+    (None: no limit); encoding: "jpeg" or "raw" (Mono8 bytes).
+    """
+
+    def __init__(self, name="cam0", max_size=(640, 480), max_fps=15.0, bitrate=None, encoding="jpeg",
+                 jpeg_quality=80, bits=8):
+        self.name = name
+        self.max_size = max_size
+        self.max_fps = max_fps
+        self.bitrate = bitrate
+        self.encoding = encoding
+        self.jpeg_quality = jpeg_quality
+        self.bits = bits
+        self._pending = None  # Newest published frame, not encoded yet
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._cond = threading.Condition()
+        self.latest = None  # (seq, width, height, jpeg bytes or None, raw bytes or None)
+        self.seq = 0
+        self.published = 0
+        self.skipped_rate = 0  # Published frames not encoded (frame rate or bitrate limit)
+        self.bytes_encoded = 0
+        self.clients = {}  # Client address: {"sent": n, "dropped": n}
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._encode_loop, name=f"stream-{name}", daemon=True)
+        self._thread.start()
+
+    def publish(self, frame, bits=None):
+        """Offer a frame (native array, any bit depth) to the stream; never blocks."""
+        with self._pending_lock:
+            self._pending = frame
+            if bits is not None:
+                self.bits = bits
+            self.published += 1
+        self._wake.set()
+
+    def _encode(self, frame):
+        small = downscale(frame, *self.max_size, bits=self.bits)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        jpeg = raw = None
+        if self.encoding == "raw":
+            raw = small.tobytes()
+        else:
+            ok, buffer = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                raise RuntimeError("JPEG encoding failed")
+            jpeg = buffer.tobytes()
+        return small.shape[1], small.shape[0], jpeg, raw
+
+    def _encode_loop(self):
+        period = 1.0 / self.max_fps if self.max_fps else 0.0
+        budget = 0.0  # Bytes that may still be sent now (token bucket)
+        last = time.perf_counter()
+        while not self._stop_event.is_set():
+            if not self._wake.wait(0.2):
+                continue
+            self._wake.clear()
+            with self._pending_lock:
+                frame, self._pending = self._pending, None
+            if frame is None:
+                continue
+            now = time.perf_counter()
+            if self.bitrate:
+                rate = self.bitrate / 8.0
+                budget = min(budget + (now - last) * rate, rate)
+                last = now
+                if budget < 0:
+                    self.skipped_rate += 1
+                    continue
+            try:
+                width, height, jpeg, raw = self._encode(frame)
+            except Exception as e:
+                print(f"Stream {self.name}: {e}")
+                continue
+            size = len(jpeg if jpeg is not None else raw)
+            budget -= size
+            self.bytes_encoded += size
+            with self._cond:
+                self.seq += 1
+                self.latest = (self.seq, width, height, jpeg, raw)
+                self._cond.notify_all()
+            rest = period - (time.perf_counter() - now)
+            if rest > 0:
+                self._stop_event.wait(rest)
+
+    def wait_newer(self, seq, timeout=1.0):
+        """Newest encoded frame with a sequence number above seq, None after timeout."""
+        with self._cond:
+            if self.latest is None or self.latest[0] <= seq:
+                self._cond.wait(timeout)
+            if self.latest is not None and self.latest[0] > seq:
+                return self.latest
+            return None
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "encoded": self.seq,
+            "skipped_rate": self.skipped_rate,
+            "bytes_encoded": self.bytes_encoded,
+            "encoding": self.encoding,
+            "clients": dict(self.clients),
+        }
+
+    def close(self):
+        self._stop_event.set()
+        self._wake.set()
+        with self._cond:
+            self._cond.notify_all()
+
+
+class _StreamHandler(BaseHTTPRequestHandler):
+    server_version = "MOTFrameStream/1.0"
+
+    def log_message(self, format, *args):
+        pass  # No line per request on the console
+
+    def _send(self, body, content_type, extra=None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        for key, value in (extra or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        streams = self.server.streams
+        path = self.path.split("?")[0].strip("/")
+        if path == "":
+            images = "".join(f'<h3>{name}</h3><img src="/{name}/stream.mjpg">' for name in streams)
+            self._send(f"<html><body>{images}</body></html>".encode(), "text/html")
+            return
+        if path == "stats":
+            self._send(json.dumps({name: b.stats() for name, b in streams.items()}).encode(), "application/json")
+            return
+        name, _, what = path.partition("/")
+        broadcaster = streams.get(name)
+        if broadcaster is None or what not in ("stream.mjpg", "frame.jpg", "stream.raw", "frame.raw"):
+            self.send_error(404)
+            return
+        if what.endswith("jpg") and broadcaster.encoding != "jpeg" or what.endswith("raw") and broadcaster.encoding != "raw":
+            self.send_error(415, f"Stream {name} is encoded as {broadcaster.encoding}")
+            return
+        if what.startswith("frame"):
+            latest = broadcaster.wait_newer(0, timeout=2.0)
+            if latest is None:
+                self.send_error(503, "No frame yet")
+                return
+            seq, width, height, jpeg, raw = latest
+            body = jpeg if jpeg is not None else raw
+            self._send(body, "image/jpeg" if jpeg is not None else "application/octet-stream",
+                       {"X-Seq": seq, "X-Width": width, "X-Height": height})
+            return
+        self._stream(broadcaster, mjpeg=what == "stream.mjpg")
+
+    def _stream(self, broadcaster, mjpeg):
+        client = f"{self.client_address[0]}:{self.client_address[1]}"
+        counters = broadcaster.clients.setdefault(client, {"sent": 0, "dropped": 0})
+        self.send_response(200)
+        if mjpeg:
+            self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        else:
+            self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        seq = 0
+        try:
+            while not self.server.stopping:
+                latest = broadcaster.wait_newer(seq)
+                if latest is None:
+                    continue
+                if seq:
+                    counters["dropped"] += latest[0] - seq - 1  # Frames encoded while this client was busy
+                seq, width, height, jpeg, raw = latest
+                if mjpeg:
+                    head = (f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n"
+                            f"X-Seq: {seq}\r\n\r\n").encode()
+                    self.wfile.write(head + jpeg + b"\r\n")
+                else:
+                    self.wfile.write(RAW_HEADER.pack(seq, width, height, len(raw)) + raw)
+                self.wfile.flush()
+                counters["sent"] += 1
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            broadcaster.clients.pop(client, None)
+
+
+class FrameStreamServer(ThreadingHTTPServer):
+    """HTTP server of the FrameBroadcaster streams, running on a background thread."""
+
+    daemon_threads = True
+
+    def __init__(self, port=8080, host="0.0.0.0"):
+        super().__init__((host, port), _StreamHandler)
+        self.streams = {}
+        self.stream_options = {}  # Default FrameBroadcaster options of add_stream
+        self.stopping = False
+        self._thread = threading.Thread(target=self.serve_forever, name="stream-server", daemon=True)
+
+    def add_stream(self, name="cam0", **kwargs):
+        """New FrameBroadcaster served under /<name>/ (kwargs: see FrameBroadcaster)."""
+        self.streams[name] = FrameBroadcaster(name, **{**self.stream_options, **kwargs})
+        return self.streams[name]
+
+    def start(self):
+        self._thread.start()
+        host, port = self.server_address[:2]
+        print(f"Streaming on http://{host}:{port}/ ({', '.join(self.streams) or 'no streams yet'})")
+        return self
+
+    def stop(self):
+        self.stopping = True
+        for broadcaster in self.streams.values():
+            broadcaster.close()
+        self.shutdown()
+        self.server_close()
+
+
+def read_raw_stream(url, max_frames=None, timeout=5.0):
+    """Loopback/remote client of /<name>/stream.raw: yields (seq, Mono8 array)."""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        count = 0
+        while max_frames is None or count < max_frames:
+            head = response.read(RAW_HEADER.size)
+            if len(head) < RAW_HEADER.size:
+                return
+            seq, width, height, nbytes = RAW_HEADER.unpack(head)
+            payload = response.read(nbytes)
+            yield seq, np.frombuffer(payload, dtype=np.uint8).reshape(height, width)
+            count += 1
+
+
+def read_mjpeg_stream(url, max_frames=None, timeout=5.0):
+    """Loopback/remote client of /<name>/stream.mjpg: yields (seq, JPEG bytes)."""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        count = 0
+        while max_frames is None or count < max_frames:
+            headers = {}
+            line = response.readline()
+            while line in (b"\r\n", b"\n"):
+                line = response.readline()
+            if not line:
+                return
+            while True:
+                line = response.readline().strip()
+                if not line:
+                    break
+                key, _, value = line.decode().partition(":")
+                headers[key.strip().lower()] = value.strip()
+            jpeg = response.read(int(headers["content-length"]))
+            yield int(headers.get("x-seq", -1)), jpeg
+            count += 1
+
+
+def add_stream_arguments(parser):
+    """--serve and the stream options of the live view scripts."""
+    parser.add_argument("--serve", type=int, metavar="PORT", help="stream the frames over HTTP on PORT")
+    parser.add_argument("--stream-size", default="640x480", help="largest streamed frame, WIDTHxHEIGHT")
+    parser.add_argument("--stream-fps", type=float, default=15.0, help="streamed frames per second")
+    parser.add_argument("--bitrate", type=float, help="stream bitrate limit [Mbit/s]")
+    parser.add_argument("--raw", action="store_true", help="stream raw Mono8 instead of MJPEG")
+    parser.add_argument("--no-window", action="store_true", help="with --serve: no local window (e.g. on the Raspberry Pi)")
+
+
+def server_from_args(args):
+    """FrameStreamServer for the --serve options, None without --serve (not started)."""
+    if args.serve is None:
+        return None
+    width, _, height = args.stream_size.lower().partition("x")
+    server = FrameStreamServer(args.serve)
+    server.stream_options = {
+        "max_size": (int(width), int(height)),
+        "max_fps": args.stream_fps,
+        "bitrate": args.bitrate * 1e6 if args.bitrate else None,
+        "encoding": "raw" if args.raw else "jpeg",
+    }
+    return server
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Constant-cost live plots for the long-running temperature/pressure monitors.
+
+MinMaxSeries keeps the whole history of a signal in at most max_bins time
+bins holding the minimum and maximum of their samples: when the bins run out,
+neighbouring bins are merged and the bin width doubles, so memory and drawing
+cost stay bounded however long the bake-out runs, and spikes are never
+decimated away. Axis limits are maintained incrementally (running min/max).
+
+LivePlot draws the series with blitting: the figure background is rendered
+only when the axis limits have to grow (with headroom, so rarely), otherwise
+only the lines are redrawn, at most max_fps times per second of wall clock.
+
+    plot = LivePlot(fig, max_fps=2)
+    plot.add_line("cube", ax1, label="Quartz cube")
+    plot.append("cube", elapsed_seconds, temperature)
+    plot.update()
+"""
+
+import math
+import time
+
+import numpy as np
+
+
+class MinMaxSeries:
+    """History of (t, y) samples in at most max_bins min/max bins, t increasing."""
+
+    def __init__(self, max_bins=1000, bin_width=1.0):
+        self.max_bins = max_bins - max_bins % 2
+        self.bin_width = bin_width
+        self.t0 = np.zeros(self.max_bins)
+        self.lo = np.zeros(self.max_bins)
+        self.hi = np.zeros(self.max_bins)
+        self.n = 0
+        self.count = 0
+        self.t_first = self.t_last = None
+        self.y_min, self.y_max = math.inf, -math.inf
+        self.y_last = None
+
+    def _compact(self):
+        # Merge neighbouring bins: half the bins, twice the width
+        half = self.n // 2
+        self.t0[:half] = self.t0[0 : 2 * half : 2]
+        self.lo[:half] = np.minimum(self.lo[0 : 2 * half : 2], self.lo[1 : 2 * half : 2])
+        self.hi[:half] = np.maximum(self.hi[0 : 2 * half : 2], self.hi[1 : 2 * half : 2])
+        self.n = half
+        self.bin_width *= 2
+
+    def append(self, t, y):
+        if y is None or not math.isfinite(y):
+            return
+        if self.n == 0 or t >= self.t0[self.n - 1] + self.bin_width:
+            if self.n == self.max_bins:
+                self._compact()
+            if self.n and t < self.t0[self.n - 1] + self.bin_width:
+                # Still inside the last (now wider) bin
+                self.lo[self.n - 1] = min(self.lo[self.n - 1], y)
+                self.hi[self.n - 1] = max(self.hi[self.n - 1], y)
+            else:
+                self.t0[self.n] = t
+                self.lo[self.n] = self.hi[self.n] = y
+                self.n += 1
+        else:
+            self.lo[self.n - 1] = min(self.lo[self.n - 1], y)
+            self.hi[self.n - 1] = max(self.hi[self.n - 1], y)
+        if self.t_first is None:
+            self.t_first = t
+        self.t_last = t
+        self.y_last = y
+        self.y_min = min(self.y_min, y)
+        self.y_max = max(self.y_max, y)
+        self.count += 1
+
+    def xy(self):
+        """Points to plot: the min and max of every bin, in time order (2 * bins points)."""
+        n = self.n
+        x = np.repeat(self.t0[:n], 2)
+        y = np.column_stack([self.lo[:n], self.hi[:n]]).ravel()
+        return x, y
+
+
+class LivePlot:
+    """Blitted, throttled drawing of MinMaxSeries lines on the axes of a figure."""
+
+    def __init__(self, fig, max_fps=2.0, max_bins=1000, headroom=0.2):
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.max_bins = max_bins
+        self.headroom = headroom
+        self.series = {}
+        self.lines = {}
+        self.artists = []  # Other animated artists (e.g. status text), drawn with the lines
+        self.axes = []
+        self._limits = {}  # Axes: (xmin, xmax, ymin, ymax) currently set
+        self._background = None
+        self._next_draw = 0.0
+        self.full_draws = 0
+        self.blits = 0
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def add_line(self, key, ax, **line_kwargs):
+        """New line `key` on ax (line_kwargs as for ax.plot), fed by append(key, t, y)."""
+        (line,) = ax.plot([], [], animated=True, **line_kwargs)
+        self.series[key] = MinMaxSeries(self.max_bins)
+        self.lines[key] = line
+        if ax not in self.axes:
+            self.axes.append(ax)
+        return line
+
+    def add_artist(self, artist):
+        """Redraw artist (e.g. a text whose content changes) with the lines at every update."""
+        artist.set_animated(True)
+        self.artists.append(artist)
+        return artist
+
+    def append(self, key, t, y):
+        self.series[key].append(t, y)
+
+    def _draw_animated(self):
+        for artist in list(self.lines.values()) + self.artists:
+            artist.axes.draw_artist(artist)
+
+    def _on_draw(self, event):
+        # Full redraw (e.g. resize): new background, then the lines on top
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox) if self.canvas.supports_blit else None
+        self._draw_animated()
+
+    def _wanted_limits(self, ax):
+        series = [s for k, s in self.series.items() if self.lines[k].axes is ax and s.count]
+        if not series:
+            return None
+        t0 = min(s.t_first for s in series)
+        t1 = max(s.t_last for s in series)
+        y0 = min(s.y_min for s in series)
+        y1 = max(s.y_max for s in series)
+        return t0, t1, y0, y1
+
+    def _grow_limits(self, ax):
+        """Widen the limits of ax if the data left them; True if the background must be redrawn."""
+        wanted = self._wanted_limits(ax)
+        if wanted is None:
+            return False
+        t0, t1, y0, y1 = wanted
+        current = self._limits.get(ax)
+        if current is not None and current[0] <= t0 and t1 <= current[1] and current[2] <= y0 and y1 <= current[3]:
+            return False
+        span = max(t1 - t0, 1.0)
+        xlim = (t0, t1 + self.headroom * span)
+        if ax.get_yscale() == "log":
+            y0, y1 = max(y0, 1e-300), max(y1, 1e-300)
+            ylim = (y0 / 10 ** self.headroom, y1 * 10 ** self.headroom)
+        else:
+            pad = max(self.headroom * (y1 - y0), 1.0)
+            ylim = (y0 - pad, y1 + pad)
+        ax.set_xlim(*xlim)
+        ax.set_ylim(*ylim)
+        self._limits[ax] = xlim + ylim
+        return True
+
+    def update(self, force=False):
+        """Redraw if max_fps allows it; returns True if something was drawn."""
+        now = time.monotonic()
+        if not force and now < self._next_draw:
+            return False
+        self._next_draw = now + self.min_interval
+        for key, line in self.lines.items():
+            line.set_data(*self.series[key].xy())
+        grown = [self._grow_limits(ax) for ax in self.axes]
+        if any(grown) or self._background is None:
+            self.canvas.draw()  # Calls _on_draw: background + lines
+            self.full_draws += 1
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_animated()
+            self.canvas.blit(self.fig.bbox)
+            self.blits += 1
+        self.canvas.flush_events()
+        return True
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Helpers shared by the Basler live view scripts.
+
+Each camera gets a producer thread (CameraGrabThread) that retrieves and
+converts its frames and drops the newest one into a single-slot mailbox
+(LatestFrameMailbox). The UI thread only takes what is new from the mailboxes,
+so a slow or untriggered camera never stalls the windows of the others and
+every camera runs at its own frame rate.
+
+Display pipeline: monochrome cameras keep their native Mono8/Mono10/Mono12
+format (no ImageFormatConverter), and the UI thread downscales only the frames
+it takes from the mailboxes to the window size (to_display) before the
+conversion to 8 bit BGR, so that work follows the display rate, not the
+camera frame rate. Overlays are drawn on the small image only.
+"""
+
+import math
+import threading
+import time
+
+import cv2
+import numpy as np
+from pypylon import pylon
+
+NATIVE_MONO_FORMATS = ("Mono8", "Mono10", "Mono12", "Mono16")
+
+
+def make_frame_converter(camera):
+    """Return (convert, bits) for the current pixel format of camera.
+
+    convert(grab_result) gives the frame as a numpy array: the native buffer for the
+    unpacked Mono formats (uint8, or uint16 holding `bits` significant bits), a pylon
+    conversion to Mono8 for packed mono formats and to BGR8 for colour cameras.
+    """
+    try:
+        pixel_format = camera.PixelFormat.GetValue()
+    except Exception:
+        pixel_format = "Mono8"
+    if pixel_format in NATIVE_MONO_FORMATS:
+        return (lambda grab_result: grab_result.GetArray()), int(pixel_format[4:])
+    converter = pylon.ImageFormatConverter()
+    if pixel_format.startswith("Mono"):
+        converter.OutputPixelFormat = pylon.PixelType_Mono8
+    else:
+        converter.OutputPixelFormat = pylon.PixelType_BGR8packed
+    converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
+    return (lambda grab_result: converter.Convert(grab_result).GetArray()), 8
+
+
+def window_size(window_name, default=(640, 480)):
+    """Current (width, height) of the image area of an OpenCV window, default if unknown."""
+    try:
+        _, _, w, h = cv2.getWindowImageRect(window_name)
+        if w > 0 and h > 0:
+            return w, h
+    except Exception:
+        pass
+    return default
+
+
+def downscale(frame, max_width, max_height, bits=8, method="area"):
+    """8 bit image of frame fitting in max_width x max_height (Mono stays single channel).
+
+    The frame is downscaled first (method "area": cv2.resize INTER_AREA, "stride":
+    every n-th pixel, cheaper but aliased), then reduced to 8 bit, so the full
+    resolution frame is never converted. Frames smaller than the window are not enlarged.
+    """
+    h, w = frame.shape[:2]
+    scale = min(max_width / w, max_height / h, 1.0)
+    small = frame
+    if scale < 1.0:
+        if method == "stride":
+            step = math.ceil(1.0 / scale)
+            small = frame[::step, ::step]
+        else:
+            size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    if small.dtype != np.uint8:
+        small = (small >> max(bits - 8, 0)).astype(np.uint8)
+    return np.ascontiguousarray(small)
+
+
+def to_display(frame, max_width, max_height, bits=8, method="area", colormap=None):
+    """Small 8 bit BGR image of frame fitting in max_width x max_height.
+
+    Downscaled first (see downscale), then coloured with a cv2 colormap
+    (e.g. cv2.COLORMAP_JET) or grey. Always a new array, never frame itself,
+    so overlays drawn on it do not end up in the saved frames.
+    """
+    small = downscale(frame, max_width, max_height, bits, method)
+    if small.ndim == 2:
+        if colormap is not None:
+            return cv2.applyColorMap(small, colormap)
+        return cv2.cvtColor(small, cv2.COLOR_GRAY2BGR)
+    return small.copy() if small is frame else small  # Overlays must not draw on the frame
+
+
+class LatestFrameMailbox:
+    """Single-slot mailbox: the producer overwrites the slot, the consumer takes the newest frame."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self._info = None
+        self.seq = 0  # Frames put so far
+        self.overwritten = 0  # Frames replaced before the consumer took them
+
+    def put(self, frame, info=None):
+        with self._lock:
+            if self._frame is not None:
+                self.overwritten += 1
+            self._frame = frame
+            self._info = info
+            self.seq += 1
+
+    def take(self):
+        """Return (seq, frame, info) of the newest frame and empty the slot, None if nothing is new."""
+        with self._lock:
+            if self._frame is None:
+                return None
+            frame, info = self._frame, self._info
+            self._frame = None
+            self._info = None
+            return self.seq, frame, info
+
+
+class CameraGrabThread(threading.Thread):
+    """Grab loop of one camera: RetrieveResult, convert, put the frame in self.mailbox.
+
+    convert(grab_result) returns the frame (default: grab_result.GetArray()).
+    Nothing else is done per frame here: frames the mailbox overwrites cost no display work.
+    The camera must already be grabbing (GrabStrategy_LatestImageOnly is recommended).
+    """
+
+    def __init__(self, camera, convert=None, name="grab", timeout_ms=500, fps_interval=1.0):
+        super().__init__(name=name, daemon=True)
+        self.camera = camera
+        self.convert = convert
+        self.timeout_ms = timeout_ms
+        self.fps_interval = fps_interval
+        self.mailbox = LatestFrameMailbox()
+        self.frames = 0
+        self.errors = 0
+        self.fps = 0.0
+        self.last_error = None
+        self._stop_event = threading.Event()
+        self._fps_count = 0
+        self._fps_time = time.perf_counter()
+
+    def _update_fps(self):
+        self._fps_count += 1
+        now = time.perf_counter()
+        elapsed = now - self._fps_time
+        if elapsed >= self.fps_interval:
+            self.fps = self._fps_count / elapsed
+            self._fps_count = 0
+            self._fps_time = now
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                if not self.camera.IsGrabbing():
+                    break
+                grab_result = self.camera.RetrieveResult(self.timeout_ms, pylon.TimeoutHandling_Return)
+            except Exception as e:
+                # Camera removed or grabbing stopped under our feet
+                self.errors += 1
+                self.last_error = str(e)
+                time.sleep(0.01)
+                continue
+            if grab_result is None or not grab_result.IsValid():
+                continue  # Timeout: nothing to do, check the stop flag again
+            try:
+                if grab_result.GrabSucceeded():
+                    frame = self.convert(grab_result) if self.convert else grab_result.GetArray()
+                    self.frames += 1
+                    self._update_fps()
+                    self.mailbox.put(frame, {"frame": self.frames, "time": time.time()})
+                else:
+                    self.errors += 1
+                    self.last_error = f"{grab_result.ErrorCode}: {grab_result.ErrorDescription}"
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+            finally:
+                grab_result.Release()
+
+    def stop(self, timeout=2.0):
+        """Ask the loop to end and wait for it (at most timeout seconds)."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
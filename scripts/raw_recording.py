@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Lossless raw recording of a Basler camera.
+
+The grab thread retrieves every frame (GrabStrategy_OneByOne, nothing is
+converted) and copies it into a preallocated ring buffer (FrameRing); a writer
+thread appends the frames in batches to a raw file, and their frame ID,
+camera timestamp and host time to an index file. Dropped frames are detected
+from gaps in the camera frame counter (BlockID), and the frame rate is
+measured from the camera timestamps instead of being assumed.
+
+Files of a recording <base>:
+    <base>.raw        frames, back to back, native pixel format (C order)
+    <base>.idx        INDEX_DTYPE record of every frame
+    <base>.json       shape, dtype, pixel format and the recording summary
+
+open_raw_recording() maps them back as numpy arrays, transcode_to_video()
+makes a video afterwards.
+"""
+
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+from pypylon import pylon
+
+INDEX_DTYPE = np.dtype([("frame_id", "<i8"), ("camera_timestamp", "<i8"), ("host_time", "<f8")])
+
+
+def frame_layout(camera):
+    """(shape, dtype, pixel format) of the frames the camera will deliver."""
+    pixel_format = camera.PixelFormat.GetValue()
+    if pixel_format.startswith(("RGB", "BGR", "YUV", "YCbCr")):
+        raise ValueError(f"Raw recording stores single-plane frames (Mono or Bayer), not {pixel_format}")
+    if pixel_format.endswith("p") or pixel_format.endswith("Packed"):
+        raise ValueError(f"Raw recording needs an unpacked pixel format, not {pixel_format}")
+    if pixel_format.endswith("8"):
+        dtype = np.uint8
+    elif pixel_format[-2:] in ("10", "12", "16"):
+        dtype = np.uint16
+    else:
+        raise ValueError(f"Raw recording does not support the pixel format {pixel_format}")
+    return (camera.Height.GetValue(), camera.Width.GetValue()), np.dtype(dtype), pixel_format
+
+
+def enable_timestamp_chunk(camera):
+    """Best-effort: deliver the exposure start timestamp with every frame (Timestamp chunk)."""
+    try:
+        camera.ChunkModeActive.SetValue(True)
+        camera.ChunkSelector.SetValue("Timestamp")
+        camera.ChunkEnable.SetValue(True)
+        return True
+    except Exception as e:
+        print(f"Timestamp chunk not available, using the grab result timestamp: {e}")
+        return False
+
+
+def timestamp_tick_frequency(camera):
+    """Camera timestamp ticks per second (GigE cameras report it, USB3 ticks are ns)."""
+    try:
+        return float(camera.GevTimestampTickFrequency.GetValue())
+    except Exception:
+        return 1e9
+
+
+def camera_timestamp(grab_result):
+    """Timestamp of a grab result: chunk if enabled, else the transport layer one, -1 if none."""
+    try:
+        return int(grab_result.ChunkTimestamp.Value)
+    except Exception:
+        pass
+    try:
+        return int(grab_result.TimeStamp)
+    except Exception:
+        return -1
+
+
+class FrameRing:
+    """Preallocated single-producer single-consumer ring of frames and their index records."""
+
+    def __init__(self, capacity, shape, dtype):
+        self.capacity = capacity
+        self.frames = np.empty((capacity,) + tuple(shape), dtype=dtype)
+        self.frames.fill(0)  # Touch every page now, not during the recording
+        self.index = np.zeros(capacity, dtype=INDEX_DTYPE)
+        self._cond = threading.Condition()
+        self._head = 0  # Next slot to fill
+        self._tail = 0  # Next slot to write out
+        self._count = 0
+        self.overflows = 0  # Frames lost because the writer fell behind
+        self.high_water = 0
+
+    def push(self, array, frame_id, cam_timestamp, host_time):
+        """Copy a frame into the ring; False (frame lost) if the ring is full."""
+        with self._cond:
+            if self._count == self.capacity:
+                self.overflows += 1
+                return False
+            slot = self._head
+        # The consumer does not touch this slot before _count is incremented
+        np.copyto(self.frames[slot], array)
+        self.index[slot] = (frame_id, cam_timestamp, host_time)
+        with self._cond:
+            self._head = (slot + 1) % self.capacity
+            self._count += 1
+            self.high_water = max(self.high_water, self._count)
+            self._cond.notify()
+        return True
+
+    def wait_batch(self, max_frames, timeout):
+        """(first slot, n) of the oldest contiguous run of filled slots, n = 0 after timeout."""
+        with self._cond:
+            if self._count == 0:
+                self._cond.wait(timeout)
+            n = min(self._count, self.capacity - self._tail, max_frames)
+            return self._tail, n
+
+    def release(self, n):
+        """The n oldest slots have been written out."""
+        with self._cond:
+            self._tail = (self._tail + n) % self.capacity
+            self._count -= n
+
+    def __len__(self):
+        with self._cond:
+            return self._count
+
+
+class RawRecorder:
+    """Record a camera losslessly to <base>.raw / .idx / .json (see the module docstring).
+
+    ring_mb sets the RAM buffer between the grab and the writer threads, which absorbs
+    disk stalls; batch is the largest number of frames per write call.
+    """
+
+    def __init__(self, camera, base, ring_mb=512, batch=32, timeout_ms=1000):
+        self.camera = camera
+        self.base = base
+        self.batch = batch
+        self.timeout_ms = timeout_ms
+        self.shape, self.dtype, self.pixel_format = frame_layout(camera)
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.ring = FrameRing(max(8, int(ring_mb * 1e6) // frame_bytes), self.shape, self.dtype)
+        self.chunk_timestamps = enable_timestamp_chunk(camera)
+        self.tick_frequency = timestamp_tick_frequency(camera)
+        self.frames_grabbed = 0
+        self.frames_written = 0
+        self.camera_dropped = 0  # Gaps in the camera frame counter
+        self.failed_grabs = 0  # Incomplete frames (GrabSucceeded() False)
+        self.first = None  # (frame_id, camera timestamp, host time) of the first frame
+        self.last = None
+        self.last_error = None
+        self._stop_event = threading.Event()
+        self._grab_done = threading.Event()
+        self._grab_thread = threading.Thread(target=self._grab_loop, name="raw-grab", daemon=True)
+        self._writer_thread = threading.Thread(target=self._write_loop, name="raw-writer", daemon=True)
+
+    def _grab_loop(self):
+        try:
+            while not self._stop_event.is_set() and self.camera.IsGrabbing():
+                grab_result = self.camera.RetrieveResult(self.timeout_ms, pylon.TimeoutHandling_Return)
+                if grab_result is None or not grab_result.IsValid():
+                    continue
+                try:
+                    if not grab_result.GrabSucceeded():
+                        self.failed_grabs += 1
+                        continue
+                    record = (int(grab_result.BlockID), camera_timestamp(grab_result), time.time())
+                    if self.last is not None and record[0] > self.last[0] + 1:
+                        self.camera_dropped += record[0] - self.last[0] - 1
+                    if self.first is None:
+                        self.first = record
+                    self.last = record
+                    self.frames_grabbed += 1
+                    self.ring.push(grab_result.GetArray(), *record)
+                finally:
+                    grab_result.Release()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Grab thread stopped: {e}")
+        finally:
+            self._grab_done.set()
+
+    def _write_loop(self):
+        with open(self.base + ".raw", "wb") as raw, open(self.base + ".idx", "wb") as idx:
+            while True:
+                start, n = self.ring.wait_batch(self.batch, 0.1)
+                if n == 0:
+                    if self._grab_done.is_set() and len(self.ring) == 0:
+                        break
+                    continue
+                raw.write(memoryview(self.ring.frames[start : start + n]))
+                idx.write(self.ring.index[start : start + n].tobytes())
+                self.ring.release(n)
+                self.frames_written += n
+
+    def _write_header(self, summary=None):
+        header = {
+            "shape": list(self.shape),
+            "dtype": self.dtype.str,
+            "pixel_format": self.pixel_format,
+            "timestamp_tick_frequency": self.tick_frequency,
+        }
+        try:
+            header["serial"] = self.camera.GetDeviceInfo().GetSerialNumber()
+            header["model"] = self.camera.GetDeviceInfo().GetModelName()
+        except Exception:
+            pass
+        if summary is not None:
+            header["summary"] = summary
+        with open(self.base + ".json", "w") as f:
+            json.dump(header, f, indent=1)
+
+    def start(self):
+        self._write_header()
+        self.camera.StartGrabbing(pylon.GrabStrategy_OneByOne)
+        self._writer_thread.start()
+        self._grab_thread.start()
+
+    def measured_fps(self):
+        """Frame rate from the camera timestamps (host clock if they are missing), drops included."""
+        if self.first is None or self.last is None or self.last[0] == self.first[0]:
+            return 0.0
+        if self.first[1] >= 0 and self.last[1] > self.first[1]:
+            elapsed = (self.last[1] - self.first[1]) / self.tick_frequency
+        else:
+            elapsed = self.last[2] - self.first[2]
+        return (self.last[0] - self.first[0]) / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        return {
+            "frames_grabbed": self.frames_grabbed,
+            "frames_written": self.frames_written,
+            "camera_dropped": self.camera_dropped,
+            "ring_overflows": self.ring.overflows,
+            "failed_grabs": self.failed_grabs,
+            "ring_capacity": self.ring.capacity,
+            "ring_high_water": self.ring.high_water,
+            "measured_fps": self.measured_fps(),
+            "chunk_timestamps": self.chunk_timestamps,
+        }
+
+    def stop(self):
+        """Stop grabbing, write out what is left in the ring and return the summary."""
+        self._stop_event.set()
+        self._grab_thread.join()
+        if self.camera.IsGrabbing():
+            self.camera.StopGrabbing()
+        self._writer_thread.join()
+        summary = self.summary()
+        self._write_header(summary)
+        return summary
+
+
+def record_raw(camera, base, duration, ring_mb=512, progress_interval=1.0):
+    """Record duration seconds (Ctrl+C stops early) and return the summary."""
+    recorder = RawRecorder(camera, base, ring_mb=ring_mb)
+    print(f"Raw recording {recorder.shape[1]}x{recorder.shape[0]} {recorder.pixel_format}, "
+          f"ring of {recorder.ring.capacity} frames")
+    recorder.start()
+    start_time = time.time()
+    try:
+        while time.time() - start_time < duration and recorder._grab_thread.is_alive():
+            time.sleep(progress_interval)
+            print(f"Grabbed {recorder.frames_grabbed}, written {recorder.frames_written}, "
+                  f"in ring {len(recorder.ring)}, dropped {recorder.camera_dropped + recorder.ring.overflows}")
+    except KeyboardInterrupt:
+        print("\nRecording interrupted by user")
+    return recorder.stop()
+
+
+def open_raw_recording(base):
+    """(frames, index, header) of a recording: frames is a read-only memmap (n, rows, cols)."""
+    with open(base + ".json") as f:
+        header = json.load(f)
+    index = np.fromfile(base + ".idx", dtype=INDEX_DTYPE)
+    shape, dtype = tuple(header["shape"]), np.dtype(header["dtype"])
+    frame_bytes = int(np.prod(shape)) * dtype.itemsize
+    n = min(len(index), os.path.getsize(base + ".raw") // frame_bytes)
+    if n == 0:
+        return np.empty((0,) + shape, dtype=dtype), index[:0], header
+    frames = np.memmap(base + ".raw", dtype=dtype, mode="r", shape=(n,) + shape)
+    return frames, index[:n], header
+
+
+def dropped_frames(index):
+    """Frame IDs missing from a recording index (gaps in the camera frame counter)."""
+    ids = index["frame_id"]
+    if len(ids) < 2:
+        return np.empty(0, dtype=ids.dtype)
+    expected = np.arange(ids[0], ids[-1] + 1)
+    return np.setdiff1d(expected, ids, assume_unique=True)
+
+
+def transcode_to_video(base, output_path=None, fps=None, fourcc="XVID"):
+    """Offline transcode of a raw recording to a video at its measured frame rate."""
+    frames, index, header = open_raw_recording(base)
+    if len(frames) == 0:
+        raise ValueError(f"No frames in {base}.raw")
+    output_path = output_path or base + ".avi"
+    if fps is None:
+        fps = header.get("summary", {}).get("measured_fps") or 30.0
+    bits = 8
+    for depth in (10, 12, 16):
+        if header["pixel_format"].endswith(str(depth)):
+            bits = depth
+    height, width = frames.shape[1:3]
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    try:
+        for frame in frames:
+            if frame.dtype != np.uint8:
+                frame = (frame >> (bits - 8)).astype(np.uint8)
+            out.write(cv2.cvtColor(np.ascontiguousarray(frame), cv2.COLOR_GRAY2BGR))
+    finally:
+        out.release()
+    print(f"Transcoded {len(frames)} frames at {fps:.2f} FPS to {output_path}")
+    return output_path
@@ -3,6 +3,11 @@
 Basler Camera Recording Script
 Records video from a connected Basler camera using pypylon library
 and saves it to the output directory with timestamp.
+
+Raw mode records every frame losslessly in the native pixel format, with frame
+IDs, timestamps and drop detection (see raw_recording), and can transcode the
+recording to a video afterwards. Sync mode records all the MOT cameras on
+their Line3 hardware trigger (see sync_recording).
 """
 
 import os
@@ -13,6 +18,8 @@ import numpy as np
 from datetime import datetime
 from pypylon import pylon
 
+from raw_recording import record_raw, transcode_to_video
+
 def create_output_directory():
     """Create output directory if it doesn't exist."""
     output_dir = os.path.join(os.path.dirname(__file__), "output")
@@ -20,8 +27,11 @@ def create_output_directory():
         os.makedirs(output_dir)
     return output_dir
 
-def initialize_camera():
-    """Initialize and configure the Basler camera."""
+def initialize_camera(raw=False):
+    """Initialize and configure the Basler camera.
+
+    raw: keep the native pixel format and do not cap the frame rate.
+    """
     try:
         # Create an instant camera object with the first available camera device
         camera = pylon.InstantCamera(pylon.TlFactory.GetInstance().CreateFirstDevice())
@@ -33,13 +43,14 @@ def initialize_camera():
         # Open the camera
         camera.Open()
         # Set camera parameters for optimal video recording
-        camera.MaxNumBuffer = 10
+        camera.MaxNumBuffer = 50 if raw else 10
         
         # Set pixel format (try to set, skip if not available)
-        try:
-            camera.PixelFormat.SetValue(pylon.PixelType_BGR8packed)
-        except Exception as e:
-            print(f"Could not set pixel format: {e}")
+        if not raw:
+            try:
+                camera.PixelFormat.SetValue(pylon.PixelType_BGR8packed)
+            except Exception as e:
+                print(f"Could not set pixel format: {e}")
         print(f"Camera opened")
         
         # Set acquisition mode to continuous
@@ -48,10 +59,11 @@ def initialize_camera():
         except Exception as e:
             print(f"Could not set acquisition mode: {e}")
         
-        # Enable frame rate control if available
+        # Enable frame rate control if available (raw mode runs at the camera maximum)
         try:
-            camera.AcquisitionFrameRateEnable.SetValue(True)
-            camera.AcquisitionFrameRate.SetValue(30.0)  # Set to 30 FPS
+            camera.AcquisitionFrameRateEnable.SetValue(not raw)
+            if not raw:
+                camera.AcquisitionFrameRate.SetValue(30.0)  # Set to 30 FPS
         except Exception as e:
             print(f"Could not set frame rate: {e}")
         
@@ -143,6 +155,25 @@ def record_video(camera, output_path, duration=10):
         if 'out' in locals():
             out.release()
 
+def record_all_cameras(output_dir):
+    """Synchronized raw recording of all the cameras of MultipleCameraSession."""
+    from sync_recording import open_session, record_synchronized
+
+    duration = 10  # Default 10 seconds
+    try:
+        user_input = input(f"\nEnter recording duration in seconds (default: {duration}): ")
+        if user_input.strip():
+            duration = float(user_input)
+    except ValueError:
+        print("Invalid input, using default duration")
+    mcs = open_session()
+    try:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        record_synchronized(mcs, os.path.join(output_dir, f"basler_sync_{timestamp}"), duration)
+    finally:
+        mcs.CloseAllCameras()
+
+
 def main():
     """Main function to run the recording script."""
     print("Basler Camera Recording Script")
@@ -152,9 +183,16 @@ def main():
     output_dir = create_output_directory()
     print(f"Output directory: {output_dir}")
     
+    # Video (XVID, 8 bit BGR), lossless raw recording or synchronized raw recording of all cameras
+    mode = input("\nRecording mode [video/raw/sync] (default: video): ").strip().lower()
+    if mode == "sync":
+        record_all_cameras(output_dir)
+        return
+    raw = mode == "raw"
+    
     # Initialize camera
     print("\nInitializing camera...")
-    camera = initialize_camera()
+    camera = initialize_camera(raw=raw)
     
     if camera is None:
         print("Failed to initialize camera. Exiting.")
@@ -163,8 +201,8 @@ def main():
     try:
         # Generate output filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_filename = f"basler_recording_{timestamp}.avi"
-        output_path = os.path.join(output_dir, output_filename)
+        output_filename = f"basler_{'raw' if raw else 'recording'}_{timestamp}"
+        output_path = os.path.join(output_dir, output_filename if raw else output_filename + ".avi")
         
         # Get recording duration from user or use default
         duration = 10  # Default 10 seconds
@@ -177,7 +215,16 @@ def main():
         
         # Start recording
         print(f"\nStarting recording...")
-        record_video(camera, output_path, duration)
+        if raw:
+            summary = record_raw(camera, output_path, duration)
+            print("\nRaw recording complete!")
+            for key, value in summary.items():
+                print(f"  {key}: {value}")
+            print(f"Frames saved to: {output_path}.raw (index .idx, header .json)")
+            if input("Transcode to video now? [y/N]: ").strip().lower() == "y":
+                transcode_to_video(output_path)
+        else:
+            record_video(camera, output_path, duration)
         
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Sensor acquisition engine for the bake-out monitor.
+
+Every sensor gets its own polling thread (SensorPoller) that calls its read
+function at its own period and stores the result, with the time it was read,
+in a shared LatestValueStore. The control loop reads the store without ever
+waiting for a device, so a slow or disconnected sensor no longer stretches
+the control period: its value just becomes stale (older than max_age).
+
+    engine = SensorEngine()
+    engine.add("cube", lambda: read_temperature_data(ser_cube), period=1.0)
+    engine.start()
+    reading = engine.get("cube")   # Reading(value, timestamp, age, stale, errors)
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+Reading = namedtuple("Reading", "value timestamp age stale errors")
+
+
+class LatestValueStore:
+    """Thread-safe latest value of every sensor, with its time.monotonic() timestamp."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}  # name: (value, timestamp)
+        self._errors = {}  # name: failed reads since the last good one
+        self._max_age = {}
+
+    def register(self, name, max_age):
+        with self._lock:
+            self._max_age[name] = max_age
+            self._errors.setdefault(name, 0)
+
+    def update(self, name, value, timestamp=None):
+        with self._lock:
+            self._values[name] = (value, time.monotonic() if timestamp is None else timestamp)
+            self._errors[name] = 0
+
+    def error(self, name):
+        with self._lock:
+            self._errors[name] = self._errors.get(name, 0) + 1
+
+    def get(self, name, max_age=None):
+        """Reading of name; value None and stale True if it was never read."""
+        with self._lock:
+            value, timestamp = self._values.get(name, (None, None))
+            errors = self._errors.get(name, 0)
+            max_age = self._max_age.get(name) if max_age is None else max_age
+        if timestamp is None:
+            return Reading(None, None, float("inf"), True, errors)
+        age = time.monotonic() - timestamp
+        return Reading(value, timestamp, age, max_age is not None and age > max_age, errors)
+
+    def names(self):
+        with self._lock:
+            return list(self._max_age)
+
+
+class SensorPoller(threading.Thread):
+    """Call read() every period seconds and store its result; None or an exception counts as an error."""
+
+    def __init__(self, name, read, period, store):
+        super().__init__(name=f"sensor-{name}", daemon=True)
+        self.sensor = name
+        self.read = read
+        self.period = period
+        self.store = store
+        self.last_error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        next_time = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                value = self.read()
+            except Exception as e:
+                value = None
+                self.last_error = str(e)
+            if value is None:
+                self.store.error(self.sensor)
+            else:
+                self.store.update(self.sensor, value)
+            # Fixed rate; after a read longer than the period start again from now
+            next_time += self.period
+            now = time.monotonic()
+            if next_time < now:
+                next_time = now
+            self._stop_event.wait(next_time - now)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class SensorEngine:
+    """Pollers of all the sensors and the store they share."""
+
+    def __init__(self):
+        self.store = LatestValueStore()
+        self.pollers = {}
+
+    def add(self, name, read, period=1.0, max_age=None):
+        """Poll read() every period [s]; values older than max_age [s] (default 3 periods + 2 s) are stale."""
+        self.store.register(name, 3 * period + 2.0 if max_age is None else max_age)
+        self.pollers[name] = SensorPoller(name, read, period, self.store)
+        return self.pollers[name]
+
+    def start(self):
+        for poller in self.pollers.values():
+            poller.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        for poller in self.pollers.values():
+            poller.stop()
+        for poller in self.pollers.values():
+            if poller.is_alive():
+                poller.join(timeout)
+
+    def get(self, name, max_age=None):
+        return self.store.get(name, max_age)
+
+    def snapshot(self):
+        """Reading of every sensor."""
+        return {name: self.store.get(name) for name in self.store.names()}
+
+    def stale(self):
+        """Names of the sensors whose value is missing or stale."""
+        return [name for name, reading in self.snapshot().items() if reading.stale]
+
+    def wait_ready(self, names=None, timeout=30.0):
+        """Wait until every sensor (or those in names) has a value; False after timeout."""
+        names = self.store.names() if names is None else names
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if all(self.store.get(name).value is not None for name in names):
+                return True
+            time.sleep(0.05)
+        return False
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Hardware-triggered synchronized recording of all the MOT cameras.
+
+The cameras of MultipleCameraSession.SerialNumToName are put in frame trigger
+mode on Line3 (Set_AcquisitionMode_FrameTrigger), so they expose on the same
+pulses, and each one is recorded losslessly by its own RawRecorder (grab
+thread + writer thread, see raw_recording) to <base>_<camera>.raw/.idx/.json.
+
+Afterwards the frames are aligned across cameras on a common clock (camera
+timestamps moved to the host clock with the offsets of EstimateClockOffset)
+and a merged index <base>_merged.csv gives, for every trigger, the frame
+number of each camera in its .raw file (-1 if that camera missed it).
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from raw_recording import RawRecorder, open_raw_recording
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "QuantumLab_Python", "ExperimentMOT_2_GitHub"))
+from CameraResources import MultipleCameraSession, TransportLayerCreator  # noqa: E402
+
+
+def open_session():
+    """MultipleCameraSession with all the connected cameras."""
+    tlc = TransportLayerCreator()
+    return MultipleCameraSession(tlc, len(tlc.devices))
+
+
+def prepare_cameras(mcs, names, trigger_activation="FallingEdge", max_num_buffer=50):
+    """Line3 frame trigger and timestamp chunks on the cameras; returns the clock offsets [ns]."""
+    offsets = {}
+    for name in names:
+        mcs.Set_AcquisitionMode_FrameTrigger(name, "On", TrgActivation=trigger_activation)
+        try:
+            mcs.EnableTimeStamp(name, Chunks=("Timestamp",))
+        except Exception as e:
+            print(f"{name}: no timestamps ({e}), frames aligned on the host clock")
+        if name in mcs.CamNameToClockOffset:
+            offsets[name] = mcs.CamNameToClockOffset[name][0]
+        mcs.NameToObject[name].MaxNumBuffer = max_num_buffer
+    return offsets
+
+
+def frame_times(index, offset):
+    """Time [ns] of each frame on the host monotonic clock, None without timestamps or offset."""
+    timestamps = index["camera_timestamp"].astype(np.int64)
+    if offset is None or len(timestamps) == 0 or np.any(timestamps < 0):
+        return None
+    return timestamps + offset
+
+
+def merge_indexes(name_to_index, name_to_offset, tolerance_ns=None):
+    """Align the frames of several cameras: one row per trigger.
+
+    Frames closer than tolerance_ns (default: half the shortest median frame interval)
+    belong to the same trigger. Camera timestamps on the host clock are used when every
+    camera has them, else the host arrival times. Returns (merged, info): merged is a
+    structured array with the fields event, time_ns and one per camera holding the frame
+    number (-1 if missing); info gives the clock of time_ns ("camera_timestamp", host
+    monotonic ns, or "host_time", Unix epoch ns), the tolerance and, per camera, the number
+    of duplicate frames: frames falling in an event that already has a frame of that
+    camera, of which only the first is kept.
+    """
+    names = list(name_to_index)
+    times = {name: frame_times(name_to_index[name], name_to_offset.get(name)) for name in names}
+    clock = "camera_timestamp"
+    if any(t is None for t in times.values()):
+        times = {name: (name_to_index[name]["host_time"] * 1e9).astype(np.int64) for name in names}
+        clock = "host_time"
+    if tolerance_ns is None:
+        intervals = [np.median(np.diff(t)) for t in times.values() if len(t) > 1]
+        tolerance_ns = 0.5 * min(intervals) if intervals else 1e6
+    all_times = np.concatenate([times[name] for name in names])
+    cams = np.concatenate([np.full(len(times[name]), k) for k, name in enumerate(names)])
+    rows = np.concatenate([np.arange(len(times[name])) for name in names])
+    order = np.argsort(all_times, kind="stable")
+    all_times, cams, rows = all_times[order], cams[order], rows[order]
+    events = np.concatenate([[0], np.cumsum(np.diff(all_times) > tolerance_ns)]) if len(all_times) else np.zeros(0, int)
+    num_events = int(events[-1]) + 1 if len(events) else 0
+    dtype = np.dtype([("event", "<i8"), ("time_ns", "<i8")] + [(name, "<i8") for name in names])
+    merged = np.zeros(num_events, dtype=dtype)
+    merged["event"] = np.arange(num_events)
+    for name in names:
+        merged[name] = -1
+    # First frame of each event gives its time
+    first = np.concatenate([[True], events[1:] != events[:-1]]) if len(events) else np.zeros(0, bool)
+    merged["time_ns"][events[first]] = all_times[first]
+    duplicates = {}
+    for k, name in enumerate(names):
+        mine = cams == k
+        # Events in time order: return_index gives the first frame of the camera in each
+        unique_events, first_frame = np.unique(events[mine], return_index=True)
+        duplicates[name] = int(mine.sum() - len(unique_events))
+        merged[name][unique_events] = rows[mine][first_frame]
+    info = {"clock": clock, "tolerance_ns": float(tolerance_ns), "duplicate_frames": duplicates}
+    return merged, info
+
+
+def save_merged_index(path, merged):
+    """CSV with the columns event, time_ns and the frame number of each camera."""
+    table = np.column_stack([merged[field] for field in merged.dtype.names]) if len(merged) else np.zeros((0, len(merged.dtype.names)))
+    np.savetxt(path, table, fmt="%d", delimiter=",", header=",".join(merged.dtype.names), comments="")
+
+
+def record_synchronized(mcs, base, duration, names=None, ring_mb=512, trigger_activation="FallingEdge", progress_interval=1.0):
+    """Record the cameras (default: all of mcs) on the Line3 triggers for duration seconds.
+
+    Returns the session summary, also written to <base>_session.json.
+    """
+    names = list(mcs.NameToObject) if names is None else list(names)
+    offsets = prepare_cameras(mcs, names, trigger_activation)
+    recorders = {name: RawRecorder(mcs.NameToObject[name], f"{base}_{name}", ring_mb=ring_mb) for name in names}
+    for recorder in recorders.values():
+        recorder.start()
+    print(f"Recording {', '.join(names)} on the Line3 triggers for {duration} s (Ctrl+C stops early)")
+    start_time = time.time()
+    try:
+        while time.time() - start_time < duration:
+            time.sleep(progress_interval)
+            print("  ".join(f"{name}: {r.frames_grabbed} ({r.camera_dropped + r.ring.overflows} dropped)"
+                            for name, r in recorders.items()))
+    except KeyboardInterrupt:
+        print("\nRecording interrupted by user")
+    summaries = {name: recorder.stop() for name, recorder in recorders.items()}
+    indexes = {name: open_raw_recording(f"{base}_{name}")[1] for name in names}
+    merged, merge_info = merge_indexes(indexes, offsets)
+    save_merged_index(base + "_merged.csv", merged)
+    complete = int(np.all([merged[name] >= 0 for name in names], axis=0).sum()) if len(merged) else 0
+    session = {
+        "cameras": names,
+        "files": {name: f"{os.path.basename(base)}_{name}.raw" for name in names},
+        "clock_offsets_ns": offsets,
+        "time_ns_clock": merge_info["clock"],
+        "tolerance_ns": merge_info["tolerance_ns"],
+        "triggers": len(merged),
+        "complete_triggers": complete,
+        "duplicate_frames": merge_info["duplicate_frames"],
+        "summaries": summaries,
+    }
+    with open(base + "_session.json", "w") as f:
+        json.dump(session, f, indent=1)
+    print(f"{len(merged)} triggers, {complete} seen by all cameras; merged index: {base}_merged.csv")
+    for name, count in merge_info["duplicate_frames"].items():
+        if count:
+            print(f"{name}: {count} frames in the same trigger as another frame of {name}, not in the merged index")
+    return session
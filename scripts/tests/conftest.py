@@ -0,0 +1,6 @@
+"""The scripts import each other by module name, so the scripts folder goes on sys.path."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,15 @@
+import numpy as np
+import pytest
+from frame_analysis import analyse_frame
+
+
+def test_colour_matches_mono_after_crop_and_stride():
+    rng = np.random.default_rng(0)
+    colour = rng.integers(0, 256, (600, 800, 3), dtype=np.uint8)
+    roi = (50, 40, 500, 400)
+    a = analyse_frame(colour, roi=roi, max_pixels=100 * 80)
+    b = analyse_frame(colour.mean(axis=2), roi=roi, max_pixels=100 * 80)
+    assert a["step"] == b["step"] == 5
+    assert a["roi"] == b["roi"] == roi
+    for key in ("sum", "peak", "cx", "cy", "sx", "sy", "focus", "saturated"):
+        assert a[key] == pytest.approx(b[key])
@@ -0,0 +1,141 @@
+"""FrameStreamServer on the loopback interface, read with read_raw_stream / read_mjpeg_stream."""
+
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from frame_streaming import FrameStreamServer, read_mjpeg_stream, read_raw_stream  # noqa: E402
+
+WIDTH, HEIGHT = 320, 240
+
+
+def frame(k):
+    """Mono12 frame whose 8 bit image is a gradient shifted by k."""
+    y, x = np.indices((HEIGHT, WIDTH))
+    return (((x + y + k) % 256) << 4).astype(np.uint16)
+
+
+@pytest.fixture
+def server():
+    server = FrameStreamServer(port=0, host="127.0.0.1")
+    server.start()
+    stop = threading.Event()
+    k = [0]
+
+    def publish():
+        # The camera: a new frame every 2 ms whatever the clients do
+        while not stop.is_set():
+            for broadcaster in list(server.streams.values()):
+                broadcaster.publish(frame(k[0]), bits=12)
+            k[0] += 1
+            time.sleep(0.002)
+
+    publisher = threading.Thread(target=publish, daemon=True)
+    publisher.start()
+    yield server
+    stop.set()
+    publisher.join()
+    server.stop()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}/{path}"
+
+
+def is_frame(img):
+    """img is the 8 bit image of one of the published frames."""
+    k = int(img[0, 0])
+    return np.array_equal(img, (frame(k) >> 4).astype(np.uint8))
+
+
+def test_raw_round_trip(server):
+    server.add_stream("cam0", encoding="raw", max_size=(WIDTH, HEIGHT), max_fps=50)
+    frames = list(read_raw_stream(url(server, "cam0/stream.raw"), max_frames=5))
+    assert len(frames) == 5
+    seqs = [seq for seq, img in frames]
+    assert seqs == sorted(seqs) and len(set(seqs)) == 5
+    for seq, img in frames:
+        assert img.shape == (HEIGHT, WIDTH) and img.dtype == np.uint8
+        assert is_frame(img)
+
+
+def test_raw_downscaled(server):
+    server.add_stream("cam0", encoding="raw", max_size=(WIDTH // 2, HEIGHT // 2), max_fps=50)
+    seq, img = next(read_raw_stream(url(server, "cam0/stream.raw"), max_frames=1))
+    assert img.shape == (HEIGHT // 2, WIDTH // 2)
+    with urllib.request.urlopen(url(server, "cam0/frame.raw"), timeout=5) as response:
+        assert (int(response.headers["X-Width"]), int(response.headers["X-Height"])) == (WIDTH // 2, HEIGHT // 2)
+        assert len(response.read()) == WIDTH * HEIGHT // 4
+
+
+def test_mjpeg_round_trip(server):
+    server.add_stream("cam0", encoding="jpeg", max_size=(WIDTH, HEIGHT), max_fps=50, jpeg_quality=95)
+    frames = list(read_mjpeg_stream(url(server, "cam0/stream.mjpg"), max_frames=3))
+    assert len(frames) == 3
+    assert [seq for seq, jpeg in frames] == sorted(seq for seq, jpeg in frames)
+    for seq, jpeg in frames:
+        img = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_GRAYSCALE)
+        assert img.shape == (HEIGHT, WIDTH)
+        # Lossy: compare with the closest published frame
+        k = int(np.median((img.astype(int) - np.indices((HEIGHT, WIDTH)).sum(axis=0)) % 256))
+        assert np.mean(np.abs(img.astype(int) - (frame(k) >> 4))) < 8
+    with urllib.request.urlopen(url(server, "cam0/frame.jpg"), timeout=5) as response:
+        assert response.headers["Content-Type"] == "image/jpeg"
+        assert response.read()[:2] == b"\xff\xd8"
+
+
+@pytest.mark.parametrize("encoding, path", [("raw", "stream.mjpg"), ("raw", "frame.jpg"), ("jpeg", "stream.raw"), ("jpeg", "frame.raw")])
+def test_wrong_encoding_is_415(server, encoding, path):
+    server.add_stream("cam0", encoding=encoding, max_size=(WIDTH, HEIGHT))
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(url(server, f"cam0/{path}"), timeout=5)
+    assert error.value.code == 415
+
+
+def test_unknown_stream_is_404(server):
+    server.add_stream("cam0", encoding="raw")
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(url(server, "cam1/stream.raw"), timeout=5)
+    assert error.value.code == 404
+
+
+def test_slow_client_drops_frames_other_keeps_receiving(server):
+    broadcaster = server.add_stream("cam0", encoding="raw", max_size=(WIDTH, HEIGHT), max_fps=200)
+    # Slow client: small receive buffer, stops reading after the response headers
+    slow = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    slow.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    slow.connect(("127.0.0.1", server.server_address[1]))
+    slow.sendall(b"GET /cam0/stream.raw HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    slow.settimeout(5)
+    received = b""
+    while b"\r\n\r\n" not in received:
+        received += slow.recv(4096)
+    slow_address = "127.0.0.1:%d" % slow.getsockname()[1]
+    try:
+        # Meanwhile the fast client gets frames at the encoder rate, well beyond the socket buffers
+        start = time.monotonic()
+        seqs = [seq for seq, img in read_raw_stream(url(server, "cam0/stream.raw"), max_frames=150)]
+        assert time.monotonic() - start < 10
+        assert len(seqs) == 150 and seqs == sorted(seqs)
+        # The slow client's thread is stuck on a full socket: resumes only on the newest frame
+        counters = broadcaster.clients[slow_address]
+        sent_before = counters["sent"]
+        assert seqs[-1] > sent_before + 10
+        slow.settimeout(1)
+        deadline = time.monotonic() + 5
+        while counters["dropped"] == 0 and time.monotonic() < deadline:
+            try:
+                slow.recv(1 << 16)
+            except socket.timeout:
+                pass
+        assert counters["dropped"] > 0
+        assert counters["sent"] + counters["dropped"] <= broadcaster.seq
+    finally:
+        slow.close()
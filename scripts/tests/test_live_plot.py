@@ -0,0 +1,76 @@
+"""MinMaxSeries: bounded bins that keep the extremes of every sample; LivePlot blitting."""
+
+import numpy as np
+import pytest
+
+from live_plot import MinMaxSeries
+
+
+def test_one_bin_per_sample_until_full():
+    series = MinMaxSeries(max_bins=10, bin_width=1.0)
+    for t in range(5):
+        series.append(float(t), t * 2.0)
+    x, y = series.xy()
+    np.testing.assert_array_equal(x, np.repeat(np.arange(5.0), 2))
+    np.testing.assert_array_equal(y, np.repeat(np.arange(5.0) * 2, 2))
+
+
+def test_samples_in_a_bin_keep_min_and_max():
+    series = MinMaxSeries(max_bins=10, bin_width=1.0)
+    for t, y in [(0.0, 3.0), (0.3, -1.0), (0.6, 7.0), (1.2, 2.0)]:
+        series.append(t, y)
+    assert series.n == 2
+    np.testing.assert_array_equal(series.xy()[1], [-1.0, 7.0, 2.0, 2.0])
+
+
+def test_compaction_bounds_bins_and_keeps_extremes():
+    rng = np.random.default_rng(0)
+    series = MinMaxSeries(max_bins=100, bin_width=1.0)
+    t = np.arange(100000, dtype=float)
+    y = rng.normal(size=t.size)
+    y[54321] = 50.0  # A single spike must survive any amount of compaction
+    y[77777] = -50.0
+    for ti, yi in zip(t, y):
+        series.append(ti, yi)
+    assert series.n <= 100
+    assert series.bin_width == 1024.0
+    x, yy = series.xy()
+    assert np.all(np.diff(x) >= 0)
+    assert yy.max() == 50.0 and yy.min() == -50.0
+    assert (series.count, series.t_first, series.t_last) == (100000, 0.0, 99999.0)
+    assert (series.y_min, series.y_max) == (-50.0, 50.0)
+    # Every bin holds the extremes of the samples in [t0, t0 + bin_width)
+    lo, hi = yy[0::2], yy[1::2]
+    edges = np.append(x[0::2], np.inf)
+    for k in range(series.n):
+        inside = (t >= edges[k]) & (t < edges[k + 1])
+        assert lo[k] == y[inside].min() and hi[k] == y[inside].max()
+
+
+@pytest.mark.parametrize("bad", [None, float("nan"), float("inf")])
+def test_missing_readings_are_skipped(bad):
+    series = MinMaxSeries(max_bins=10)
+    series.append(0.0, 1.0)
+    series.append(1.0, bad)
+    assert series.count == 1 and series.t_last == 0.0 and series.y_last == 1.0
+
+
+def test_live_plot_redraws_background_only_when_limits_grow():
+    matplotlib = pytest.importorskip("matplotlib")
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    from live_plot import LivePlot
+
+    fig, ax = plt.subplots()
+    plot = LivePlot(fig, max_fps=0)
+    plot.add_line("cube", ax)
+    for t in range(200):
+        plot.append("cube", float(t), 20.0 + 0.01 * t)
+        plot.update()
+    # With 20% headroom the limits grow geometrically: O(log n) full draws, the rest are blits
+    assert plot.full_draws + plot.blits == 200
+    assert plot.full_draws <= 1 + np.ceil(np.log(200) / np.log(1.2))
+    xmin, xmax = ax.get_xlim()
+    assert xmin <= 0.0 and xmax >= 199.0
+    plt.close(fig)
@@ -0,0 +1,94 @@
+"""FrameRing (grab thread -> writer thread buffer) and the recording index helpers."""
+
+import json
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("pypylon")
+
+from raw_recording import INDEX_DTYPE, FrameRing, dropped_frames, open_raw_recording  # noqa: E402
+
+
+def frame(k, shape=(4, 6)):
+    return np.full(shape, k % 65536, dtype=np.uint16)
+
+
+def test_push_until_full_counts_overflows():
+    ring = FrameRing(4, (4, 6), np.uint16)
+    assert all(ring.push(frame(k), k, 1000 * k, 0.5 * k) for k in range(4))
+    assert not ring.push(frame(4), 4, 4000, 2.0)
+    assert (len(ring), ring.overflows, ring.high_water) == (4, 1, 4)
+    start, n = ring.wait_batch(10, 0)
+    assert (start, n) == (0, 4)
+    np.testing.assert_array_equal(ring.index["frame_id"], np.arange(4))
+    np.testing.assert_array_equal(ring.frames[:, 0, 0], np.arange(4))
+
+
+def test_batches_stop_at_the_end_of_the_ring():
+    ring = FrameRing(5, (4, 6), np.uint16)
+    for k in range(4):
+        ring.push(frame(k), k, 0, 0.0)
+    ring.release(3)
+    for k in range(4, 7):
+        ring.push(frame(k), k, 0, 0.0)  # Slots 4, 0, 1
+    # Contiguous runs only: slots 3-4, then 0-1
+    start, n = ring.wait_batch(10, 0)
+    assert (start, n) == (3, 2)
+    np.testing.assert_array_equal(ring.index["frame_id"][start:start + n], [3, 4])
+    ring.release(n)
+    start, n = ring.wait_batch(10, 0)
+    assert (start, n) == (0, 2)
+    np.testing.assert_array_equal(ring.frames[start:start + n, 0, 0], [5, 6])
+    ring.release(n)
+    assert len(ring) == 0
+    assert ring.wait_batch(10, 0.01) == (2, 0)
+
+
+def test_threads_keep_order_and_content():
+    ring = FrameRing(16, (8, 8), np.uint16)
+    total = 5000
+    received = []
+
+    def consume():
+        while len(received) < total:
+            start, n = ring.wait_batch(7, 0.1)
+            for slot in range(start, start + n):
+                k = int(ring.index["frame_id"][slot])
+                assert np.all(ring.frames[slot] == k)
+                received.append(k)
+            ring.release(n)
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    k = 0
+    while k < total:
+        if ring.push(frame(k, (8, 8)), k, k, 0.0):
+            k += 1
+    consumer.join(10)
+    assert received == list(range(total))
+    assert ring.high_water <= ring.capacity
+
+
+def test_dropped_frames():
+    index = np.zeros(6, dtype=INDEX_DTYPE)
+    index["frame_id"] = [10, 11, 13, 14, 17, 18]
+    np.testing.assert_array_equal(dropped_frames(index), [12, 15, 16])
+    assert len(dropped_frames(index[:1])) == 0
+
+
+def test_open_raw_recording_ignores_partial_frame(tmp_path):
+    base = str(tmp_path / "cam")
+    frames = np.arange(3 * 4 * 6, dtype=np.uint16).reshape(3, 4, 6)
+    index = np.zeros(3, dtype=INDEX_DTYPE)
+    index["frame_id"] = [0, 1, 2]
+    with open(base + ".json", "w") as f:
+        json.dump({"shape": [4, 6], "dtype": np.dtype(np.uint16).str}, f)
+    with open(base + ".raw", "wb") as f:
+        f.write(frames.tobytes() + b"\x00" * 10)  # Last write cut short
+    index.tofile(base + ".idx")
+    read, read_index, header = open_raw_recording(base)
+    np.testing.assert_array_equal(read, frames)
+    np.testing.assert_array_equal(read_index, index)
@@ -0,0 +1,120 @@
+"""SensorEngine: staleness, error counting and wait_ready, on which the heater shut-off depends."""
+
+import threading
+import time
+
+import pytest
+
+from sensor_engine import LatestValueStore, SensorEngine
+
+
+def test_store_value_becomes_stale_after_max_age():
+    store = LatestValueStore()
+    store.register("cube", max_age=5.0)
+    assert store.get("cube") == (None, None, float("inf"), True, 0)
+    now = time.monotonic()
+    store.update("cube", [21.0], timestamp=now - 1.0)
+    reading = store.get("cube")
+    assert reading.value == [21.0] and not reading.stale
+    assert reading.age == pytest.approx(1.0, abs=0.1)
+    store.update("cube", [21.0], timestamp=now - 6.0)
+    assert store.get("cube").stale
+    assert not store.get("cube", max_age=10.0).stale
+
+
+def test_errors_count_until_a_good_read():
+    store = LatestValueStore()
+    store.register("pressure", max_age=5.0)
+    store.update("pressure", 1e-9)
+    store.error("pressure")
+    store.error("pressure")
+    reading = store.get("pressure")
+    assert reading.errors == 2
+    assert reading.value == 1e-9  # Last good value kept
+    store.update("pressure", 2e-9)
+    assert store.get("pressure").errors == 0
+
+
+def test_poller_counts_none_and_exceptions():
+    calls = []
+
+    def read():
+        calls.append(None)
+        if len(calls) % 3 == 1:
+            return 20.0
+        if len(calls) % 3 == 2:
+            return None
+        raise OSError("port gone")
+
+    engine = SensorEngine()
+    poller = engine.add("cube", read, period=0.01)
+    engine.start()
+    try:
+        time.sleep(0.2)
+    finally:
+        engine.stop()
+    assert not poller.is_alive()
+    assert len(calls) >= 6
+    assert poller.last_error == "port gone"
+    reading = engine.get("cube")
+    assert reading.value == 20.0
+    # Errors since the last good read only
+    assert reading.errors == (len(calls) - 1) % 3
+
+
+def test_silent_sensor_goes_stale():
+    values = iter([1.0])
+    engine = SensorEngine()
+    engine.add("pressure", lambda: next(values, None), period=0.01, max_age=0.1)
+    engine.add("cube", lambda: 20.0, period=0.01, max_age=0.1)
+    engine.start()
+    try:
+        assert engine.wait_ready(timeout=1.0)
+        time.sleep(0.3)
+        assert engine.stale() == ["pressure"]
+        assert engine.get("pressure").value == 1.0
+        assert engine.get("pressure").errors > 0
+    finally:
+        engine.stop()
+
+
+def test_default_max_age():
+    engine = SensorEngine()
+    engine.add("cube", lambda: 20.0, period=1.0)
+    engine.store.update("cube", 20.0, timestamp=time.monotonic() - 4.9)
+    assert engine.stale() == []
+    engine.store.update("cube", 20.0, timestamp=time.monotonic() - 5.1)  # 3 periods + 2 s
+    assert engine.stale() == ["cube"]
+
+
+def test_wait_ready_timeout():
+    engine = SensorEngine()
+    engine.add("cube", lambda: 20.0, period=0.01)
+    engine.add("bellow", lambda: None, period=0.01)
+    engine.start()
+    try:
+        start = time.monotonic()
+        assert not engine.wait_ready(timeout=0.2)
+        assert time.monotonic() - start == pytest.approx(0.2, abs=0.15)
+        assert engine.wait_ready(names=["cube"], timeout=1.0)
+    finally:
+        engine.stop()
+
+
+def test_slow_sensor_does_not_delay_the_others():
+    release = threading.Event()
+
+    def slow():
+        release.wait(2.0)
+        return 1e-9
+
+    engine = SensorEngine()
+    engine.add("pressure", slow, period=0.01)
+    engine.add("cube", lambda: 20.0, period=0.01)
+    engine.start()
+    try:
+        assert engine.wait_ready(names=["cube"], timeout=0.5)
+        assert engine.get("pressure").value is None
+    finally:
+        release.set()
+        engine.stop()
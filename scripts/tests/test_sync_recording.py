@@ -0,0 +1,60 @@
+"""merge_indexes: alignment of the frames of several cameras on the triggers."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("pypylon")
+
+from raw_recording import INDEX_DTYPE  # noqa: E402
+from sync_recording import merge_indexes  # noqa: E402
+
+PERIOD = 10_000_000  # 10 ms between triggers [ns]
+
+
+def index(camera_timestamps, host_times=None):
+    out = np.zeros(len(camera_timestamps), dtype=INDEX_DTYPE)
+    out["frame_id"] = np.arange(len(camera_timestamps))
+    out["camera_timestamp"] = camera_timestamps
+    out["host_time"] = 1.7e9 + np.arange(len(camera_timestamps)) * PERIOD * 1e-9 if host_times is None else host_times
+    return out
+
+
+def test_aligns_cameras_with_different_offsets():
+    triggers = np.arange(6) * PERIOD
+    # Camera clocks with different origins, small jitter; B misses trigger 2
+    a = index(triggers + 5_000_000_000 + 1000)
+    b = index(np.delete(triggers, 2) + 8_000_000_000 - 2000)
+    merged, info = merge_indexes({"A": a, "B": b}, {"A": -5_000_000_000, "B": -8_000_000_000})
+    assert info["clock"] == "camera_timestamp"
+    assert info["tolerance_ns"] == pytest.approx(PERIOD / 2)
+    assert info["duplicate_frames"] == {"A": 0, "B": 0}
+    np.testing.assert_array_equal(merged["event"], np.arange(6))
+    np.testing.assert_array_equal(merged["A"], np.arange(6))
+    np.testing.assert_array_equal(merged["B"], [0, 1, -1, 2, 3, 4])
+    # Time of the first frame of each trigger: B's, except where B missed it
+    np.testing.assert_array_equal(merged["time_ns"], triggers + [-2000, -2000, 1000, -2000, -2000, -2000])
+
+
+def test_duplicate_frames_are_counted_and_first_kept():
+    a = index(np.arange(4) * PERIOD)
+    b = index([0, 1000, PERIOD, 2 * PERIOD, 2 * PERIOD + 500, 3 * PERIOD])
+    merged, info = merge_indexes({"A": a, "B": b}, {"A": 0, "B": 0}, tolerance_ns=PERIOD / 2)
+    assert len(merged) == 4
+    assert info["duplicate_frames"] == {"A": 0, "B": 2}
+    np.testing.assert_array_equal(merged["B"], [0, 2, 3, 5])
+
+
+def test_falls_back_to_host_time_without_timestamps():
+    a = index(np.arange(3) * PERIOD)
+    b = index(np.full(3, -1))  # Timestamp chunk not enabled
+    merged, info = merge_indexes({"A": a, "B": b}, {"A": 0})
+    assert info["clock"] == "host_time"
+    np.testing.assert_array_equal(merged["time_ns"], (a["host_time"] * 1e9).astype(np.int64))
+    np.testing.assert_array_equal(merged["B"], np.arange(3))
+
+
+def test_empty_recording():
+    merged, info = merge_indexes({"A": index([]), "B": index([])}, {"A": 0, "B": 0})
+    assert len(merged) == 0
+    assert merged.dtype.names == ("event", "time_ns", "A", "B")
@@ -0,0 +1,100 @@
+"""parse_temperature_packet and the TemperatureStream reader (utils)."""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("serial")
+pytest.importorskip("instrumental.drivers.vacuum.ngc")
+pytest.importorskip("PyP100")
+
+from utils import TemperatureStream, parse_temperature_packet  # noqa: E402
+
+
+def packet(payload):
+    """A packet of read_temperatures.ino with its XOR checksum."""
+    checksum = 0
+    for byte in payload:
+        checksum ^= byte
+    return b"$" + payload + b"*%02X" % checksum
+
+
+class FakeSerial:
+    """Serves the given bytes in chunks, then nothing (as a port at timeout)."""
+
+    port = "fake"
+
+    def __init__(self, data, chunk=7):
+        self.chunks = [data[i:i + chunk] for i in range(0, len(data), chunk)]
+        self.written = []
+        self.done = threading.Event()
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size):
+        if not self.chunks:
+            self.done.set()
+            time.sleep(0.01)
+            return b""
+        return self.chunks.pop(0)
+
+    def write(self, data):
+        self.written.append(data)
+
+    def reset_input_buffer(self):
+        pass
+
+
+def test_parse_valid_packet():
+    assert parse_temperature_packet(packet(b"12,34567,21.50,-3.25") + b"\r\n") == (12, 34567, [21.5, -3.25])
+
+
+@pytest.mark.parametrize("line", [
+    b"12,34567,21.50",  # No framing
+    b"$12,34567,21.50",  # No checksum
+    b"$12,34567,21.50*00",  # Wrong checksum
+    b"$12,34567,21.50*ZZ",  # Checksum not hex
+])
+def test_parse_rejects_bad_framing(line):
+    assert parse_temperature_packet(line) is None
+
+
+@pytest.mark.parametrize("payload", [b"5", b"5,100", b"", b"5,x,21.0", b"5,100,abc"])
+def test_parse_rejects_bad_fields(payload):
+    # Checksum valid, contents not: None rather than an exception in the reader thread
+    assert parse_temperature_packet(packet(payload)) is None
+
+
+def test_store_clears_previous_lap():
+    stream = TemperatureStream(FakeSerial(b""), capacity=2)
+    stream._store(0.0, 0, 0, [1.0, 2.0, 3.0])
+    stream._store(1.0, 1, 1, [1.0, 2.0, 3.0])
+    stream._store(2.0, 2, 2, [4.0])  # Overwrites slot 0 with a shorter packet
+    assert stream.latest()[0] == 4.0
+    assert np.isnan(stream.latest()[1:]).all()
+
+
+def test_reader_counts_lost_and_corrupted_packets():
+    lines = [
+        packet(b"1,100,20.0,21.0"),
+        packet(b"2,200,20.1,21.1"),
+        packet(b"5"),  # Too few fields
+        b"$3,300,20.2,21.2*00",  # Corrupted
+        packet(b"4,400,20.3,21.3"),
+        packet(b"7,700,20.6,21.6"),  # 5 and 6 lost
+    ]
+    ser = FakeSerial(b"\r\n".join(lines) + b"\r\n")
+    stream = TemperatureStream(ser).start()
+    assert ser.done.wait(2.0)
+    stream.stop()
+    assert ser.written == [b"S", b"X"]
+    assert stream.count == 4
+    assert stream.corrupted == 2
+    assert stream.lost == 3  # 3 (the corrupted one), 5 and 6
+    times, values = stream.window()
+    np.testing.assert_allclose(values[:, 0], [20.0, 20.1, 20.3, 20.6])
+    assert stream.latest(max_age=60) == [20.6, 21.6]
@@ -0,0 +1,108 @@
+"""TimeSeriesWriter / TimeSeriesStore: round trip, downsample pyramid and crash recovery."""
+
+import csv
+import os
+
+import numpy as np
+import pytest
+
+from timeseries_store import TimeSeriesStore, TimeSeriesWriter
+
+COLUMNS = ["Cube", "Pressure (mbar)"]
+
+
+def write(path, n, start=0, mode="a", **kwargs):
+    kwargs.setdefault("flush_interval", 1e9)
+    with TimeSeriesWriter(path, COLUMNS, mode=mode, factor=4, levels=3, **kwargs) as writer:
+        for k in range(start, start + n):
+            writer.append(1000.0 + k, [float(k), None if k % 10 == 3 else 1e-9 * k])
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "log.ts")
+    write(path, 100)
+    store = TimeSeriesStore(path)
+    assert len(store) == 100
+    np.testing.assert_array_equal(store.time, 1000.0 + np.arange(100))
+    np.testing.assert_array_equal(store.column("Cube"), np.arange(100))
+    assert np.isnan(store.column("Pressure (mbar)")[3])
+
+
+def test_pyramid_levels(tmp_path):
+    path = str(tmp_path / "log.ts")
+    write(path, 70, batch_size=5)  # Batches not aligned with the factor
+    store = TimeSeriesStore(path)
+    assert [len(level) for level in store.levels] == [17, 4, 1]
+    view = store.view(max_points=20)
+    assert view.level == 1
+    np.testing.assert_array_equal(view.min[:, 0], np.arange(0, 68, 4))
+    np.testing.assert_array_equal(view.max[:, 0], np.arange(3, 68, 4))
+    np.testing.assert_allclose(view.mean[:, 0], np.arange(0, 68, 4) + 1.5)
+    # Mean over the valid readings only
+    assert view.mean[0, 1] == pytest.approx(1e-9 * (0 + 1 + 2) / 3)
+    assert store.view(max_points=1).level == 3
+    assert store.view(max_points=100).level == 0
+
+
+def test_append_across_sessions(tmp_path):
+    path = str(tmp_path / "log.ts")
+    write(path, 30)
+    write(path, 34, start=30)
+    store = TimeSeriesStore(path)
+    np.testing.assert_array_equal(store.column("Cube"), np.arange(64))
+    # Same pyramid as a single session
+    single = str(tmp_path / "single.ts")
+    write(single, 64)
+    for a, b in zip(store.levels, TimeSeriesStore(single).levels):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_recovery_after_torn_write(tmp_path):
+    path = str(tmp_path / "log.ts")
+    write(path, 50)
+    # Crash in the middle of a flush: a partial record in one column, whole ones missing in another
+    with open(os.path.join(path, "time.f8"), "ab") as f:
+        f.write(np.float64(2000.0).tobytes() + b"\x01\x02\x03")
+    with open(os.path.join(path, "c0.f8"), "ab") as f:
+        f.write(np.zeros(3).tobytes())
+    with open(os.path.join(path, "level1.f8"), "ab") as f:
+        f.write(b"\x00" * 17)
+    write(path, 14, start=50)
+    store = TimeSeriesStore(path)
+    np.testing.assert_array_equal(store.time, 1000.0 + np.arange(64))
+    np.testing.assert_array_equal(store.column("Cube"), np.arange(64))
+    single = str(tmp_path / "single.ts")
+    write(single, 64)
+    for a, b in zip(store.levels, TimeSeriesStore(single).levels):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_unflushed_samples_lost_but_store_readable(tmp_path):
+    path = str(tmp_path / "log.ts")
+    writer = TimeSeriesWriter(path, COLUMNS, batch_size=8, flush_interval=1e9)
+    for k in range(13):
+        writer.append(1000.0 + k, [k, k])
+    # Killed without close(): only the full batch reached the files
+    assert len(TimeSeriesStore(path)) == 8
+    write(path, 2, start=8)
+    np.testing.assert_array_equal(TimeSeriesStore(path).column("Cube"), np.arange(10))
+
+
+def test_mode_and_columns(tmp_path):
+    path = str(tmp_path / "log.ts")
+    write(path, 10)
+    with pytest.raises(ValueError):
+        TimeSeriesWriter(path, ["Other"])
+    write(path, 5, mode="w")
+    assert len(TimeSeriesStore(path)) == 5
+
+
+def test_export_csv(tmp_path):
+    path = str(tmp_path / "log.ts")
+    write(path, 20)
+    out = str(tmp_path / "log.csv")
+    assert TimeSeriesStore(path).export_csv(out, start=1005.0, end=1009.0) == 5
+    with open(out) as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["Time", "Elapsed (s)"] + COLUMNS
+    assert [float(r[2]) for r in rows[1:]] == [5, 6, 7, 8, 9]
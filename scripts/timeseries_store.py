@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Append-only binary time-series store for the bake-out logs.
+
+A store is a directory (e.g. heating_cycle_data.ts/) holding:
+    meta.json         column names, pyramid factor and number of levels
+    time.f8           sample times (Unix seconds), float64
+    c<k>.f8           column k, float64 (NaN for a missing reading)
+    level<j>.f8       downsample level j: one record per factor**j samples,
+                      [t_first, t_last, min of every column, max..., mean...]
+
+TimeSeriesWriter buffers the samples and writes them in batches (every
+batch_size samples or flush_interval seconds), updates the downsample pyramid
+as it goes and fsyncs every fsync_interval seconds. Reopening a store appends
+to it; records cut by a crash are truncated away and the pyramid carries on.
+
+TimeSeriesStore memory-maps a store: view() picks the finest level with at
+most max_points records in the requested time range, so weeks of data open
+and zoom at once; export_csv() writes CSV only on demand:
+
+    python timeseries_store.py heating_cycle_data.ts --csv heating_cycle_data.csv
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+FORMAT = "timeseries-v1"
+
+View = namedtuple("View", "level time mean min max")
+
+
+def _records(times, values):
+    """Raw samples as level records: t_first = t_last = t, min = max = mean = value."""
+    times = np.asarray(times, dtype=np.float64)[:, None]
+    return np.hstack([times, times, values, values, values])
+
+
+def _aggregate(records, factor, num_columns):
+    """Merge every factor consecutive records (len(records) multiple of factor) into one."""
+    n = num_columns
+    groups = records.reshape(-1, factor, records.shape[1])
+    means = groups[:, :, 2 + 2 * n :]
+    valid = ~np.isnan(means)
+    counts = valid.sum(axis=1)
+    sums = np.where(valid, means, 0.0).sum(axis=1)
+    return np.hstack([
+        groups[:, 0, 0:1],
+        groups[:, -1, 1:2],
+        np.fmin.reduce(groups[:, :, 2 : 2 + n], axis=1),
+        np.fmax.reduce(groups[:, :, 2 + n : 2 + 2 * n], axis=1),
+        np.where(counts > 0, sums / np.maximum(counts, 1), np.nan),  # Mean of the sub-records
+    ])
+
+
+def _file_rows(path, row_bytes):
+    return os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+
+
+class TimeSeriesWriter:
+    """Append (time, values) samples to the store at path; see the module docstring.
+
+    mode "a" appends to an existing store (its columns must match), "w" starts a new one.
+    """
+
+    def __init__(self, path, columns, mode="a", batch_size=64, flush_interval=5.0, fsync_interval=30.0, factor=16, levels=5):
+        self.path = path
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if mode == "a" and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta["columns"] != self.columns:
+                raise ValueError(f"{path} has the columns {meta['columns']}, not {self.columns}")
+            factor, levels = meta["factor"], meta["levels"]
+        elif mode in ("a", "w"):
+            meta = {"format": FORMAT, "columns": self.columns, "factor": factor, "levels": levels,
+                    "created": datetime.now().isoformat()}
+            for name in os.listdir(path):
+                if name.endswith(".f8"):
+                    os.remove(os.path.join(path, name))
+            with open(meta_path, "w") as f:
+                json.dump(meta, f, indent=1)
+        else:
+            raise ValueError(f"Unknown mode {mode!r}")
+        self.factor = factor
+        self.levels = levels
+        n = len(self.columns)
+        self.record_width = 2 + 3 * n
+        self._recover()
+        self._files = [open(os.path.join(path, name), "ab") for name in self._data_names()]
+        self._level_files = [open(os.path.join(path, f"level{j}.f8"), "ab") for j in range(1, levels + 1)]
+        self._times = np.empty(batch_size)
+        self._values = np.empty((batch_size, n))
+        self._pending = 0
+        self._last_flush = self._last_fsync = time.monotonic()
+
+    def _data_names(self):
+        return ["time.f8"] + [f"c{k}.f8" for k in range(len(self.columns))]
+
+    def _recover(self):
+        """Cut the files to whole, consistent records and rebuild the pyramid tails."""
+        paths = [os.path.join(self.path, name) for name in self._data_names()]
+        rows = min(_file_rows(p, 8) for p in paths)
+        for p in paths:
+            if os.path.exists(p):
+                os.truncate(p, rows * 8)
+        self.rows = rows
+        counts = [rows]
+        for j in range(1, self.levels + 1):
+            p = os.path.join(self.path, f"level{j}.f8")
+            count = min(_file_rows(p, 8 * self.record_width), counts[-1] // self.factor)
+            if os.path.exists(p):
+                os.truncate(p, count * 8 * self.record_width)
+            counts.append(count)
+        # Tail of each level: its records not yet merged into the next level (fewer than factor)
+        self._tails = []
+        for j in range(self.levels):
+            start = counts[j + 1] * self.factor
+            if j == 0:
+                columns = [np.fromfile(p, dtype=np.float64, count=rows - start, offset=8 * start) if rows > start else np.zeros(0) for p in paths]
+                tail = _records(columns[0], np.column_stack(columns[1:]).reshape(-1, len(self.columns)))
+            else:
+                p = os.path.join(self.path, f"level{j}.f8")
+                count = (counts[j] - start) * self.record_width
+                tail = np.fromfile(p, dtype=np.float64, count=count, offset=8 * self.record_width * start) if count else np.zeros(0)
+            self._tails.append(tail.reshape(-1, self.record_width))
+
+    def append(self, t, values):
+        """Add a sample; t in Unix seconds, values in column order (None for a missing reading)."""
+        self._times[self._pending] = t
+        self._values[self._pending] = [np.nan if v is None else v for v in values]
+        self._pending += 1
+        if self._pending == self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self, fsync=False):
+        """Write the buffered samples and the pyramid records they complete."""
+        k = self._pending
+        if k:
+            times, values = self._times[:k], self._values[:k]
+            self._files[0].write(times.tobytes())
+            for c, f in enumerate(self._files[1:]):
+                f.write(np.ascontiguousarray(values[:, c]).tobytes())
+            self.rows += k
+            self._pending = 0
+            records = _records(times, values)
+            for j in range(self.levels):
+                combined = np.vstack([self._tails[j], records])
+                m = len(combined) // self.factor
+                self._tails[j] = combined[m * self.factor :]
+                if m == 0:
+                    break
+                records = _aggregate(combined[: m * self.factor], self.factor, len(self.columns))
+                self._level_files[j].write(records.tobytes())
+        for f in self._files + self._level_files:
+            f.flush()
+        now = time.monotonic()
+        self._last_flush = now
+        if fsync or now - self._last_fsync >= self.fsync_interval:
+            for f in self._files + self._level_files:
+                os.fsync(f.fileno())
+            self._last_fsync = now
+
+    def close(self):
+        self.flush(fsync=True)
+        for f in self._files + self._level_files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TimeSeriesStore:
+    """Read-only, memory-mapped view of a store written by TimeSeriesWriter."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.columns = self.meta["columns"]
+        self.factor = self.meta["factor"]
+        self.record_width = 2 + 3 * len(self.columns)
+        self.time = self._map("time.f8")
+        self.data = [self._map(f"c{k}.f8") for k in range(len(self.columns))]
+        rows = min([len(self.time)] + [len(c) for c in self.data])
+        self.time = self.time[:rows]
+        self.data = [c[:rows] for c in self.data]
+        self.levels = [self._map(f"level{j}.f8", self.record_width) for j in range(1, self.meta["levels"] + 1)]
+
+    def _map(self, name, width=1):
+        p = os.path.join(self.path, name)
+        rows = _file_rows(p, 8 * width)
+        if rows == 0:
+            return np.zeros((0, width) if width > 1 else 0)
+        return np.memmap(p, dtype=np.float64, mode="r", shape=(rows, width) if width > 1 else (rows,))
+
+    def __len__(self):
+        return len(self.time)
+
+    def column(self, name):
+        return self.data[self.columns.index(name)]
+
+    def _range(self, times, start, end):
+        lo = 0 if start is None else int(np.searchsorted(times, start, "left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, "right"))
+        return lo, hi
+
+    def view(self, start=None, end=None, max_points=2000):
+        """Samples between start and end (Unix seconds) from the finest level with at most max_points of them.
+
+        Returns View(level, time, mean, min, max), the last three (points, columns) arrays;
+        at level 0 they are the raw samples. The samples after the last complete record of a
+        level are not in it.
+        """
+        lo, hi = self._range(self.time, start, end)
+        if hi - lo <= max_points or not self.levels:
+            values = np.column_stack([c[lo:hi] for c in self.data]).reshape(hi - lo, len(self.columns))
+            return View(0, np.array(self.time[lo:hi]), values, values, values)
+        n = len(self.columns)
+        for j, level in enumerate(self.levels, start=1):
+            lo, hi = self._range(level[:, 0], start, end)
+            if hi - lo <= max_points or j == len(self.levels):
+                records = np.array(level[lo:hi])
+                return View(j, records[:, 0], records[:, 2 + 2 * n :], records[:, 2 : 2 + n], records[:, 2 + n : 2 + 2 * n])
+
+    def export_csv(self, csv_path, start=None, end=None, level=0, chunk=100000):
+        """Write the samples (level 0) or the records of a downsample level to csv_path."""
+        t0 = float(self.time[0]) if len(self.time) else 0.0
+        header = ["Time", "Elapsed (s)"]
+        if level == 0:
+            header += self.columns
+            times = self.time
+        else:
+            records = self.levels[level - 1]
+            header += ["Time last"] + [f"{c} {stat}" for stat in ("min", "max", "mean") for c in self.columns]
+            times = records[:, 0]
+        lo, hi = self._range(times, start, end)
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for a in range(lo, hi, chunk):
+                b = min(a + chunk, hi)
+                if level == 0:
+                    rows = np.column_stack([c[a:b] for c in self.data]).reshape(b - a, len(self.columns)).tolist()
+                else:
+                    rows = [[datetime.fromtimestamp(r[1]).isoformat()] + r[2:] for r in np.array(records[a:b]).tolist()]
+                for t, row in zip(times[a:b].tolist(), rows):
+                    writer.writerow([datetime.fromtimestamp(t).isoformat(), f"{t - t0:.3f}"] + row)
+        return hi - lo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Information on a time-series store and CSV export")
+    parser.add_argument("path", help="Store directory, e.g. heating_cycle_data.ts")
+    parser.add_argument("--csv", help="Export to this CSV file")
+    parser.add_argument("--level", type=int, default=0, help="Downsample level to export (0: every sample)")
+    args = parser.parse_args()
+
+    store = TimeSeriesStore(args.path)
+    print(f"{args.path}: {len(store)} samples of {', '.join(store.columns)}")
+    if len(store):
+        print(f"From {datetime.fromtimestamp(store.time[0])} to {datetime.fromtimestamp(store.time[-1])}")
+    for j, level in enumerate(store.levels, start=1):
+        print(f"Level {j}: {len(level)} records of {store.factor ** j} samples")
+    if args.csv:
+        rows = store.export_csv(args.csv, level=args.level)
+        print(f"{rows} rows written to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 import serial
 import sys
 import json
+import threading
 import time
-from instrumental.drivers.vacuum.ngc import NGC2D
+
+import numpy as np
+from instrumental.drivers.vacuum.ngc import NGC2D, GaugeSelection
 from PyP100 import PyP100
 
 
@@ -24,11 +27,11 @@ def load_config(config_path='config.json'):
         sys.exit(1)
     
 
-def initialize_serial_connection(port):
+def initialize_serial_connection(port, baudrate=9600):
     try:
         ser = serial.Serial(
             port=port,
-            baudrate=9600,
+            baudrate=baudrate,
             timeout=1,
         )
         ser.reset_input_buffer()
@@ -86,6 +89,154 @@ def read_temperature_data(ser):
         return None
     
 
+def parse_temperature_packet(line):
+    """
+    Decode a streaming packet of read_temperatures.ino: $<seq>,<millis>,<T1>[,<T2>...]*<CS>
+    Returns (seq, device_ms, [temperatures]) or None if the packet is malformed
+    or its XOR checksum does not match.
+    """
+    line = line.strip()
+    star = line.rfind(b'*')
+    if not line.startswith(b'$') or star < 0:
+        return None
+    payload = line[1:star]
+    checksum = 0
+    for byte in payload:
+        checksum ^= byte
+    try:
+        if int(line[star + 1:], 16) != checksum:
+            return None
+        fields = payload.split(b',')
+        if len(fields) < 3:
+            return None
+        return int(fields[0]), int(fields[1]), [float(x) for x in fields[2:]]
+    except (ValueError, IndexError):
+        return None
+
+
+class TemperatureStream:
+    """
+    Background reader of the streaming mode of read_temperatures.ino ('S' / 'X').
+    Decoded packets go to NumPy ring buffers of `capacity` samples:
+    host time (time.time()), device millis, sequence number and temperatures.
+    Lost packets are counted from the gaps in the sequence numbers (corrupted ones included),
+    corrupted ones from the checksum.
+    With a SensorEngine: engine.add("cube", lambda: stream.latest(max_age=2), period=0.1)
+    """
+
+    def __init__(self, ser, capacity=36000):
+        self.ser = ser
+        self.capacity = capacity
+        self.times = np.zeros(capacity)
+        self.device_ms = np.zeros(capacity, dtype=np.int64)
+        self.seq = np.zeros(capacity, dtype=np.int64)
+        self.values = None  # (capacity, number of thermistors), allocated on the first packet
+        self.count = 0  # Packets stored since start()
+        self.lost = 0
+        self.corrupted = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.ser.reset_input_buffer()
+        self.ser.write(b'S')
+        self._thread = threading.Thread(target=self._run, name=f"temperature-{self.ser.port}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+        try:
+            self.ser.write(b'X')
+        except Exception as e:
+            print(f"Could not stop streaming on port {self.ser.port}: {e}")
+
+    def _run(self):
+        pending = b''
+        last_seq = None
+        while not self._stop_event.is_set():
+            try:
+                chunk = self.ser.read(self.ser.in_waiting or 1)
+            except Exception as e:
+                print(f"Error reading temperature stream on port {self.ser.port}: {e}")
+                time.sleep(1)
+                continue
+            if not chunk:
+                continue
+            host_time = time.time()
+            pending += chunk
+            *lines, pending = pending.split(b'\n')
+            for line in lines:
+                packet = parse_temperature_packet(line)
+                if packet is None:
+                    if line.strip():
+                        self.corrupted += 1
+                    continue
+                seq, device_ms, temps = packet
+                if last_seq is not None and seq > last_seq + 1:
+                    self.lost += seq - last_seq - 1
+                last_seq = seq
+                self._store(host_time, device_ms, seq, temps)
+
+    def _store(self, host_time, device_ms, seq, temps):
+        with self._lock:
+            if self.values is None:
+                self.values = np.full((self.capacity, len(temps)), np.nan)
+            i = self.count % self.capacity
+            self.times[i] = host_time
+            self.device_ms[i] = device_ms
+            self.seq[i] = seq
+            self.values[i] = np.nan  # No leftovers of the previous lap for a shorter packet
+            self.values[i, :len(temps)] = temps[:self.values.shape[1]]
+            self.count += 1
+
+    def latest(self, max_age=None):
+        """
+        Latest temperatures as a list (as read_temperature_data returns),
+        None if nothing yet or if older than max_age seconds.
+        """
+        with self._lock:
+            if self.count == 0:
+                return None
+            i = (self.count - 1) % self.capacity
+            if max_age is not None and time.time() - self.times[i] > max_age:
+                return None
+            return self.values[i].tolist()
+
+    def age(self):
+        """Seconds since the latest packet, inf if nothing yet."""
+        with self._lock:
+            if self.count == 0:
+                return float('inf')
+            return time.time() - self.times[(self.count - 1) % self.capacity]
+
+    def window(self, seconds=None):
+        """(host times, temperatures) of the buffered samples, oldest first, optionally only the last seconds."""
+        with self._lock:
+            n = min(self.count, self.capacity)
+            if n == 0:
+                return np.zeros(0), np.zeros((0, 0))
+            order = (np.arange(self.count - n, self.count)) % self.capacity
+            times, values = self.times[order], self.values[order]
+        if seconds is not None:
+            keep = times >= times[-1] - seconds
+            times, values = times[keep], values[keep]
+        return times, values
+
+
+def read_pressure(ngc2d):
+    """
+    Read the ion gauge 1 pressure (mbar) from the NGC2D controller.
+    Returns None if the gauge is not reported or has no reading.
+    """
+    status = ngc2d.get_status()
+    gauge = next((g for g in status.gauges if g.number == GaugeSelection.ION_GAUGE_1), None)
+    return gauge.pressure if gauge is not None else None
+
+
 def initialize_relay(ip, email, password) -> PyP100.P100:
     relay =PyP100.P100(
         ip,
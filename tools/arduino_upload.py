@@ -92,8 +92,11 @@ def install_required_libraries(sketch_path):
             sys.exit(1)
 
 
-def upload_sketch(sketch_path, port):
-    """Upload a sketch to the Arduino."""
+def upload_sketch(sketch_path, port, defines=None):
+    """Upload a sketch to the Arduino.
+
+    defines: {NAME: value} passed to the compiler as -DNAME=value (e.g. SERIAL_BAUD).
+    """
     try:
         # Update core index
         subprocess.run(["arduino-cli", "core", "update-index"], check=True)
@@ -114,6 +117,9 @@ def upload_sketch(sketch_path, port):
             "arduino:avr:mega:cpu=atmega2560",
             sketch_path,
         ]
+        if defines:
+            flags = " ".join(f"-D{name}={value}" for name, value in defines.items())
+            compile_cmd[2:2] = ["--build-property", f"compiler.cpp.extra_flags={flags}"]
         subprocess.run(compile_cmd, check=True)
         print("Sketch compiled successfully")
 
@@ -150,8 +156,24 @@ def main():
         required=True,
         help="Serial port where Arduino is connected (e.g., /dev/ttyACM0)"
     )
+    parser.add_argument(
+        "--baud",
+        type=int,
+        help="Serial baud rate compiled into the sketch as SERIAL_BAUD (e.g., 115200)"
+    )
+    parser.add_argument(
+        "--stream_period_ms",
+        type=int,
+        help="Streaming period compiled into the sketch as STREAM_PERIOD_MS"
+    )
     args = parser.parse_args()
 
+    defines = {}
+    if args.baud:
+        defines["SERIAL_BAUD"] = args.baud
+    if args.stream_period_ms:
+        defines["STREAM_PERIOD_MS"] = args.stream_period_ms
+
     # Verify sketch exists
     sketch_path = f"{args.sketch_name}/{args.sketch_name}.ino"
     if not os.path.exists(sketch_path):
@@ -165,7 +187,7 @@ def main():
     install_required_libraries(sketch_path)
 
     # Upload the sketch
-    success = upload_sketch(sketch_path, args.port)
+    success = upload_sketch(sketch_path, args.port, defines)
     if not success:
         sys.exit(1)
 
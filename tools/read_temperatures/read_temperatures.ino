@@ -5,17 +5,64 @@
 // Depends on the following Arduino libraries:
 // - Arduino thermistor library: https://github.com/miguel5612/Arduino-ThermistorLibrary
 
+// Protocol:
+// - 'R': reply with one ASCII line, the temperatures separated by commas.
+// - 'S': start streaming one packet every STREAM_PERIOD_MS, 'X': stop streaming.
+//   Packet: $<seq>,<millis>,<T1>[,<T2>...]*<CS>\n where CS is the XOR of the
+//   characters between '$' and '*' in two hex digits and seq counts the packets
+//   since 'S', so the reader can detect lost and corrupted packets.
+// SERIAL_BAUD and STREAM_PERIOD_MS can be set at build time, e.g.
+//   python arduino_upload.py --sketch_name read_temperatures --port /dev/ttyACM0 --baud 115200
+
 #include <thermistor.h>
 
+#ifndef SERIAL_BAUD
+#define SERIAL_BAUD 9600
+#endif
+
+#ifndef STREAM_PERIOD_MS
+#define STREAM_PERIOD_MS 50
+#endif
+
 thermistor therm(A13, 11); // Analog Pin which is connected to the 3950 temperature sensor, and 0 represents TEMP_SENSOR_0 (see configuration.h for more information).
 
+bool streaming = false;
+unsigned long seq = 0;
+unsigned long nextSample = 0;
+
 void setup()
 {
-  Serial.begin(9600); // Initialize serial port at 9600 Bauds.
+  Serial.begin(SERIAL_BAUD); // Initialize serial port (9600 Bauds unless set at build time).
   // Optional: Add a small delay to ensure serial is ready
   delay(100);
 }
 
+void sendPacket()
+{
+  char packet[64];
+  char value[16];
+  int n = snprintf(packet, sizeof(packet), "%lu,%lu", seq, millis());
+
+  // dtostrf: the AVR snprintf has no %f
+  dtostrf(therm.analog2temp(), 1, 2, value);
+  n += snprintf(packet + n, sizeof(packet) - n, ",%s", value);
+
+  byte checksum = 0;
+  for (int i = 0; i < n; i++)
+  {
+    checksum ^= packet[i];
+  }
+  Serial.print('$');
+  Serial.print(packet);
+  Serial.print('*');
+  if (checksum < 16)
+  {
+    Serial.print('0');
+  }
+  Serial.println(checksum, HEX);
+  seq++;
+}
+
 void loop()
 {
   // Check if data is available to read from serial
@@ -39,8 +86,23 @@ void loop()
       // Print temperatures as comma-separated values
       Serial.println(temp); // Use println to add a newline
     }
-    // You could add else if blocks here for other commands if needed
-    // else if (command == 'S') { /* do something else */ }
+    else if (command == 'S')
+    {
+      streaming = true;
+      seq = 0;
+      nextSample = millis();
+    }
+    else if (command == 'X')
+    {
+      streaming = false;
+    }
+  }
+
+  // Fixed rate streaming, catching up without drift after a slow iteration
+  if (streaming && (long)(millis() - nextSample) >= 0)
+  {
+    nextSample += STREAM_PERIOD_MS;
+    sendPacket();
   }
   // No delay needed here, loop runs continuously waiting for input
 }
\ No newline at end of file